@@ -3,16 +3,22 @@
 
 import asyncio
 import functools
+import statistics
 from argparse import Namespace
+from pathlib import Path
 from typing import Iterable, Optional, cast
 
 from lisa import notifier, schema
+from lisa.notifiers.perf_history import get_default_perf_results_path
 from lisa.parameter_parser.runbook import RunbookBuilder
 from lisa.runner import RootRunner
 from lisa.testselector import select_testcases
 from lisa.testsuite import TestCaseRuntimeData
+from lisa.transformer import get_default_cache_path
 from lisa.util import LisaException, constants, hookspec, plugin_manager
-from lisa.util.logger import enable_console_timestamp, get_logger
+from lisa.util.logger import decompress_log_file, enable_console_timestamp, get_logger
+from lisa.util.output_cache import OutputCache
+from lisa.util.perf_store import KEY_COLUMNS, PerfResultStore
 from lisa.util.perf_timer import create_timer
 
 _get_init_logger = functools.partial(get_logger, "init")
@@ -75,9 +81,11 @@ def list_start(args: Namespace) -> int:
     log = _get_init_logger("list")
     if args.type == constants.LIST_CASE:
         if list_all:
-            cases: Iterable[TestCaseRuntimeData] = select_testcases()
+            cases: Iterable[TestCaseRuntimeData] = select_testcases(load_suites=False)
         else:
-            cases = select_testcases(builder.partial_resolve(constants.TESTCASE))
+            cases = select_testcases(
+                builder.partial_resolve(constants.TESTCASE), load_suites=False
+            )
         for case_data in cases:
             log.info(
                 f"case: {case_data.name}, suite: {case_data.metadata.suite.name}, "
@@ -92,6 +100,66 @@ def list_start(args: Namespace) -> int:
     return 0
 
 
+def decompress_log(args: Namespace) -> int:
+    log = _get_init_logger("log")
+    output_path = decompress_log_file(args.path, args.output)
+    log.info(f"decompressed log file: {output_path}")
+    return 0
+
+
+def query_perf(args: Namespace) -> int:
+    log = _get_init_logger("perf")
+    path: Path = args.path if args.path else get_default_perf_results_path()
+    if not path.exists():
+        raise LisaException(f"performance results database is not found: {path}")
+    conditions = {
+        column: getattr(args, column)
+        for column in KEY_COLUMNS
+        if getattr(args, column) is not None
+    }
+    store = PerfResultStore(path)
+    try:
+        records = store.query(conditions, limit=args.limit)
+    finally:
+        store.close()
+    for record in records:
+        key = ", ".join(f"{k}: {v}" for k, v in record.key.items() if v)
+        log.info(
+            f"{record.test_date.isoformat()} {record.run_id}, {key}, "
+            f"value: {record.value} {record.unit}"
+        )
+    if len(records) > 1:
+        values = [x.value for x in records]
+        log.info(
+            f"count: {len(values)}, mean: {statistics.mean(values):.3f}, "
+            f"stdev: {statistics.stdev(values):.3f}, "
+            f"min: {min(values)}, max: {max(values)}"
+        )
+    else:
+        log.info(f"count: {len(records)}")
+    return 0
+
+
+def transformer_cache(args: Namespace) -> int:
+    log = _get_init_logger("cache")
+    path: Path = args.path if args.path else get_default_cache_path()
+    cache = OutputCache(path)
+    type_name: str = args.type if args.type else ""
+    if args.clear:
+        count = cache.remove(type_name)
+        log.info(f"removed {count} cached transformer outputs")
+    else:
+        entries = cache.list(type_name)
+        for entry in entries:
+            log.info(
+                f"{entry.created_time.isoformat()} {entry.type_name}, "
+                f"name: {entry.name}, key: {entry.key}, "
+                f"outputs: {list(entry.outputs)}"
+            )
+        log.info(f"count: {len(entries)}")
+    return 0
+
+
 class CommandHookSpec:
     @hookspec
     def on_run_finalize(self) -> None:
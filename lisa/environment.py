@@ -33,6 +33,7 @@ from lisa.util import (
     plugin_manager,
 )
 from lisa.util.logger import create_file_handler, get_logger, remove_handler
+from lisa.util.tracing import CATEGORY_ENVIRONMENT, start_span
 
 if TYPE_CHECKING:
     from lisa.platform_ import Platform
@@ -136,6 +137,15 @@ class EnvironmentSpace(search_space.RequirementMixin):
 
         return result
 
+    def matches(self, capability: Any) -> bool:
+        assert isinstance(capability, EnvironmentSpace), f"actual: {type(capability)}"
+        if not capability.nodes or len(self.nodes) > len(capability.nodes):
+            return False
+        return all(
+            search_space.matches(current_req, capability.nodes[index])
+            for index, current_req in enumerate(self.nodes)
+        )
+
     def _generate_min_capability(self, capability: Any) -> Any:
         env = EnvironmentSpace(topology=self.topology)
         assert isinstance(capability, EnvironmentSpace), f"actual: {type(capability)}"
@@ -194,6 +204,8 @@ class Environment(ContextMixin, InitializableMixin):
         # contains environment name, which is not set in __init__.
         self._log_path: Optional[Path] = None
 
+        self._capability_fingerprint = search_space.CachedFingerprint()
+
         if not runbook.nodes_requirement and not runbook.nodes:
             raise LisaException("not found any node or requirement in environment")
 
@@ -274,6 +286,25 @@ class Environment(ContextMixin, InitializableMixin):
             result.nodes.extend(self.runbook.nodes_requirement)
         return result
 
+    @property
+    def capability_fingerprint(self) -> str:
+        """
+        The canonical hash of capability. It's recomputed only when the
+        capability is replaced or the fingerprint is cleared, so it's cheap to
+        compare environments with requirements many times.
+        """
+        return self._capability_fingerprint.get(
+            self._get_capability_sources(), lambda: self.capability
+        )
+
+    def clear_capability_fingerprint(self) -> None:
+        """
+        The capability may be changed in place, like the data disk count
+        changed by the disk feature. Call it before comparing with requirements
+        again, so the fingerprint is recomputed.
+        """
+        self._capability_fingerprint.clear()
+
     def close(self) -> None:
         if hasattr(self, "_log_handler") and self._log_handler:
             remove_handler(self._log_handler, self.log)
@@ -343,9 +374,27 @@ class Environment(ContextMixin, InitializableMixin):
         self._log_handler = create_file_handler(
             self.log_path / "environment.log", self.log
         )
-        self.nodes.initialize()
+        with start_span(f"initialize {self.name}", CATEGORY_ENVIRONMENT):
+            self.nodes.initialize()
         self.status = EnvironmentStatus.Connected
 
+    def _get_capability_sources(self) -> List[Any]:
+        # the capability is built from them. If any of them is replaced, the
+        # capability is changed.
+        is_requirement_included = self.status in [
+            EnvironmentStatus.Prepared,
+            EnvironmentStatus.New,
+        ]
+        sources: List[Any] = [
+            self.runbook.topology,
+            is_requirement_included,
+            self.runbook.nodes_requirement,
+        ]
+        sources.extend(x.capability for x in self.nodes.list())
+        if is_requirement_included and self.runbook.nodes_requirement:
+            sources.extend(self.runbook.nodes_requirement)
+        return sources
+
     def _validate_single_default(
         self, has_default: bool, is_default: Optional[bool]
     ) -> bool:
@@ -11,6 +11,7 @@ from lisa.util import InitializableMixin, LisaException, constants
 from lisa.util.logger import get_logger
 from lisa.util.perf_timer import create_timer
 from lisa.util.process import ExecutableResult, Process
+from lisa.util.tracing import CATEGORY_TOOL, start_span
 
 if TYPE_CHECKING:
     from lisa.node import Node
@@ -534,7 +535,10 @@ class Tools:
                 if tool.can_install:
                     tool_log.debug(f"{tool.name} is installing")
                     timer = create_timer()
-                    is_success = tool.install()
+                    with start_span(
+                        f"install {tool.name}", CATEGORY_TOOL, node=self._node.name
+                    ):
+                        is_success = tool.install()
                     if not is_success:
                         raise LisaException(
                             f"install '{tool.name}' failed. After installed, "
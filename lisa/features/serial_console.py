@@ -12,6 +12,7 @@ from lisa.util import (
     get_datetime_path,
     get_matched_str,
 )
+from lisa.util.logger import save_log_file
 
 FEATURE_NAME_SERIAL_CONSOLE = "SerialConsole"
 NAME_SERIAL_CONSOLE_LOG = "serial_console.log"
@@ -99,17 +100,15 @@ class SerialConsole(Feature):
                 f"downloaded serial log size: {len(self._cached_console_log)}"
             )
             # anyway save to node log_path for each time it's real queried
-            log_file_name = log_path / NAME_SERIAL_CONSOLE_LOG
-            with open(log_file_name, mode="wb") as f:
-                f.write(self._cached_console_log)
+            save_log_file(log_path / NAME_SERIAL_CONSOLE_LOG, self._cached_console_log)
         else:
             self._node.log.debug("load cached serial log")
 
         if saved_path:
             # save it again, if it's asked to save.
-            log_file_name = saved_path / NAME_SERIAL_CONSOLE_LOG
-            with open(log_file_name, mode="wb") as f:
-                f.write(self._cached_console_log)
+            save_log_file(
+                saved_path / NAME_SERIAL_CONSOLE_LOG, self._cached_console_log
+            )
 
         return self._cached_console_log.decode("utf-8", errors="ignore")
 
@@ -14,13 +14,16 @@ from retry import retry
 from lisa.parameter_parser.argparser import parse_args
 from lisa.util import constants, get_datetime_path
 from lisa.util.logger import (
+    Logger,
     create_file_handler,
     get_logger,
     remove_handler,
     set_level,
+    set_log_file_options,
     uninit_logger,
 )
 from lisa.util.perf_timer import create_timer
+from lisa.util.tracing import enable_tracing, get_tracer
 from lisa.variable import add_secrets_from_pairs
 
 
@@ -57,6 +60,18 @@ def initialize_runtime_folder() -> None:
     constants.RUN_LOCAL_PATH = local_path
 
 
+def export_trace(log: Logger) -> None:
+    tracer = get_tracer()
+    for category, elapsed in sorted(
+        tracer.summarize().items(), key=lambda x: x[1], reverse=True
+    ):
+        log.info(f"trace summary, {category}: {elapsed:.3f} sec")
+    trace_path = constants.RUN_LOCAL_PATH / "trace.json"
+    tracer.export_chrome_trace(trace_path)
+    tracer.export_otel(constants.RUN_LOCAL_PATH / "trace.otel.json")
+    log.info(f"trace is saved to {trace_path}")
+
+
 def main() -> int:
     total_timer = create_timer()
     log = get_logger()
@@ -70,10 +85,16 @@ def main() -> int:
 
         log_level = DEBUG if (args.debug) else INFO
         set_level(log_level)
+        set_log_file_options(
+            compression=args.log_compression,
+            case_max_size=args.case_log_max_size * 1024 * 1024,
+        )
 
         file_handler = create_file_handler(
             Path(f"{constants.RUN_LOCAL_PATH}/lisa-{constants.RUN_ID}.log")
         )
+        if args.trace:
+            enable_tracing()
 
         log.info(f"Python version: {sys.version}")
         log.info(f"local time: {datetime.now().astimezone()}")
@@ -88,9 +109,12 @@ def main() -> int:
         exit_code = args.func(args)
         assert isinstance(exit_code, int), f"actual: {type(exit_code)}"
     finally:
+        if get_tracer().enabled:
+            export_trace(log)
         log.info(f"completed in {total_timer}")
         if file_handler:
             remove_handler(log_handler=file_handler, logger=log)
+            file_handler.close()
         uninit_logger()
 
     return exit_code
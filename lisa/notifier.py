@@ -2,16 +2,17 @@
 # Licensed under the MIT license.
 
 import threading
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
 from functools import partial
-from typing import Any, Dict, List, Optional, Type
+from typing import Any, Dict, List, Optional, Tuple, Type
 
 from lisa import schema
 from lisa.util import InitializableMixin, constants, subclasses
 from lisa.util.logger import get_logger
+from lisa.util.tracing import CATEGORY_NOTIFIER, start_span
 
 
 @dataclass
@@ -96,6 +97,51 @@ class DiskPerformanceMessage(PerfMessage):
     randwrite_lat_usec: Decimal = Decimal(0)
 
 
+@dataclass
+class PerfMetricMessage(PerfMessage):
+    """
+    A generic performance metric. Each message holds one value with its unit,
+    and the context like vm size, kernel version or block size is in tags. So
+    results of different tools have same columns, and they are easy to be
+    compared and aggregated.
+    """
+
+    type: str = "PerfMetric"
+    tool: str = ""
+    test_case_name: str = ""
+    metric_name: str = ""
+    unit: str = ""
+    value: Decimal = Decimal(0)
+    tags: Dict[str, str] = field(default_factory=dict)
+    test_date: datetime = field(default_factory=datetime.utcnow)
+
+
+def create_perf_metric_messages(
+    tool: str,
+    metrics: Dict[str, Tuple[Any, str]],
+    test_case_name: str = "",
+    tags: Optional[Dict[str, Any]] = None,
+) -> List[PerfMetricMessage]:
+    """
+    metrics: the key is metric name, and the value is a tuple of value and unit.
+    tags: values are converted to str.
+    """
+    str_tags = {key: str(value) for key, value in tags.items()} if tags else {}
+    test_date = datetime.utcnow()
+    return [
+        PerfMetricMessage(
+            tool=tool,
+            test_case_name=test_case_name,
+            metric_name=name,
+            unit=unit,
+            value=Decimal(str(value)),
+            tags=str_tags.copy(),
+            test_date=test_date,
+        )
+        for name, (value, unit) in metrics.items()
+    ]
+
+
 _get_init_logger = partial(get_logger, "init", "notifier")
 
 
@@ -201,7 +247,12 @@ def notify(message: MessageBase) -> None:
                 notifiers = _messages.get(type(current_message))
                 if notifiers:
                     for notifier in notifiers:
-                        notifier._received_message(message=current_message)
+                        with start_span(
+                            f"notify {notifier.__class__.__name__}",
+                            CATEGORY_NOTIFIER,
+                            message=type(current_message).__name__,
+                        ):
+                            notifier._received_message(message=current_message)
 
 
 def finalize() -> None:
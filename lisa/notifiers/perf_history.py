@@ -0,0 +1,113 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, List, Type, cast
+
+from dataclasses_json import dataclass_json
+
+from lisa import notifier, schema
+from lisa.notifier import PerfMetricMessage
+from lisa.util import LisaException, constants
+from lisa.util.perf_store import PerfRecord, PerfRegression, PerfResultStore
+
+PERF_RESULTS_FILE_NAME = "perf_results.db"
+
+
+def get_default_perf_results_path() -> Path:
+    return constants.CACHE_PATH / PERF_RESULTS_FILE_NAME
+
+
+@dataclass_json()
+@dataclass
+class PerfHistorySchema(schema.Notifier):
+    # the path of SQLite database. By default, it's in the cache folder, so it's
+    # shared by runs.
+    path: str = ""
+    # how many latest results are used as the baseline.
+    window: int = 10
+    # skip comparing, if there is not enough history.
+    min_samples: int = 5
+    # how many standard deviations worse than the baseline is a regression.
+    threshold: float = 3.0
+    # the minimum relative change, which is treated as a regression.
+    min_change: float = 0.05
+
+
+class PerfHistory(notifier.Notifier):
+    """
+    It saves performance metrics into a local database, and compares them with
+    the results of previous runs on the same configuration. Regressions are
+    reported at the end of the run.
+    """
+
+    @classmethod
+    def type_name(cls) -> str:
+        return "perf_history"
+
+    @classmethod
+    def type_schema(cls) -> Type[schema.TypedSchema]:
+        return PerfHistorySchema
+
+    def finalize(self) -> None:
+        if not self._records:
+            self._log.debug("no performance metric received, skip saving.")
+            return
+        runbook = cast(PerfHistorySchema, self.runbook)
+        store = PerfResultStore(self._path)
+        try:
+            regressions: List[PerfRegression] = []
+            for record in self._records:
+                regression = store.check_regression(
+                    record,
+                    window=runbook.window,
+                    min_samples=runbook.min_samples,
+                    threshold=runbook.threshold,
+                    min_change=runbook.min_change,
+                )
+                if regression:
+                    regressions.append(regression)
+            store.add(self._records)
+        finally:
+            store.close()
+
+        self._log.info(
+            f"saved {len(self._records)} performance results to {self._path}"
+        )
+        if regressions:
+            self._log.warning(f"found {len(regressions)} performance regressions:")
+            for regression in regressions:
+                self._log.warning(f"    {regression}")
+        else:
+            self._log.info("no performance regression found.")
+
+    def _received_message(self, message: notifier.MessageBase) -> None:
+        if not isinstance(message, PerfMetricMessage):
+            raise LisaException(f"unsupported message received, {type(message)}")
+        self._records.append(
+            PerfRecord(
+                test_case_name=message.test_case_name,
+                tool=message.tool,
+                metric_name=message.metric_name,
+                unit=message.unit,
+                value=float(message.value),
+                run_id=constants.RUN_ID,
+                run_name=constants.RUN_NAME,
+                test_date=message.test_date,
+                tags=message.tags,
+            )
+        )
+
+    def _subscribed_message_type(self) -> List[Type[notifier.MessageBase]]:
+        return [PerfMetricMessage]
+
+    def _initialize(self, *args: Any, **kwargs: Any) -> None:
+        runbook = cast(PerfHistorySchema, self.runbook)
+        if runbook.path:
+            self._path = Path(runbook.path).absolute()
+        else:
+            self._path = get_default_perf_results_path()
+        # results are saved at the end, so the database is written by one thread
+        # only.
+        self._records: List[PerfRecord] = []
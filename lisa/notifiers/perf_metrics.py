@@ -0,0 +1,89 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import csv
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Type, cast
+
+from dataclasses_json import dataclass_json
+
+from lisa import notifier, schema
+from lisa.notifier import PerfMetricMessage
+from lisa.util import LisaException, constants
+
+# fixed columns, the tag columns are appended after them.
+_fixed_columns = [
+    "run_name",
+    "test_date",
+    "test_case_name",
+    "tool",
+    "metric_name",
+    "unit",
+    "value",
+]
+
+
+@dataclass_json()
+@dataclass
+class PerfMetricsSchema(schema.Notifier):
+    # relative path is under the run log folder.
+    path: str = "perf_metrics.csv"
+
+
+class PerfMetrics(notifier.Notifier):
+    """
+    It writes performance metrics to a csv file. Each row is a metric, and each
+    tag is a column, so results of many runs can be concatenated and aggregated
+    by common tools like pandas or spreadsheet.
+    """
+
+    @classmethod
+    def type_name(cls) -> str:
+        return "perf_metrics"
+
+    @classmethod
+    def type_schema(cls) -> Type[schema.TypedSchema]:
+        return PerfMetricsSchema
+
+    def finalize(self) -> None:
+        if not self._rows:
+            self._log.debug("no performance metric received, skip writing.")
+            return
+        tag_columns = sorted(
+            {key for row in self._rows for key in row.keys()}.difference(_fixed_columns)
+        )
+        self._file_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._file_path, "w", newline="") as f:
+            writer = csv.DictWriter(
+                f, fieldnames=_fixed_columns + tag_columns, restval=""
+            )
+            writer.writeheader()
+            writer.writerows(self._rows)
+        self._log.info(f"performance metrics: {self._file_path}")
+
+    def _received_message(self, message: notifier.MessageBase) -> None:
+        if not isinstance(message, PerfMetricMessage):
+            raise LisaException(f"unsupported message received, {type(message)}")
+        row: Dict[str, Any] = {
+            # tags are added first, so they cannot override fixed columns.
+            **message.tags,
+            "run_name": constants.RUN_NAME,
+            "test_date": message.test_date.isoformat(),
+            "test_case_name": message.test_case_name,
+            "tool": message.tool,
+            "metric_name": message.metric_name,
+            "unit": message.unit,
+            "value": str(message.value),
+        }
+        self._rows.append(row)
+
+    def _subscribed_message_type(self) -> List[Type[notifier.MessageBase]]:
+        return [PerfMetricMessage]
+
+    def _initialize(self, *args: Any, **kwargs: Any) -> None:
+        runbook = cast(PerfMetricsSchema, self.runbook)
+        self._file_path = Path(runbook.path)
+        if not self._file_path.is_absolute():
+            self._file_path = constants.RUN_LOCAL_PATH / self._file_path
+        self._rows: List[Dict[str, Any]] = []
@@ -5,7 +5,7 @@ from argparse import ArgumentParser, Namespace
 from pathlib import Path
 
 from lisa import commands
-from lisa.util import constants
+from lisa.util import constants, perf_store
 
 
 def support_runbook(parser: ArgumentParser, required: bool = True) -> None:
@@ -45,12 +45,46 @@ def support_variable(parser: ArgumentParser) -> None:
     )
 
 
+def support_log_file(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--log-compression",
+        dest="log_compression",
+        choices=["none", "gzip", "zstd"],
+        default="none",
+        help="Compress log files on the fly. The zstd needs the package "
+        "'zstandard' installed. Use the 'log' command to decompress log files.",
+    )
+    parser.add_argument(
+        "--case-log-max-size",
+        dest="case_log_max_size",
+        type=int,
+        default=0,
+        help="The max size of each test case log and serial console log in MB. If "
+        "a log exceeds it, the head and the tail are kept, and the middle part is "
+        "dropped. By default, there is no limitation.",
+    )
+
+
+def support_trace(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--trace",
+        dest="trace",
+        action="store_true",
+        help="Record spans of each stage, like runbook, transformers, environments, "
+        "test cases, tool installation, commands and notifiers. They are saved to "
+        "trace.json in chrome trace event format and trace.otel.json in "
+        "OpenTelemetry format under the run path.",
+    )
+
+
 def parse_args() -> Namespace:
     """This wraps Python's 'ArgumentParser' to setup our CLI."""
     parser = ArgumentParser(prog="lisa")
     support_debug(parser)
     support_runbook(parser, required=False)
     support_variable(parser)
+    support_log_file(parser)
+    support_trace(parser)
 
     # Default to ‘run’ when no subcommand is given.
     parser.set_defaults(func=commands.run)
@@ -87,5 +121,80 @@ def parse_args() -> Namespace:
         support_runbook(sub_parser)
         support_variable(sub_parser)
         support_debug(sub_parser)
+        support_log_file(sub_parser)
+        support_trace(sub_parser)
+
+    # Entry point for ‘log’. It doesn't need a runbook.
+    log_parser = subparsers.add_parser("log")
+    log_parser.set_defaults(func=commands.decompress_log)
+    log_parser.add_argument(
+        "--path",
+        "-p",
+        dest="path",
+        type=Path,
+        required=True,
+        help="the path of a compressed log file, like *.log.gz or *.log.zst.",
+    )
+    log_parser.add_argument(
+        "--output",
+        "-o",
+        dest="output",
+        type=Path,
+        help="the path of decompressed file. By default, it's the same path "
+        "without the compression suffix.",
+    )
+    support_debug(log_parser)
+
+    # Entry point for ‘perf’. It queries the local performance results.
+    perf_parser = subparsers.add_parser("perf")
+    perf_parser.set_defaults(func=commands.query_perf)
+    perf_parser.add_argument(
+        "--path",
+        "-p",
+        dest="path",
+        type=Path,
+        help="the path of performance results database. By default, it's "
+        "perf_results.db in the cache folder.",
+    )
+    for column in perf_store.KEY_COLUMNS:
+        perf_parser.add_argument(
+            f"--{column.replace('_', '-')}",
+            dest=column,
+            help=f"filter results by {column.replace('_', ' ')}.",
+        )
+    perf_parser.add_argument(
+        "--limit",
+        "-l",
+        dest="limit",
+        type=int,
+        default=20,
+        help="the max count of latest results to show. 0 means no limit.",
+    )
+    support_debug(perf_parser)
+
+    # Entry point for ‘cache’. It lists or clears cached transformer outputs.
+    cache_parser = subparsers.add_parser("cache")
+    cache_parser.set_defaults(func=commands.transformer_cache)
+    cache_parser.add_argument(
+        "--path",
+        "-p",
+        dest="path",
+        type=Path,
+        help="the path of cached transformer outputs. By default, it's "
+        "transformer_outputs in the cache folder.",
+    )
+    cache_parser.add_argument(
+        "--type",
+        "-t",
+        dest="type",
+        help="the transformer type of cached outputs. By default, it's all types.",
+    )
+    cache_parser.add_argument(
+        "--clear",
+        dest="clear",
+        action="store_true",
+        help="remove the cached outputs, instead of listing them.",
+    )
+    support_debug(cache_parser)
 
     return parser.parse_args()
@@ -4,22 +4,57 @@
 import copy
 from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, Union, cast
+from typing import Any, Dict, List, Optional, Set, Tuple, Union, cast
 
 import yaml
 from marshmallow import Schema
 
 from lisa import schema
+from lisa.testsuite import MANIFEST_FILE_NAME, TestSuiteManifest
 from lisa.util import LisaException, constants
 from lisa.util.logger import get_logger
 from lisa.util.package import import_package
-from lisa.variable import VariableEntry, load_variables, replace_variables
+from lisa.util.tracing import CATEGORY_RUNBOOK, start_span
+from lisa.variable import (
+    VariableEntry,
+    VariablePath,
+    find_variable_paths,
+    load_variables,
+    replace_variables,
+    replace_variables_by_paths,
+)
 
 _schema: Optional[Schema] = None
+# section names to field names of runbook schema.
+_field_names: Optional[Dict[str, str]] = None
+
+# these packages depend on heavy libraries, so they are imported only when their
+# subclasses are used.
+_LAZY_PACKAGES = ["lisa.sut_orchestrator.azure", "lisa.notifiers.html"]
 
 _get_init_logger = partial(get_logger, "init", "runbook")
 
 
+def _get_schema() -> Schema:
+    global _schema
+    if not _schema:
+        _schema = schema.Runbook.schema()  # type: ignore
+    assert _schema
+    return _schema
+
+
+def _get_field_name(key: str) -> str:
+    """
+    return the field name of a section in runbook, or "" if it's unknown.
+    """
+    global _field_names
+    if _field_names is None:
+        _field_names = {
+            (x.data_key or name): name for name, x in _get_schema().fields.items()
+        }
+    return _field_names.get(key, "")
+
+
 class RunbookBuilder:
     def __init__(
         self,
@@ -36,6 +71,13 @@ class RunbookBuilder:
 
         self._raw_data: Any = None
         self._variables: Dict[str, VariableEntry] = {}
+        # paths of variables in raw data, it's shared by derived builders. The
+        # key is id of data, and the data is held to make sure it's the same.
+        self._variable_paths: Dict[int, Tuple[Any, List[VariablePath]]] = {}
+        # loaded sections without variables, it's shared by derived builders.
+        # The key is the name of section, and the raw data is held to make sure
+        # it's not changed.
+        self._loaded_sections: Dict[str, Tuple[Any, Any]] = {}
         constants.RUNBOOK_PATH = self._path.parent
         constants.RUNBOOK_FILE = self._path
 
@@ -59,46 +101,52 @@ class RunbookBuilder:
         """
         Loads a runbook given a user-supplied path and set of variables.
         """
-        builder = RunbookBuilder(path=path, cmd_args=cmd_args)
+        with start_span("load runbook", CATEGORY_RUNBOOK, path=str(path)):
+            builder = RunbookBuilder(path=path, cmd_args=cmd_args)
 
-        # load lisa itself modules, it's for subclasses, and other dynamic loading.
-        base_module_path = Path(__file__).parent.parent
-        import_package(base_module_path, enable_log=False)
+            # load lisa itself modules, it's for subclasses, and other dynamic loading.
+            base_module_path = Path(__file__).parent.parent
+            import_package(
+                base_module_path, enable_log=False, lazy_packages=_LAZY_PACKAGES
+            )
 
-        # merge all parameters
-        builder._log.info(f"loading runbook: {builder._path}")
-        data = builder._load_data(
-            builder._path.absolute(), set(), higher_level_variables=builder._cmd_args
-        )
-        builder._raw_data = data
+            # merge all parameters
+            builder._log.info(f"loading runbook: {builder._path}")
+            data = builder._load_data(
+                builder._path.absolute(),
+                set(),
+                higher_level_variables=builder._cmd_args,
+            )
+            builder._raw_data = data
 
-        # load final variables
-        variables = load_variables(
-            runbook_data=data, higher_level_variables=builder._cmd_args
-        )
-        builder._variables = variables
+            # load final variables
+            variables = load_variables(
+                runbook_data=data, higher_level_variables=builder._cmd_args
+            )
+            builder._variables = variables
 
-        builder._import_extensions()
+            builder._import_extensions()
 
-        # remove variables and extensions from data, since it's not used, and may be
-        #  confusing in log.
-        if constants.VARIABLE in data:
-            del data[constants.VARIABLE]
+            # remove variables and extensions from data, since it's not used, and may be
+            #  confusing in log.
+            if constants.VARIABLE in data:
+                del data[constants.VARIABLE]
 
-        runbook_name = builder.partial_resolve(constants.NAME)
+            runbook_name = builder.partial_resolve(constants.NAME)
 
-        constants.RUN_NAME = f"lisa_{runbook_name}_{constants.RUN_ID}"
-        builder._log.info(f"run name is '{constants.RUN_NAME}'")
+            constants.RUN_NAME = f"lisa_{runbook_name}_{constants.RUN_ID}"
+            builder._log.info(f"run name is '{constants.RUN_NAME}'")
 
         return builder
 
     def resolve(
         self, variables: Optional[Dict[str, VariableEntry]] = None
     ) -> schema.Runbook:
-        parsed_data = self._internal_resolve(self.raw_data, variables)
+        with start_span("resolve runbook", CATEGORY_RUNBOOK):
+            parsed_data = self._internal_resolve(self.raw_data, variables)
 
-        # validate runbook, after extensions loaded
-        runbook = self._validate_and_load(parsed_data)
+            # validate runbook, after extensions loaded
+            runbook = self._load_runbook(parsed_data)
 
         return runbook
 
@@ -107,8 +155,9 @@ class RunbookBuilder:
     ) -> Any:
         result: Any = None
         if partial_name in self.raw_data:
-            raw_data = copy.deepcopy(self.raw_data[partial_name])
-            result = self._internal_resolve(raw_data, variables)
+            result = copy.deepcopy(
+                self._internal_resolve(self.raw_data[partial_name], variables)
+            )
 
         return result
 
@@ -124,6 +173,8 @@ class RunbookBuilder:
             variables = {key: value.copy() for key, value in self.variables.items()}
         result._variables = variables
         result._raw_data = self._raw_data
+        result._variable_paths = self._variable_paths
+        result._loaded_sections = self._loaded_sections
 
         return result
 
@@ -142,11 +193,16 @@ class RunbookBuilder:
     def _internal_resolve(
         self, raw_data: Any, variables: Optional[Dict[str, VariableEntry]] = None
     ) -> Any:
-        raw_data = copy.deepcopy(raw_data)
+        """
+        The raw data is not changed, and the parsed data shares the parts
+        without variables with it.
+        """
         if variables is None:
             variables = self.variables
         try:
-            parsed_data = replace_variables(raw_data, variables)
+            parsed_data = replace_variables_by_paths(
+                raw_data, self._get_variable_paths(raw_data), variables
+            )
         except Exception as identifier:
             # log current data for troubleshooting.
             self._log.debug(f"parsed raw data: {raw_data}")
@@ -154,6 +210,23 @@ class RunbookBuilder:
 
         return parsed_data
 
+    def _get_variable_paths(self, raw_data: Any) -> List[VariablePath]:
+        if not isinstance(raw_data, dict):
+            return self._get_cached_variable_paths(raw_data)
+        # top level sections may be removed from raw data, so cache them
+        # separately.
+        results: List[VariablePath] = []
+        for key, value in raw_data.items():
+            results.extend((key, *x) for x in self._get_cached_variable_paths(value))
+        return results
+
+    def _get_cached_variable_paths(self, data: Any) -> List[VariablePath]:
+        cached = self._variable_paths.get(id(data), None)
+        if cached is None or cached[0] is not data:
+            cached = (data, find_variable_paths(data))
+            self._variable_paths[id(data)] = cached
+        return cached[1]
+
     def _import_extensions(self) -> None:
         # load extended modules
         if constants.EXTENSION in self._raw_data:
@@ -161,21 +234,56 @@ class RunbookBuilder:
                 constants.RUNBOOK_PATH, self.raw_data, self.variables
             )
             extensions = schema.Extension.from_raw(raw_extensions)
+            manifest = TestSuiteManifest(constants.CACHE_PATH / MANIFEST_FILE_NAME)
             for index, extension in enumerate(extensions):
                 if not extension.name:
                     extension.name = f"lisa_ext_{index}"
-                import_package(Path(extension.path), package_name=extension.name)
+                import_package(
+                    Path(extension.path),
+                    package_name=extension.name,
+                    importer=manifest.import_module,
+                )
+            manifest.save()
 
             del self._raw_data[constants.EXTENSION]
 
     @staticmethod
     def _validate_and_load(data: Any) -> schema.Runbook:
-        global _schema
-        if not _schema:
-            _schema = schema.Runbook.schema()  # type: ignore
+        runbook = RunbookBuilder._load_by_schema(data)
+
+        log = _get_init_logger()
+        log.debug(f"parsed runbook: {runbook.to_dict()}")  # type: ignore
+
+        return runbook
 
-        assert _schema
-        runbook = cast(schema.Runbook, _schema.load(data))
+    @staticmethod
+    def _load_by_schema(data: Any) -> schema.Runbook:
+        return cast(schema.Runbook, _get_schema().load(data))
+
+    def _load_runbook(self, parsed_data: Dict[str, Any]) -> schema.Runbook:
+        """
+        The sections without variables are the same objects in raw data. They
+        are loaded once, and copies of loaded values are used in later
+        resolving. Other sections are loaded each time.
+        """
+        changed_data: Dict[str, Any] = {}
+        loaded_sections: Dict[str, Any] = {}
+        for key, value in parsed_data.items():
+            field_name = _get_field_name(key)
+            if not field_name or value is not self.raw_data.get(key, None):
+                changed_data[key] = value
+                continue
+            cached = self._loaded_sections.get(key, None)
+            if cached is None or cached[0] is not value:
+                section_runbook = self._load_by_schema({key: value})
+                cached = (value, getattr(section_runbook, field_name))
+                self._loaded_sections[key] = cached
+            # copy it, so the loaded objects are not shared between iterations.
+            loaded_sections[field_name] = copy.deepcopy(cached[1])
+
+        runbook = self._load_by_schema(changed_data)
+        for field_name, value in loaded_sections.items():
+            setattr(runbook, field_name, value)
 
         log = _get_init_logger()
         log.debug(f"parsed runbook: {runbook.to_dict()}")  # type: ignore
@@ -26,6 +26,7 @@ from lisa.util import (
 )
 from lisa.util.logger import Logger, get_logger
 from lisa.util.perf_timer import create_timer
+from lisa.util.tracing import CATEGORY_ENVIRONMENT, start_span
 
 _get_init_logger = partial(get_logger, "init", "platform")
 
@@ -141,7 +142,12 @@ class Platform(subclasses.BaseClassWithRunbookMixin, InitializableMixin):
                 )
 
         try:
-            is_success = self._prepare_environment(environment, log)
+            with start_span(
+                f"prepare {environment.name}",
+                CATEGORY_ENVIRONMENT,
+                platform=self.type_name(),
+            ):
+                is_success = self._prepare_environment(environment, log)
         except NotMeetRequirementException as identifier:
             raise SkippedException(identifier)
 
@@ -159,7 +165,12 @@ class Platform(subclasses.BaseClassWithRunbookMixin, InitializableMixin):
         log.info(f"deploying environment: {environment.name}")
         timer = create_timer()
         environment.platform = self
-        self._deploy_environment(environment, log)
+        with start_span(
+            f"deploy {environment.name}",
+            CATEGORY_ENVIRONMENT,
+            platform=self.type_name(),
+        ):
+            self._deploy_environment(environment, log)
         environment.status = EnvironmentStatus.Deployed
 
         # initialize features
@@ -190,7 +201,12 @@ class Platform(subclasses.BaseClassWithRunbookMixin, InitializableMixin):
             log.info(f"node ip addresses: {remote_addresses}")
         else:
             log.debug("deleting")
-            self._delete_environment(environment, log)
+            with start_span(
+                f"delete {environment.name}",
+                CATEGORY_ENVIRONMENT,
+                platform=self.type_name(),
+            ):
+                self._delete_environment(environment, log)
 
 
 def load_platform(platforms_runbook: List[schema.Platform]) -> Platform:
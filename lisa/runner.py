@@ -1,10 +1,24 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
-import copy
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
 from logging import FileHandler
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterator, List, Optional, Type
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    cast,
+)
 
 from lisa import notifier, schema, transformer
 from lisa.action import Action
@@ -17,7 +31,7 @@ from lisa.util.logger import create_file_handler, get_logger, remove_handler
 from lisa.util.parallel import Task, TaskManager, cancel, set_global_task_manager
 from lisa.util.perf_timer import create_timer
 from lisa.util.subclasses import Factory
-from lisa.variable import VariableEntry, get_case_variables, replace_variables
+from lisa.variable import VariableEntry, get_case_variables
 
 
 def parse_testcase_filters(raw_filters: List[Any]) -> List[schema.BaseTestCaseFilter]:
@@ -87,6 +101,34 @@ class RunnerResult(notifier.Notifier):
         self.results: Dict[str, TestResultMessage] = {}
 
 
+T = TypeVar("T")
+
+
+class RunnerContext:
+    """
+    It holds objects, which are shared by runners of a run. When a combinator
+    expands the runbook to many iterations, the runners with the same platform
+    or test case filters reuse the initialized platform and selected test
+    cases, instead of creating them again.
+    """
+
+    def __init__(self) -> None:
+        self._objects: Dict[str, Any] = {}
+        self._lock = Lock()
+
+    def get_or_create(self, kind: str, key_data: Any, create: Callable[[], T]) -> T:
+        """
+        key_data is a json serializable value, like the runbook of platforms.
+        The object is created once for the same kind and key_data.
+        """
+        serialized = json.dumps(key_data, sort_keys=True, default=str)
+        key = f"{kind}_{hashlib.sha256(serialized.encode('utf-8')).hexdigest()}"
+        with self._lock:
+            if key not in self._objects:
+                self._objects[key] = create()
+            return cast(T, self._objects[key])
+
+
 class BaseRunner(BaseClassMixin, InitializableMixin):
     """
     Base runner of other runners. And other runners derived from this one.
@@ -97,9 +139,11 @@ class BaseRunner(BaseClassMixin, InitializableMixin):
         runbook: schema.Runbook,
         index: int,
         case_variables: Dict[str, Any],
+        context: Optional[RunnerContext] = None,
     ) -> None:
         super().__init__()
         self._runbook = runbook
+        self._context = context or RunnerContext()
 
         self.id = f"{self.type_name()}_{index}"
         self._task_id = -1
@@ -166,6 +210,7 @@ class RootRunner(Action):
         # global error.
         self._runners: List[BaseRunner] = []
         self._runner_count: int = 0
+        self._context = RunnerContext()
 
     async def start(self) -> None:
         await super().start()
@@ -176,9 +221,8 @@ class RootRunner(Action):
             )
 
             # update runbook for notifiers
-            raw_data = copy.deepcopy(self._runbook_builder.raw_data)
-            constants.RUNBOOK = replace_variables(
-                raw_data, self._runbook_builder._variables
+            constants.RUNBOOK = self._runbook_builder._internal_resolve(
+                self._runbook_builder.raw_data
             )
             runbook = self._runbook_builder.resolve()
             self._runbook_builder.dump_variables()
@@ -223,20 +267,33 @@ class RootRunner(Action):
                 f"found combinator '{combinator.type_name()}', to expand runbook."
             )
             combinator.initialize()
-            while True:
-                variables = combinator.fetch(self._runbook_builder.variables)
-                if variables is None:
-                    break
-                sub_runbook_builder = self._runbook_builder.derive(variables=variables)
-                transformer.run(
-                    sub_runbook_builder, phase=constants.TRANSFORMER_PHASE_EXPANDED
-                )
-
-                runners = self._generate_runners(
-                    sub_runbook_builder.resolve(), variables
+            # expanded transformers may deploy or build resources, so they run in
+            # foreground after current iteration. Only the variables and the
+            # runbook of next iteration are prepared in background, when runners
+            # of current iteration are running.
+            is_resolved_in_background = not transformer.has_transformers(
+                self._runbook_builder, phase=constants.TRANSFORMER_PHASE_EXPANDED
+            )
+            with ThreadPoolExecutor(max_workers=1) as prefetcher:
+                next_expanded = prefetcher.submit(
+                    self._expand, combinator, is_resolved_in_background
                 )
-                for runner in runners:
-                    yield runner
+                while True:
+                    expanded = next_expanded.result()
+                    if expanded is None:
+                        break
+                    next_expanded = prefetcher.submit(
+                        self._expand, combinator, is_resolved_in_background
+                    )
+                    sub_runbook_builder, sub_runbook, variables = expanded
+                    if sub_runbook is None:
+                        transformer.run(
+                            sub_runbook_builder,
+                            phase=constants.TRANSFORMER_PHASE_EXPANDED,
+                        )
+                        sub_runbook = sub_runbook_builder.resolve()
+                    for runner in self._generate_runners(sub_runbook, variables):
+                        yield runner
         else:
             # no combinator, use the root runbook
             transformer.run(
@@ -248,6 +305,22 @@ class RootRunner(Action):
             ):
                 yield runner
 
+    def _expand(
+        self, combinator: Combinator, is_resolved: bool
+    ) -> Optional[
+        Tuple[RunbookBuilder, Optional[schema.Runbook], Dict[str, VariableEntry]]
+    ]:
+        """
+        return the runbook builder, the resolved runbook if it's resolved, and
+        variables of next iteration. Return None, if there is no more iteration.
+        """
+        variables = combinator.fetch(self._runbook_builder.variables)
+        if variables is None:
+            return None
+        sub_runbook_builder = self._runbook_builder.derive(variables=variables)
+        sub_runbook = sub_runbook_builder.resolve() if is_resolved else None
+        return sub_runbook_builder, sub_runbook, variables
+
     def _generate_runners(
         self, runbook: schema.Runbook, variables: Dict[str, VariableEntry]
     ) -> Iterator[BaseRunner]:
@@ -281,6 +354,7 @@ class RootRunner(Action):
                 runbook=runbook,
                 index=self._runner_count,
                 case_variables=case_variables,
+                context=self._context,
             )
             runner.initialize()
             self._runners.append(runner)
@@ -3,7 +3,7 @@
 
 import copy
 from functools import partial
-from typing import Any, Callable, Dict, List, Optional, cast
+from typing import Any, Callable, Dict, List, Optional, Set, cast
 
 from lisa import notifier, schema, search_space
 from lisa.action import ActionStatus
@@ -35,20 +35,30 @@ class LisaRunner(BaseRunner):
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
         super()._initialize(*args, **kwargs)
         self._is_prepared = False
+        # ids of test results, which lost their planned environments by
+        # deployment failures. They are planned on their own environments.
+        self._fallback_result_ids: Set[str] = set()
+
+        # select test cases. The combinator iterations with same filters reuse
+        # the selected test cases.
+        selected_test_cases = self._context.get_or_create(
+            "test_cases",
+            [x.to_dict() for x in self._runbook.testcase],
+            partial(select_testcases, filters=self._runbook.testcase),
+        )
 
-        # select test cases
-        selected_test_cases = select_testcases(filters=self._runbook.testcase)
-
-        # create test results
+        # create test results, the runtime data is cloned, because it's shared.
         self.test_results = [
-            TestResult(f"{self.id}_{index}", runtime_data=case)
+            TestResult(f"{self.id}_{index}", runtime_data=case.clone())
             for index, case in enumerate(selected_test_cases)
         ]
-        # load predefined environments
-        self.platform = load_platform(self._runbook.platform)
-        self.platform.initialize()
-        platform_message = PlatformMessage(name=self.platform.type_name())
-        notifier.notify(platform_message)
+        # load predefined environments. The platform is initialized once for
+        # the same platform runbook.
+        self.platform = self._context.get_or_create(
+            "platform",
+            [x.to_dict() for x in self._runbook.platform],  # type: ignore
+            self._load_platform,
+        )
 
     @property
     def is_done(self) -> bool:
@@ -67,6 +77,10 @@ class LisaRunner(BaseRunner):
         self._prepare_environments(
             platform=self.platform,
         )
+        # capabilities may be changed in place by test cases, so fingerprints
+        # are recomputed once in each scheduling pass.
+        for environment in self.environments:
+            environment.clear_capability_fingerprint()
 
         # sort environments by status
         available_environments = self._sort_environments(self.environments)
@@ -123,6 +137,13 @@ class LisaRunner(BaseRunner):
                 self._delete_environment_task(environment, [])
         super().close()
 
+    def _load_platform(self) -> Platform:
+        platform = load_platform(self._runbook.platform)
+        platform.initialize()
+        platform_message = PlatformMessage(name=platform.type_name())
+        notifier.notify(platform_message)
+        return platform
+
     def _associate_environment_test_results(
         self, environment: Environment, test_results: List[TestResult]
     ) -> Optional[Task[None]]:
@@ -272,9 +293,107 @@ class LisaRunner(BaseRunner):
         prepared_environments.sort(key=lambda x: (not x.is_predefined, x.cost))
 
         self._is_prepared = True
-        self.environments = prepared_environments
+        # all prepared environments are kept, so they can be planned again.
+        self._prepared_environments = prepared_environments
+        self.environments = self._plan_environments(prepared_environments)
         return
 
+    def _plan_environments(self, environments: List[Environment]) -> List[Environment]:
+        """
+        Each generated environment comes from the requirement of a test case,
+        but one environment can often run many compatible cases. The generated
+        environments are planned by a greedy weighted set cover, so the
+        scheduler deploys the fewest and cheapest environments. The ones, whose
+        cases are covered by planned environments, are not deployed. It's
+        planned again after a deployment failure, and the cases of the failed
+        environment go back to the environments generated for them.
+        """
+        # predefined, deployed and deploying environments are kept.
+        candidates = [
+            x
+            for x in environments
+            if x.status == EnvironmentStatus.Prepared
+            and not x.is_predefined
+            and not x.is_in_use
+        ]
+        kept_environments = [x for x in environments if x not in candidates]
+        # cases on new environments need their own environments.
+        test_results = [
+            x
+            for x in self.test_results
+            if x.is_queued and not x.runtime_data.use_new_environment
+        ]
+        if not candidates or not test_results:
+            return environments
+
+        coverages: Dict[str, Set[int]] = {
+            environment.name: {
+                index
+                for index, test_result in enumerate(test_results)
+                if test_result.check_environment(environment)
+            }
+            for environment in candidates
+        }
+        uncovered = set(range(len(test_results)))
+        for environment in kept_environments:
+            if environment.is_alive:
+                uncovered -= {
+                    index
+                    for index, test_result in enumerate(test_results)
+                    if test_result.check_environment(environment)
+                }
+        planned_environments: List[Environment] = []
+        for index, test_result in enumerate(test_results):
+            if (
+                index not in uncovered
+                or test_result.id_ not in self._fallback_result_ids
+            ):
+                continue
+            own_environment = next(
+                (x for x in candidates if x.source_test_result is test_result), None
+            )
+            if own_environment:
+                candidates.remove(own_environment)
+                planned_environments.append(own_environment)
+                uncovered -= coverages[own_environment.name]
+        while uncovered and candidates:
+            # pick the environment, which runs most uncovered cases per cost.
+            # The candidates are sorted by cost, so the cheaper one wins a tie.
+            best_environment: Optional[Environment] = None
+            best_ratio = 0.0
+            for environment in candidates:
+                covered_count = len(coverages[environment.name] & uncovered)
+                ratio = covered_count / max(environment.cost, 1)
+                if ratio > best_ratio:
+                    best_environment = environment
+                    best_ratio = ratio
+            if not best_environment:
+                # the rest cases cannot run on any environment.
+                break
+            candidates.remove(best_environment)
+            planned_environments.append(best_environment)
+            uncovered -= coverages[best_environment.name]
+
+        # keep environments of cases, which are not planned, like cases on new
+        # environments.
+        covered_ids = {
+            x.id_ for index, x in enumerate(test_results) if index not in uncovered
+        }
+        other_environments = [
+            x
+            for x in candidates
+            if not x.source_test_result
+            or (
+                x.source_test_result.is_queued
+                and x.source_test_result.id_ not in covered_ids
+            )
+        ]
+        self._log.debug(
+            f"planned environments: {[x.name for x in planned_environments]}, "
+            f"others: {[x.name for x in other_environments]}"
+        )
+        return kept_environments + planned_environments + other_environments
+
     def _deploy_environment_task(
         self, environment: Environment, test_results: List[TestResult]
     ) -> None:
@@ -297,7 +416,16 @@ class LisaRunner(BaseRunner):
                 result=test_results[0],
                 exception=identifier,
             )
+            # the planned environment may fail by its shape, so its cases go
+            # back to their own environments, and get their own deployment
+            # errors. Other cases keep the plan.
+            self._fallback_result_ids.update(
+                x.id_
+                for x in self.test_results
+                if x.is_queued and x.check_environment(environment)
+            )
             self._delete_environment_task(environment=environment, test_results=[])
+            self.environments = self._plan_environments(self._prepared_environments)
 
     def _initialize_environment_task(
         self, environment: Environment, test_results: List[TestResult]
@@ -18,7 +18,13 @@ from marshmallow import ValidationError, fields, validate
 
 from lisa import search_space
 from lisa.secret import PATTERN_HEADTAIL, add_secret
-from lisa.util import BaseClassMixin, LisaException, constants, field_metadata
+from lisa.util import (
+    BaseClassMixin,
+    LisaException,
+    constants,
+    field_metadata,
+    get_schema,
+)
 
 """
 Schema is dealt with three components,
@@ -157,6 +163,21 @@ class TypedSchema:
     type: str = field(default="", metadata=field_metadata(required=True))
 
 
+@dataclass_json()
+@dataclass
+class TransformerCache:
+    # reuse outputs of a transformer, if it ran with the same inputs before.
+    enabled: bool = True
+    # hours to keep the cached outputs.
+    ttl: float = 24 * 7
+    # other inputs, which decide the outputs, but are not in the runbook. For
+    # example, the commit id of a kernel repo.
+    inputs: List[str] = field(default_factory=list)
+    # the glob patterns of files, which decide the outputs, like patch files.
+    # The content of files is hashed.
+    files: List[str] = field(default_factory=list)
+
+
 @dataclass_json()
 @dataclass
 class Transformer(TypedSchema, ExtendableSchemaMixin):
@@ -168,8 +189,10 @@ class Transformer(TypedSchema, ExtendableSchemaMixin):
     # variable name will be "b_a" in the variable dict
     prefix: str = ""
 
-    # specify which transformers are depended.
-    depends_on: List[str] = field(default_factory=list)
+    # specify which transformers are depended. If it's not specified, it
+    # depends on all transformers before it. If it's an empty list, it doesn't
+    # depend on others, and can run in parallel with them.
+    depends_on: Optional[List[str]] = None
     # rename some of variables for easier use.
     rename: Dict[str, str] = field(default_factory=dict)
     # enable this transformer or not, only enabled transformers run actually.
@@ -185,6 +208,9 @@ class Transformer(TypedSchema, ExtendableSchemaMixin):
             ),
         ),
     )
+    # cache outputs by inputs. It's disabled by default, because many
+    # transformers have side effects, like deploying a VM.
+    cache: Optional[TransformerCache] = None
 
     def __post_init__(self, *args: Any, **kwargs: Any) -> None:
         if not self.name:
@@ -805,6 +831,56 @@ class NodeSpace(search_space.RequirementMixin, TypedSchema, ExtendableSchemaMixi
 
         return result
 
+    def matches(self, capability: Any) -> bool:
+        # keep it consistent with check. The raw features are used, since the
+        # properties create new spaces on each call.
+        assert isinstance(capability, NodeSpace), f"actual: {type(capability)}"
+
+        if (
+            not capability.node_count
+            or not capability.core_count
+            or not capability.memory_mb
+        ):
+            return False
+
+        if isinstance(self.node_count, int) and isinstance(capability.node_count, int):
+            if self.node_count > capability.node_count:
+                return False
+        elif not search_space.matches_countspace(
+            self.node_count, capability.node_count
+        ):
+            return False
+
+        if not (
+            search_space.matches_countspace(self.core_count, capability.core_count)
+            and search_space.matches_countspace(self.memory_mb, capability.memory_mb)
+            and search_space.matches_countspace(self.gpu_count, capability.gpu_count)
+        ):
+            return False
+        if self.disk and not self.disk.matches(capability.disk):
+            return False
+        if self.network_interface and not self.network_interface.matches(
+            capability.network_interface
+        ):
+            return False
+        if self._features:
+            for raw_feature in self._features.items:
+                feature = self._get_or_create_feature_settings(raw_feature)
+                cap_feature = self._find_feature_by_type(
+                    feature.type, capability._features
+                )
+                if not cap_feature or not feature.matches(cap_feature):
+                    return False
+        if self._excluded_features:
+            for raw_feature in self._excluded_features.items:
+                feature = self._get_or_create_feature_settings(raw_feature)
+                if self._find_feature_by_type(
+                    feature.type, capability._excluded_features
+                ):
+                    return False
+
+        return True
+
     def expand_by_node_count(self) -> List[Any]:
         # expand node count in requirement to one,
         # so that's easy to compare equalization later.
@@ -826,9 +902,18 @@ class NodeSpace(search_space.RequirementMixin, TypedSchema, ExtendableSchemaMixi
         return any(feature for feature in self.features if feature.type == find_type)
 
     def _generate_min_capability(self, capability: Any) -> Any:
-        # copy to duplicate extended schema
-        min_value: NodeSpace = copy.deepcopy(self)
         assert isinstance(capability, NodeSpace), f"actual: {type(capability)}"
+        # most fields are replaced below, so a shallow copy is enough. The
+        # extended schema is copied deeply, because platforms fill it on the min
+        # capability.
+        min_value: NodeSpace = copy.copy(self)
+        min_value.extended_schemas = copy.deepcopy(self.extended_schemas)
+        if hasattr(self, "_extended_runbook"):
+            min_value.set_extended_runbook(copy.deepcopy(self._extended_runbook))
+        min_value._features = self._create_feature_settings_list(self._features)
+        min_value._excluded_features = self._create_feature_settings_list(
+            self._excluded_features
+        )
 
         if self.node_count or capability.node_count:
             if isinstance(self.node_count, int) and isinstance(
@@ -1282,7 +1367,7 @@ def load_by_type(schema_type: Type[T], raw_runbook: Any, many: bool = False) ->
     if not isinstance(raw_runbook, dict) and not many:
         raw_runbook = raw_runbook.to_dict()
 
-    result: T = schema_type.schema().load(raw_runbook, many=many)  # type: ignore
+    result: T = get_schema(schema_type).load(raw_runbook, many=many)
     return result
 
 
@@ -1,22 +1,59 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import hashlib
 import sys
-from dataclasses import dataclass, field
-from typing import Any, Iterable, List, Optional, Set, Type, TypeVar, Union
+from collections import OrderedDict
+from dataclasses import dataclass, field, fields, is_dataclass
+from enum import Enum
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from dataclasses_json import dataclass_json
 
-from lisa.util import LisaException, NotMeetRequirementException
+from lisa.util import LisaException, NotMeetRequirementException, get_schema
 
 T = TypeVar("T")
 
+# the extended schemas are not used in checks, so they are not in fingerprints.
+_FINGERPRINT_EXCLUDED_FIELDS = ["extended_schemas"]
+
 
-@dataclass
 class ResultReason:
-    result: bool = True
-    reasons: List[str] = field(default_factory=list)
-    _prefix: str = ""
+    # it's created on each check, so slots are used to save memory and time.
+    __slots__ = ("result", "reasons", "_prefix")
+
+    def __init__(
+        self,
+        result: bool = True,
+        reasons: Optional[List[str]] = None,
+        _prefix: str = "",
+    ) -> None:
+        self.result = result
+        self.reasons: List[str] = reasons if reasons is not None else []
+        self._prefix = _prefix
+
+    def __repr__(self) -> str:
+        return f"ResultReason(result={self.result}, reasons={self.reasons})"
+
+    def __eq__(self, o: object) -> bool:
+        return (
+            isinstance(o, ResultReason)
+            and self.result == o.result
+            and self.reasons == o.reasons
+            and self._prefix == o._prefix
+        )
 
     def append_prefix(self, prefix: str) -> None:
         if self._prefix or prefix:
@@ -51,12 +88,21 @@ class RequirementMixin:
     def check(self, capability: Any) -> ResultReason:
         raise NotImplementedError()
 
+    def matches(self, capability: Any) -> bool:
+        """
+        It's the fast path of check. It returns the result only, and doesn't
+        create reasons. So use check, only when reasons are needed. The
+        subclasses override it, if the check is on the hot path.
+        """
+        return self.check(capability).result
+
     def _generate_min_capability(self, capability: Any) -> Any:
         raise NotImplementedError()
 
     def generate_min_capability(self, capability: Any) -> Any:
-        check_result = self.check(capability)
-        if not check_result.result:
+        if not self.matches(capability):
+            # the reasons are generated only when it's not matched.
+            check_result = self.check(capability)
             raise NotMeetRequirementException(
                 "cannot get min value, capability doesn't support requirement:"
                 f"{check_result.reasons}"
@@ -147,6 +193,23 @@ class IntRange(RequirementMixin):
 
         return result
 
+    def matches(self, capability: Any) -> bool:
+        if capability is None:
+            return False
+        if isinstance(capability, IntRange):
+            return not (
+                capability.max < self.min
+                or (capability.max == self.min and not capability.max_inclusive)
+                or capability.min > self.max
+                or (capability.min == self.max and not self.max_inclusive)
+            )
+        if isinstance(capability, int):
+            return self.min <= capability <= self.max and (
+                self.max_inclusive or capability != self.max
+            )
+        assert isinstance(capability, list), f"actual: {type(capability)}"
+        return any(self.matches(x) for x in capability)
+
     def _generate_min_capability(self, capability: Any) -> int:
         if isinstance(capability, int):
             result: int = capability
@@ -159,8 +222,7 @@ class IntRange(RequirementMixin):
             assert isinstance(capability, list), f"actual: {type(capability)}"
             result = self.max if self.max_inclusive else self.max - 1
             for cap_item in capability:
-                temp_result = self.check(cap_item)
-                if temp_result.result:
+                if self.matches(cap_item):
                     temp_min = self.generate_min_capability(cap_item)
                     result = min(temp_min, result)
 
@@ -182,26 +244,20 @@ def decode_count_space(data: Any) -> Any:
         decoded_data = []
         for item in data:
             if isinstance(item, dict):
-                decoded_data.append(IntRange.schema().load(item))  # type: ignore
+                decoded_data.append(get_schema(IntRange).load(item))
             else:
                 assert isinstance(item, IntRange), f"actual: {type(item)}"
                 decoded_data.append(item)
     else:
         assert isinstance(data, dict), f"actual: {type(data)}"
-        decoded_data = IntRange.schema().load(data)  # type: ignore
+        decoded_data = get_schema(IntRange).load(data)
     return decoded_data
 
 
 def _one_of_matched(requirement: Any, capabilities: List[Any]) -> ResultReason:
     result = ResultReason()
-    supported = False
     assert isinstance(requirement, RequirementMixin), f"actual: {type(requirement)}"
-    for cap_item in capabilities:
-        temp_result = requirement.check(cap_item)
-        if temp_result.result:
-            supported = True
-            break
-    if not supported:
+    if not any(requirement.matches(x) for x in capabilities):
         result.add_reason("no one meeting requirement")
 
     return result
@@ -266,6 +322,13 @@ class SetSpace(RequirementMixin, Set[T]):
                     result.add_reason(f"requirements excludes {names}")
         return result
 
+    def matches(self, capability: Any) -> bool:
+        assert isinstance(capability, SetSpace), f"actual: {type(capability)}"
+        assert capability.is_allow_set, "capability must be allow set"
+        if self.is_allow_set:
+            return capability.issuperset(self)
+        return self.isdisjoint(capability)
+
     def _generate_min_capability(self, capability: Any) -> Optional[Set[T]]:
         result = None
         if self.is_allow_set and len(self) > 0:
@@ -289,7 +352,7 @@ def decode_set_space(data: Any) -> Any:
     """
     result = None
     if data:
-        result = SetSpace.schema().load(data)  # type: ignore
+        result = get_schema(SetSpace).load(data)
     return result
 
 
@@ -326,8 +389,7 @@ def check_countspace(requirement: CountSpace, capability: CountSpace) -> ResultR
                             f"capability: {capability}"
                         )
                 elif isinstance(capability, IntRange):
-                    temp_result = capability.check(requirement)
-                    if not temp_result.result:
+                    if not capability.matches(requirement):
                         result.add_reason(
                             "requirement is a number, capability should include it, "
                             f"but requirement: {requirement}, capability: {capability}"
@@ -346,12 +408,7 @@ def check_countspace(requirement: CountSpace, capability: CountSpace) -> ResultR
             else:
                 assert isinstance(requirement, list), f"actual: {type(requirement)}"
 
-                supported = False
-                for req_item in requirement:
-                    temp_result = req_item.check(capability)
-                    if temp_result.result:
-                        supported = True
-                if not supported:
+                if not any(x.matches(capability) for x in requirement):
                     result.add_reason(
                         "no capability matches requirement, "
                         f"requirement: {requirement}, capability: {capability}"
@@ -359,11 +416,32 @@ def check_countspace(requirement: CountSpace, capability: CountSpace) -> ResultR
     return result
 
 
+def matches_countspace(requirement: CountSpace, capability: CountSpace) -> bool:
+    """
+    The fast path of check_countspace, it returns the result only.
+    """
+    if requirement is None:
+        return True
+    if capability is None:
+        return False
+    if isinstance(requirement, int):
+        if isinstance(capability, int):
+            return requirement == capability
+        if isinstance(capability, IntRange):
+            return capability.matches(requirement)
+        assert isinstance(capability, list), f"actual: {type(capability)}"
+        temp_requirement = IntRange(min=requirement, max=requirement)
+        return any(temp_requirement.matches(x) for x in capability)
+    if isinstance(requirement, IntRange):
+        return requirement.matches(capability)
+    assert isinstance(requirement, list), f"actual: {type(requirement)}"
+    return any(x.matches(capability) for x in requirement)
+
+
 def generate_min_capability_countspace(
     requirement: CountSpace, capability: CountSpace
 ) -> int:
-    check_result = check_countspace(requirement, capability)
-    if not check_result.result:
+    if not matches_countspace(requirement, capability):
         raise NotMeetRequirementException(
             "cannot get min value, capability doesn't support requirement"
         )
@@ -381,8 +459,7 @@ def generate_min_capability_countspace(
         assert isinstance(requirement, list), f"actual: {type(requirement)}"
         result = sys.maxsize
         for req_item in requirement:
-            temp_result = req_item.check(capability)
-            if temp_result.result:
+            if req_item.matches(capability):
                 temp_min = req_item.generate_min_capability(capability)
                 result = min(result, temp_min)
 
@@ -416,13 +493,32 @@ def check_setspace(
     return result
 
 
+def matches_setspace(
+    requirement: Optional[Union[SetSpace[T], T]],
+    capability: Optional[Union[SetSpace[T], T]],
+) -> bool:
+    """
+    The fast path of check_setspace, it returns the result only.
+    """
+    if capability is None:
+        return False
+    if requirement is None:
+        return True
+    if isinstance(requirement, SetSpace):
+        requirement_items: Iterable[T] = requirement
+    else:
+        requirement_items = [requirement]
+    if isinstance(capability, SetSpace):
+        return any(x in capability for x in requirement_items)
+    return any(x == capability for x in requirement_items)
+
+
 def generate_min_capability_setspace_from_priority(
     requirement: Optional[Union[SetSpace[T], T]],
     capability: Optional[Union[SetSpace[T], T]],
     priority_list: List[T],
 ) -> T:
-    check_result = check_setspace(requirement, capability)
-    if not check_result.result:
+    if not matches_setspace(requirement, capability):
         raise NotMeetRequirementException(
             "cannot get min value, capability doesn't support requirement"
         )
@@ -478,12 +574,7 @@ def check(
                 f"capability shouldn't be None, requirement: [{requirement}]"
             )
         elif isinstance(requirement, (list)):
-            supported = False
-            for req_item in requirement:
-                temp_result = req_item.check(capability)
-                if temp_result.result:
-                    supported = True
-            if not supported:
+            if not any(x.matches(capability) for x in requirement):
                 result.add_reason(
                     "no capability meet any of requirement, "
                     f"requirement: {requirement}, capability: {capability}"
@@ -493,12 +584,27 @@ def check(
     return result
 
 
+def matches(
+    requirement: Union[T_SEARCH_SPACE, List[T_SEARCH_SPACE], None],
+    capability: Union[T_SEARCH_SPACE, List[T_SEARCH_SPACE], None],
+) -> bool:
+    """
+    The fast path of check, it returns the result only.
+    """
+    if requirement is None:
+        return True
+    if capability is None:
+        return False
+    if isinstance(requirement, list):
+        return any(x.matches(capability) for x in requirement)
+    return requirement.matches(capability)
+
+
 def generate_min_capability(
     requirement: Union[T_SEARCH_SPACE, List[T_SEARCH_SPACE], None],
     capability: Union[T_SEARCH_SPACE, List[T_SEARCH_SPACE], None],
 ) -> Any:
-    check_result = check(requirement, capability)
-    if not check_result.result:
+    if not matches(requirement, capability):
         raise NotMeetRequirementException(
             "cannot get min value, capability doesn't support requirement"
         )
@@ -510,8 +616,7 @@ def generate_min_capability(
     if isinstance(requirement, list):
         result = None
         for req_item in requirement:
-            temp_result = req_item.check(capability)
-            if temp_result.result:
+            if req_item.matches(capability):
                 temp_min = req_item.generate_min_capability(capability)
                 if result is None:
                     result = temp_min
@@ -557,3 +662,110 @@ def create_set_space(
     else:
         set_space = None
     return set_space
+
+
+def get_fingerprint(value: Any) -> str:
+    """
+    return a canonical hash of a search space, like a requirement or a
+    capability. Equal spaces have the same fingerprint, no matter the order of
+    set items, so it can be used as a cache key of check results.
+    """
+    return hashlib.sha256(_get_canonical_text(value).encode("utf-8")).hexdigest()
+
+
+def _get_canonical_text(value: Any) -> str:
+    if isinstance(value, SetSpace):
+        items = sorted(_get_canonical_text(x) for x in value)
+        return f"SetSpace({value.is_allow_set},{{{','.join(items)}}})"
+    if isinstance(value, (list, tuple)):
+        return f"[{','.join(_get_canonical_text(x) for x in value)}]"
+    if isinstance(value, Enum):
+        return f"{type(value).__qualname__}.{value.name}"
+    if isinstance(value, type):
+        return f"{value.__module__}.{value.__qualname__}"
+    if is_dataclass(value):
+        fields_text = ",".join(
+            f"{x.name}={_get_canonical_text(getattr(value, x.name))}"
+            for x in fields(value)
+            if x.name not in _FINGERPRINT_EXCLUDED_FIELDS
+        )
+        value_type = type(value)
+        return f"{value_type.__module__}.{value_type.__qualname__}({fields_text})"
+    return repr(value)
+
+
+class CachedFingerprint:
+    """
+    It holds the fingerprint of a search space, which is built from source
+    objects. The fingerprint is recomputed when any source object is replaced,
+    or after it's cleared. The sources are kept, so their identities are not
+    reused by new objects.
+    """
+
+    def __init__(self) -> None:
+        self._fingerprint = ""
+        self._sources: List[Any] = []
+
+    def get(self, sources: List[Any], create_space: Callable[[], Any]) -> str:
+        if len(sources) != len(self._sources) or any(
+            x is not y for x, y in zip(sources, self._sources)
+        ):
+            self._fingerprint = get_fingerprint(create_space())
+            self._sources = sources
+        return self._fingerprint
+
+    def clear(self) -> None:
+        """
+        Source objects may be changed in place, which cannot be detected by
+        identities. Clear it, so the fingerprint is recomputed on next get.
+        """
+        self._fingerprint = ""
+        self._sources = []
+
+
+class CheckResultCache:
+    """
+    A bounded LRU cache of check results. It's keyed by fingerprints of
+    requirements and capabilities, so a changed capability gets a new key, and
+    the stale results are evicted over time.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self._max_size = max_size
+        self._results: "OrderedDict[Tuple[str, str], ResultReason]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get_or_check(
+        self,
+        requirement_key: str,
+        capability_key: str,
+        requirement: RequirementMixin,
+        create_capability: Callable[[], Any],
+    ) -> ResultReason:
+        """
+        return a copy of the cached result, so callers can merge into it.
+        """
+        key = (requirement_key, capability_key)
+        with self._lock:
+            result = self._results.get(key, None)
+            if result is not None:
+                self._results.move_to_end(key)
+        if result is None:
+            capability = create_capability()
+            if requirement.matches(capability):
+                result = ResultReason()
+            else:
+                # the reasons are generated only when it's not matched.
+                result = requirement.check(capability)
+            with self._lock:
+                self._results[key] = result
+                while len(self._results) > self._max_size:
+                    self._results.popitem(last=False)
+        return ResultReason(result=result.result, reasons=list(result.reasons))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
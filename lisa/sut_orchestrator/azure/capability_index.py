@@ -0,0 +1,216 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from bisect import bisect_left, bisect_right
+from enum import Enum
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+
+from lisa import schema, search_space
+
+from .capability_store import CapabilityRecord
+
+
+class _CountIndex:
+    """
+    Sorted values of a count field. Capabilities, which are not a number, are
+    always returned as candidates.
+    """
+
+    def __init__(self, values: List[Optional[int]]) -> None:
+        sorted_pairs: List[Tuple[int, int]] = sorted(
+            (value, index) for index, value in enumerate(values) if value is not None
+        )
+        self._values: List[int] = [x[0] for x in sorted_pairs]
+        self._indexes: List[int] = [x[1] for x in sorted_pairs]
+        self._others: Set[int] = {
+            index for index, value in enumerate(values) if value is None
+        }
+
+    def find(self, requirement: search_space.CountSpace) -> Optional[Set[int]]:
+        """
+        return indexes of capabilities, which may meet the requirement. None means
+        no filter.
+        """
+        bounds = _get_bounds(requirement)
+        if bounds is None:
+            return None
+        start = bisect_left(self._values, bounds[0])
+        end = bisect_right(self._values, bounds[1])
+        return self._others.union(self._indexes[start:end])
+
+
+class CapabilityIndex:
+    """
+    It prunes capabilities by core count, memory, gpu count, features and disk
+    types, before the full check of NodeSpace. The pruning is conservative, so
+    the full check is still needed on candidates, but it runs on much less
+    capabilities.
+
+    The disk types are pruned only for disk requirements of disk_settings_type,
+    because the base disk settings doesn't check disk types.
+
+    It's built from records of the capability store, so capabilities don't need
+    to be parsed before pruning.
+    """
+
+    def __init__(
+        self,
+        records: List[CapabilityRecord],
+        disk_settings_type: Optional[Type[schema.DiskOptionSettings]] = None,
+    ) -> None:
+        self._count = len(records)
+        self._disk_settings_type = disk_settings_type
+        self._name_map: Dict[str, int] = {}
+        for index, record in enumerate(records):
+            # the first one wins, if there are duplicate names.
+            self._name_map.setdefault(record.vm_size.lower(), index)
+
+        self._core_count = _CountIndex([x.core_count for x in records])
+        self._memory_mb = _CountIndex([x.memory_mb for x in records])
+        self._gpu_count = _CountIndex([x.gpu_count for x in records])
+
+        self._feature_bits: Dict[str, int] = {}
+        self._feature_masks: List[int] = [
+            self._to_mask(x.features, self._feature_bits) for x in records
+        ]
+
+        self._disk_type_bits: Dict[Any, int] = {}
+        # None means unknown, and it's not filtered.
+        self._disk_type_masks: List[Optional[int]] = [
+            None
+            if x.disk_types is None
+            else self._to_mask(x.disk_types, self._disk_type_bits)
+            for x in records
+        ]
+
+    def get_by_name(self, name: str) -> Optional[int]:
+        return self._name_map.get(name.lower(), None)
+
+    def find(self, requirement: schema.NodeSpace) -> List[int]:
+        """
+        return sorted indexes of capabilities, which may meet the requirement.
+        """
+        candidates: Optional[Set[int]] = None
+        for count_index, count_requirement in [
+            (self._core_count, requirement.core_count),
+            (self._memory_mb, requirement.memory_mb),
+            (self._gpu_count, requirement.gpu_count),
+        ]:
+            found = count_index.find(count_requirement)
+            if found is not None:
+                candidates = found if candidates is None else candidates & found
+                if not candidates:
+                    return []
+        if candidates is None:
+            candidates = set(range(self._count))
+
+        if requirement.features:
+            feature_mask = 0
+            for feature in requirement.features:
+                bit = self._feature_bits.get(feature.type, None)
+                if bit is None:
+                    # no capability has this feature.
+                    return []
+                feature_mask |= bit
+            candidates = {
+                x
+                for x in candidates
+                if self._feature_masks[x] & feature_mask == feature_mask
+            }
+
+        disk_types = (
+            _get_disk_types(requirement)
+            if self._disk_settings_type
+            and isinstance(requirement.disk, self._disk_settings_type)
+            else None
+        )
+        if disk_types:
+            disk_type_mask = self._to_mask(disk_types, self._disk_type_bits, False)
+            candidates = {
+                x
+                for x in candidates
+                if self._disk_type_masks[x] is None
+                or self._disk_type_masks[x] & disk_type_mask  # type: ignore
+            }
+
+        return sorted(candidates)
+
+    def _to_mask(
+        self, items: List[Any], bits: Dict[Any, int], add_missing: bool = True
+    ) -> int:
+        mask = 0
+        for item in items:
+            bit = bits.get(item, None)
+            if bit is None:
+                if not add_missing:
+                    continue
+                bit = 1 << len(bits)
+                bits[item] = bit
+            mask |= bit
+        return mask
+
+
+def create_capability_record(
+    vm_size: str,
+    capability: schema.NodeSpace,
+    estimated_cost: int = 0,
+    data: Optional[Dict[str, Any]] = None,
+) -> CapabilityRecord:
+    """
+    summarize a capability to the record, which is saved in the capability store
+    and indexed.
+    """
+    return CapabilityRecord(
+        vm_size=vm_size,
+        estimated_cost=estimated_cost,
+        core_count=_get_count(capability.core_count),
+        memory_mb=_get_count(capability.memory_mb),
+        gpu_count=_get_count(capability.gpu_count),
+        features=[x.type for x in capability.features] if capability.features else [],
+        disk_types=_get_disk_types(capability),
+        data=data or {},
+    )
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _get_count(count_space: search_space.CountSpace) -> Optional[int]:
+    # the count of a vm size is a number in most cases.
+    if _is_int(count_space):
+        assert isinstance(count_space, int)
+        return count_space
+    return None
+
+
+def _get_bounds(count_space: search_space.CountSpace) -> Optional[Tuple[int, int]]:
+    if count_space is None:
+        return None
+    if _is_int(count_space):
+        assert isinstance(count_space, int)
+        return count_space, count_space
+    if isinstance(count_space, search_space.IntRange):
+        return (
+            count_space.min,
+            count_space.max if count_space.max_inclusive else count_space.max - 1,
+        )
+    assert isinstance(count_space, list), f"actual: {type(count_space)}"
+    if not count_space:
+        return None
+    ranges = [_get_bounds(x) for x in count_space]
+    return (
+        min(x[0] for x in ranges if x),
+        max(x[1] for x in ranges if x),
+    )
+
+
+def _get_disk_types(node_space: schema.NodeSpace) -> Optional[List[str]]:
+    disk = node_space.disk
+    disk_type = getattr(disk, "disk_type", None) if disk else None
+    if disk_type is None:
+        return None
+    if not isinstance(disk_type, search_space.SetSpace):
+        disk_type = [disk_type]
+    # the names are saved in the capability store.
+    return [x.value if isinstance(x, Enum) else str(x) for x in disk_type]
@@ -0,0 +1,228 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import sqlite3
+import zlib
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# wait for the write lock of other processes.
+_BUSY_TIMEOUT = 60
+# increase it, when tables are changed. The store is a cache, so tables of other
+# versions are dropped and queried again.
+_SCHEMA_VERSION = 3
+# the max count of variables in a sql statement is 999 in old sqlite versions.
+_MAX_VARIABLES = 900
+
+_create_tables_sql = [
+    """
+    CREATE TABLE IF NOT EXISTS locations (
+        location TEXT PRIMARY KEY,
+        updated_time TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS capabilities (
+        location TEXT NOT NULL,
+        vm_size TEXT NOT NULL,
+        estimated_cost INTEGER NOT NULL,
+        core_count INTEGER,
+        memory_mb INTEGER,
+        gpu_count INTEGER,
+        features TEXT NOT NULL,
+        disk_types TEXT,
+        data BLOB NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS capabilities_vm_size ON capabilities "
+    "(location, vm_size)",
+]
+_drop_tables_sql = [
+    "DROP TABLE IF EXISTS capabilities",
+    "DROP TABLE IF EXISTS locations",
+]
+
+
+@dataclass
+class CapabilityRecord:
+    """
+    The summary of a vm size, which is enough to build the capability index
+    without parsing the capability. The counts are None, if they are not a
+    number. The disk types are None, if they are unknown.
+    """
+
+    vm_size: str
+    estimated_cost: int = 0
+    core_count: Optional[int] = None
+    memory_mb: Optional[int] = None
+    gpu_count: Optional[int] = None
+    features: List[str] = field(default_factory=list)
+    disk_types: Optional[List[str]] = None
+    # the serialized AzureCapability. It's not loaded with the summary.
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+class AzureCapabilityStore:
+    """
+    A SQLite store of vm size capabilities of locations. It's shared by LISA
+    processes on the same machine. The WAL journal mode allows other processes to
+    read, when a location is refreshing. A location is replaced in one
+    transaction, so readers never see partial data.
+
+    The summary of vm sizes are columns, so the capability index can be built
+    from them. The full capability is compressed json, and it's loaded only for
+    vm sizes, which are used.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("BEGIN IMMEDIATE")
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+            if version != _SCHEMA_VERSION:
+                for sql in _drop_tables_sql:
+                    connection.execute(sql)
+                connection.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+            for sql in _create_tables_sql:
+                connection.execute(sql)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def get_updated_time(self, location: str) -> Optional[datetime]:
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT updated_time FROM locations WHERE location = ?", (location,)
+            ).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def load(self, location: str) -> Optional[Tuple[datetime, List[CapabilityRecord]]]:
+        """
+        return the updated time and records of a location. The records have no
+        data, use load_data to get it. If the location is not in store, return
+        None.
+        """
+        with self._connect() as connection:
+            # read in one transaction to get a consistent snapshot.
+            connection.execute("BEGIN")
+            row = connection.execute(
+                "SELECT updated_time FROM locations WHERE location = ?", (location,)
+            ).fetchone()
+            if not row:
+                return None
+            record_rows = connection.execute(
+                "SELECT vm_size, estimated_cost, core_count, memory_mb, gpu_count, "
+                "features, disk_types FROM capabilities WHERE location = ? "
+                # keep the order of saving.
+                "ORDER BY rowid",
+                (location,),
+            ).fetchall()
+        return (
+            datetime.fromisoformat(row[0]),
+            [
+                CapabilityRecord(
+                    vm_size=x[0],
+                    estimated_cost=x[1],
+                    core_count=x[2],
+                    memory_mb=x[3],
+                    gpu_count=x[4],
+                    features=self._decode_names(x[5]),
+                    disk_types=None if x[6] is None else self._decode_names(x[6]),
+                )
+                for x in record_rows
+            ],
+        )
+
+    def load_data(
+        self, location: str, vm_sizes: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        return serialized capabilities of vm sizes. The vm sizes, which are not
+        in store, are not returned.
+        """
+        result: Dict[str, Dict[str, Any]] = {}
+        with self._connect() as connection:
+            for start in range(0, len(vm_sizes), _MAX_VARIABLES):
+                chunk = vm_sizes[start : start + _MAX_VARIABLES]
+                rows = connection.execute(
+                    "SELECT vm_size, data FROM capabilities WHERE location = ? "
+                    f"AND vm_size IN ({','.join('?' * len(chunk))})",
+                    (location, *chunk),
+                ).fetchall()
+                result.update((x[0], self._decode(x[1])) for x in rows)
+        return result
+
+    def save(
+        self, location: str, updated_time: datetime, records: List[CapabilityRecord]
+    ) -> None:
+        with self._connect() as connection:
+            # take the write lock at beginning, so concurrent refreshing in other
+            # processes are serialized.
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(
+                "DELETE FROM capabilities WHERE location = ?", (location,)
+            )
+            connection.executemany(
+                "INSERT INTO capabilities (location, vm_size, estimated_cost, "
+                "core_count, memory_mb, gpu_count, features, disk_types, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        location,
+                        x.vm_size,
+                        x.estimated_cost,
+                        x.core_count,
+                        x.memory_mb,
+                        x.gpu_count,
+                        self._encode_names(x.features),
+                        None
+                        if x.disk_types is None
+                        else self._encode_names(x.disk_types),
+                        self._encode(x.data),
+                    )
+                    for x in records
+                ],
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO locations (location, updated_time) "
+                "VALUES (?, ?)",
+                (location, updated_time.isoformat()),
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # a new connection each time, so it's safe to be used in threads. The
+        # transactions are controlled explicitly.
+        connection = sqlite3.connect(
+            str(self._path), timeout=_BUSY_TIMEOUT, isolation_level=None
+        )
+        try:
+            yield connection
+            if connection.in_transaction:
+                connection.execute("COMMIT")
+        except Exception:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    def _encode_names(self, names: List[str]) -> str:
+        return ",".join(names)
+
+    def _decode_names(self, raw: str) -> List[str]:
+        return [x for x in raw.split(",") if x]
+
+    def _encode(self, data: Dict[str, Any]) -> bytes:
+        return zlib.compress(json.dumps(data).encode("utf-8"))
+
+    def _decode(self, raw: bytes) -> Dict[str, Any]:
+        result: Dict[str, Any] = json.loads(zlib.decompress(raw).decode("utf-8"))
+        return result
@@ -6,8 +6,10 @@ import sys
 from dataclasses import InitVar, dataclass, field
 from threading import Lock
 from time import sleep
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
+import requests
+from azure.core.pipeline.transport import RequestsTransport
 from azure.mgmt.compute import ComputeManagementClient  # type: ignore
 from azure.mgmt.marketplaceordering import MarketplaceOrderingAgreements  # type: ignore
 from azure.mgmt.network import NetworkManagementClient  # type: ignore
@@ -40,11 +42,22 @@ AZURE_SHARED_RG_NAME = "lisa_shared_resource"
 # to prevent it happens.
 global_credential_access_lock = Lock()
 
+# SDK clients are cached by type, credential, subscription and other arguments,
+# so their pipelines and tokens are reused. All clients share one http session,
+# so connections to the same endpoint are pooled.
+_CLIENT_POOL_SIZE = 64
+_clients: Dict[Tuple[Any, ...], Any] = {}
+_clients_lock = Lock()
+_shared_session: Optional[requests.Session] = None
+
 
 @dataclass
 class EnvironmentContext:
     resource_group_name: str = ""
     resource_group_is_created: bool = False
+    # the shape key of a pooled environment. It's set, if the environment is
+    # leased from the pool, or can be returned to the pool.
+    pool_key: str = ""
 
 
 @dataclass
@@ -270,15 +283,17 @@ class AzureNodeSchema:
 def get_compute_client(
     platform: "AzurePlatform", api_version: Optional[str] = None
 ) -> ComputeManagementClient:
-    return ComputeManagementClient(
+    return _get_client(
+        ComputeManagementClient,
         credential=platform.credential,
         subscription_id=platform.subscription_id,
         api_version=api_version,
     )
 
 
-def get_network_client(platform: "AzurePlatform") -> ComputeManagementClient:
-    return NetworkManagementClient(
+def get_network_client(platform: "AzurePlatform") -> NetworkManagementClient:
+    return _get_client(
+        NetworkManagementClient,
         credential=platform.credential,
         subscription_id=platform.subscription_id,
     )
@@ -287,7 +302,8 @@ def get_network_client(platform: "AzurePlatform") -> ComputeManagementClient:
 def get_storage_client(
     credential: Any, subscription_id: str
 ) -> StorageManagementClient:
-    return StorageManagementClient(
+    return _get_client(
+        StorageManagementClient,
         credential=credential,
         subscription_id=subscription_id,
     )
@@ -296,11 +312,18 @@ def get_storage_client(
 def get_resource_management_client(
     credential: Any, subscription_id: str
 ) -> ResourceManagementClient:
-    return ResourceManagementClient(
-        credential=credential, subscription_id=subscription_id
+    return _get_client(
+        ResourceManagementClient,
+        credential=credential,
+        subscription_id=subscription_id,
     )
 
 
+def clear_clients() -> None:
+    with _clients_lock:
+        _clients.clear()
+
+
 def get_storage_account_name(
     subscription_id: str, location: str, type: str = "s"
 ) -> str:
@@ -312,7 +335,8 @@ def get_storage_account_name(
 def get_marketplace_ordering_client(
     platform: "AzurePlatform",
 ) -> MarketplaceOrderingAgreements:
-    return MarketplaceOrderingAgreements(
+    return _get_client(
+        MarketplaceOrderingAgreements,
         credential=platform.credential,
         subscription_id=platform.subscription_id,
     )
@@ -441,19 +465,20 @@ def check_or_create_resource_group(
     location: str,
     log: Logger,
 ) -> None:
-    with get_resource_management_client(credential, subscription_id) as rm_client:
-        global global_credential_access_lock
+    # the client is cached, so don't close it by a with statement.
+    rm_client = get_resource_management_client(credential, subscription_id)
+    global global_credential_access_lock
+    with global_credential_access_lock:
+        az_shared_rg_exists = rm_client.resource_groups.check_existence(
+            resource_group_name
+        )
+    if not az_shared_rg_exists:
+        log.info(f"Creating Resource group: '{resource_group_name}'")
+
         with global_credential_access_lock:
-            az_shared_rg_exists = rm_client.resource_groups.check_existence(
-                resource_group_name
+            rm_client.resource_groups.create_or_update(
+                resource_group_name, {"location": location}
             )
-        if not az_shared_rg_exists:
-            log.info(f"Creating Resource group: '{resource_group_name}'")
-
-            with global_credential_access_lock:
-                rm_client.resource_groups.create_or_update(
-                    resource_group_name, {"location": location}
-                )
 
 
 def wait_copy_blob(
@@ -465,17 +490,43 @@ def wait_copy_blob(
     log.info(f"copying vhd: {vhd_path}")
 
     timeout_timer = create_timer()
+    # the copy is very slow, it may need several minutes. The delay of checking
+    # grows, because there are many copies in parallel.
+    delay: float = 2
+    last_progress = ""
     while timeout_timer.elapsed(False) < timeout:
         props = blob_client.get_blob_properties()
         if props.copy.status == "success":
             break
-        # the copy is very slow, it may need several minutes. check it every
-        # 2 seconds.
-        sleep(2)
+        if props.copy.status in ["aborted", "failed"]:
+            raise LisaException(
+                f"failed to copy vhd: {vhd_path}, status: {props.copy.status}, "
+                f"{props.copy.status_description}"
+            )
+        progress = _format_copy_progress(props.copy.progress)
+        if progress and progress != last_progress:
+            log.debug(f"copying vhd: {progress}")
+            last_progress = progress
+        check_cancelled()
+        sleep(delay)
+        delay = min(delay * 1.5, 10)
     if timeout_timer.elapsed() >= timeout:
         raise LisaException(f"wait copying VHD timeout: {vhd_path}")
 
-    log.debug("vhd copied")
+    log.debug(f"vhd copied in {timeout_timer}")
+
+
+def _format_copy_progress(progress: Optional[str]) -> str:
+    # the progress is like "copied bytes/total bytes".
+    if not progress or "/" not in progress:
+        return ""
+    copied, total = progress.split("/", 1)
+    if not copied.isdigit() or not total.isdigit() or not int(total):
+        return progress
+    return (
+        f"{int(copied) * 100 / int(total):.1f}% "
+        f"({int(copied) >> 20}/{int(total) >> 20} MB)"
+    )
 
 
 def get_share_service_client(
@@ -628,3 +679,39 @@ class DataDisk:
             return iops_dict[min_iops]
         else:
             raise LisaException(f"Data disk type {disk_type} is unsupported.")
+
+
+def _get_client(
+    client_type: Any, credential: Any, subscription_id: str, **kwargs: Any
+) -> Any:
+    # the credential object is a part of key, so clients of different
+    # credentials are not mixed.
+    key = (client_type, credential, subscription_id, tuple(sorted(kwargs.items())))
+    with _clients_lock:
+        client = _clients.get(key, None)
+        if client is None:
+            client = client_type(
+                credential=credential,
+                subscription_id=subscription_id,
+                transport=RequestsTransport(
+                    session=_get_shared_session(), session_owner=False
+                ),
+                **kwargs,
+            )
+            _clients[key] = client
+    return client
+
+
+def _get_shared_session() -> requests.Session:
+    # it's called in the lock of clients.
+    global _shared_session
+    if not _shared_session:
+        session = requests.Session()
+        # the default pool size is 10, it's too small for parallel runs.
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=_CLIENT_POOL_SIZE, pool_maxsize=_CLIENT_POOL_SIZE
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _shared_session = session
+    return _shared_session
@@ -0,0 +1,74 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from concurrent.futures import Future
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Generic, List, Tuple, TypeVar
+
+T_ITEM = TypeVar("T_ITEM")
+
+# It deploys a batch of items, and returns a result or an exception of each
+# item in the same order.
+BatchDeployer = Callable[[str, List[T_ITEM]], List[Any]]
+
+
+class _Batch(Generic[T_ITEM]):
+    def __init__(self) -> None:
+        self.items: List[Tuple[T_ITEM, "Future[Any]"]] = []
+        self.full = Event()
+
+
+class DeploymentBatcher(Generic[T_ITEM]):
+    """
+    It coalesces concurrent deployments with the same key into one batch. The
+    first requester of a batch waits for more requesters until the batch is
+    full or the wait time is up, and then deploys the batch. Other requesters
+    wait for their results of the batch.
+    """
+
+    def __init__(
+        self, deployer: BatchDeployer[T_ITEM], max_size: int, wait_time: float
+    ) -> None:
+        assert max_size > 1, f"batch size must be greater than 1, actual: {max_size}"
+        self._deployer = deployer
+        self._max_size = max_size
+        self._wait_time = wait_time
+        self._lock = Lock()
+        self._batches: Dict[str, _Batch[T_ITEM]] = {}
+
+    def deploy(self, key: str, item: T_ITEM) -> Any:
+        future: "Future[Any]" = Future()
+        with self._lock:
+            batch = self._batches.get(key, None)
+            is_leader = batch is None
+            if batch is None:
+                batch = _Batch[T_ITEM]()
+                self._batches[key] = batch
+            batch.items.append((item, future))
+            if len(batch.items) >= self._max_size:
+                # a new batch is started by next requester.
+                self._batches.pop(key)
+                batch.full.set()
+
+        if is_leader:
+            batch.full.wait(self._wait_time)
+            with self._lock:
+                if self._batches.get(key, None) is batch:
+                    self._batches.pop(key)
+            self._deploy_batch(key, batch)
+        return future.result()
+
+    def _deploy_batch(self, key: str, batch: _Batch[T_ITEM]) -> None:
+        try:
+            results = self._deployer(key, [x[0] for x in batch.items])
+            assert len(results) == len(
+                batch.items
+            ), f"expected {len(batch.items)} results, actual: {len(results)}"
+        except Exception as identifier:
+            # the whole batch failed.
+            results = [identifier] * len(batch.items)
+        for (_, future), result in zip(batch.items, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -2,28 +2,34 @@
 # Licensed under the MIT license.
 
 import copy
+import hashlib
 import json
 import logging
 import os
 import re
+from concurrent.futures import Future
 from copy import deepcopy
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta
 from difflib import SequenceMatcher
+from functools import partial
 from pathlib import Path
-from threading import Lock
+from threading import Lock, Thread
 from types import SimpleNamespace
-from typing import Any, Dict, List, Optional, Tuple, Type, Union
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type, Union
 
 from azure.core.exceptions import HttpResponseError
 from azure.identity import DefaultAzureCredential
+from azure.mgmt.compute import ComputeManagementClient  # type: ignore
 from azure.mgmt.compute.models import (  # type: ignore
+    DiskCreateOption,
     PurchasePlan,
     ResourceSku,
     VirtualMachine,
     VirtualMachineImage,
 )
 from azure.mgmt.marketplaceordering.models import AgreementTerms  # type: ignore
+from azure.mgmt.network import NetworkManagementClient  # type: ignore
 from azure.mgmt.network.models import NetworkInterface, PublicIPAddress  # type: ignore
 from azure.mgmt.resource import SubscriptionClient  # type: ignore
 from azure.mgmt.resource.resources.models import (  # type: ignore
@@ -50,13 +56,18 @@ from lisa.util import (
     field_metadata,
     get_matched_str,
     get_public_key_data,
+    hookimpl,
     plugin_manager,
     set_filtered_fields,
 )
 from lisa.util.logger import Logger
+from lisa.util.parallel import Task, TaskManager
+from lisa.util.shell import wait_tcp_port_ready
 
 from .. import AZURE
-from . import features
+from . import features, hooks  # noqa: F401
+from .capability_index import CapabilityIndex, create_capability_record
+from .capability_store import AzureCapabilityStore, CapabilityRecord
 from .common import (
     AZURE_SHARED_RG_NAME,
     AzureNodeSchema,
@@ -78,6 +89,9 @@ from .common import (
     wait_copy_blob,
     wait_operation,
 )
+from .deployment_batch import DeploymentBatcher
+from .pool import EnvironmentPool
+from .reaper import DeletionJournal, DeletionReaper
 from .tools import VmGeneration, Waagent
 
 # used by azure
@@ -147,8 +161,30 @@ SAS_URL_PATTERN = re.compile(
     r"st=.*?&se=(?P<year>[\d]{4})-(?P<month>[\d]{2})-(?P<day>[\d]{2}).*?&sig=.*$"
 )
 SAS_COPIED_CONTAINER_NAME = "lisa-sas-copied"
+CAPABILITY_STORE_FILE_NAME = "azure_capabilities.db"
+DELETION_JOURNAL_FILE_NAME = "azure_deletions.db"
+VALIDATED_DEPLOYMENTS_FILE_NAME = "azure_validated_deployments.json"
+POOL_JOURNAL_FILE_NAME = "azure_pool.db"
+POOL_RESET_NONE = "none"
+POOL_RESET_REBOOT = "reboot"
+POOL_RESET_SNAPSHOT = "snapshot"
+POOL_SNAPSHOT_POSTFIX = "-pool-snapshot"
+# seconds to wait ssh port of a leased vm, before it's considered unhealthy.
+POOL_HEALTH_CHECK_TIMEOUT = 60
+# a validated deployment shape isn't validated again in this period.
+VALIDATION_CACHE_TIMEOUT = timedelta(hours=1)
+# the parameters, which are different in each deployment, but don't change the
+# shape of deployment.
+_DEPLOYMENT_KEY_EXCLUDED_PARAMETERS = [
+    "admin_username",
+    "admin_password",
+    "admin_key_data",
+]
 
-_global_sas_vhd_copy_lock = Lock()
+# the copying vhds by destination paths. The requesters of a copying vhd wait
+# for the same copy, and different vhds are copied in parallel.
+_sas_vhd_copies: Dict[str, "Future[str]"] = {}
+_sas_vhd_copies_lock = Lock()
 
 
 @dataclass_json()
@@ -181,6 +217,56 @@ class AzureLocation:
     capabilities: List[AzureCapability] = field(default_factory=list)
 
 
+class AzureLocationCapabilities:
+    """
+    vm sizes of a location in the capability store. The records are loaded at
+    once, and they are enough to find candidates. AzureCapability is parsed
+    only for used vm sizes, because parsing all of them is slow.
+    """
+
+    def __init__(
+        self,
+        location: str,
+        updated_time: datetime,
+        records: List[CapabilityRecord],
+        store: AzureCapabilityStore,
+        capabilities: Optional[List[AzureCapability]] = None,
+    ) -> None:
+        self.location = location
+        self.updated_time = updated_time
+        self.records = records
+        self._store = store
+        self._capabilities: Dict[str, AzureCapability] = {
+            x.vm_size: x for x in capabilities or []
+        }
+        self._lock = Lock()
+
+    @property
+    def capabilities(self) -> List[AzureCapability]:
+        """
+        all capabilities of the location. It parses all vm sizes, so it's used
+        only when all of them are needed.
+        """
+        return self.get([x.vm_size for x in self.records])
+
+    def get(self, vm_sizes: List[str]) -> List[AzureCapability]:
+        """
+        return capabilities of vm sizes in the same order. The vm sizes, which
+        are removed by refreshing of other processes, are skipped.
+        """
+        with self._lock:
+            missing_vm_sizes = [
+                x for x in dict.fromkeys(vm_sizes) if x not in self._capabilities
+            ]
+            if missing_vm_sizes:
+                loaded_data = self._store.load_data(self.location, missing_vm_sizes)
+                for vm_size, data in loaded_data.items():
+                    self._capabilities[vm_size] = schema.load_by_type(
+                        AzureCapability, data
+                    )
+        return [self._capabilities[x] for x in vm_sizes if x in self._capabilities]
+
+
 @dataclass_json()
 @dataclass
 class AzureArmParameter:
@@ -252,7 +338,31 @@ class AzurePlatformSchema:
     dry_run: bool = False
     # do actual deployment, or try to retrieve existing vms
     deploy: bool = True
-    # wait resource deleted or not
+    # deploy up to this number of concurrent environments in one ARM deployment.
+    # Each environment still has its own resource group. 1 means not to batch.
+    deployment_batch_size: int = field(
+        default=1, metadata=field_metadata(validate=validate.Range(min=1))
+    )
+    # seconds to wait for more environments to join a batch.
+    deployment_batch_wait: float = 10
+    # keep up to this number of idle environments of each shape, when they are
+    # deleted, and lease them in later runs instead of deploying. 0 means not
+    # to pool. The resource groups specified in runbook are not pooled.
+    pool_size: int = field(
+        default=0, metadata=field_metadata(validate=validate.Range(min=0))
+    )
+    # how to reset a leased environment. "reboot" restarts vms, "snapshot"
+    # restores os disks from snapshots, which are taken after deployment.
+    pool_reset: str = field(
+        default=POOL_RESET_REBOOT,
+        metadata=field_metadata(
+            validate=validate.OneOf(
+                [POOL_RESET_NONE, POOL_RESET_REBOOT, POOL_RESET_SNAPSHOT]
+            )
+        ),
+    )
+    # wait resource deleted or not. Deletions are tracked in background, so the
+    # waiting happens at the end of run, and doesn't block test cases.
     wait_delete: bool = False
 
     def __post_init__(self, *args: Any, **kwargs: Any) -> None:
@@ -282,14 +392,37 @@ class AzurePlatform(Platform):
     _arm_template: Any = None
 
     _credentials: Dict[str, DefaultAzureCredential] = {}
-    _locations_data_cache: Dict[str, AzureLocation] = {}
+    _locations_data_cache: Dict[str, AzureLocationCapabilities] = {}
+    _capability_store: Optional[AzureCapabilityStore] = None
+    _location_locks: Dict[str, Lock] = {}
+    _location_locks_lock = Lock()
+    _refreshing_locations: Set[str] = set()
     _eligible_capabilities: Dict[str, List[AzureCapability]] = {}
+    # the location, eligible records and the index of them. They are kept
+    # together to detect, if the location is replaced by refreshing.
+    _capability_indexes: Dict[
+        str,
+        Tuple[AzureLocationCapabilities, List[CapabilityRecord], CapabilityIndex],
+    ] = {}
+    # deletions of all environments are tracked by one reaper in a process.
+    _deletion_reaper: Optional[DeletionReaper] = None
+    _deletion_reaper_lock = Lock()
+    _journal_checked_subscriptions: Set[str] = set()
+    _environment_pool: Optional[EnvironmentPool] = None
+    _environment_pool_lock = Lock()
+    # keys of validated deployments, and the validated time.
+    _validated_deployments: Optional[Dict[str, datetime]] = None
+    _validated_deployments_lock = Lock()
+    # the marketplace images are the same in a run, so query them once.
+    _image_cache: Dict[str, Any] = {}
+    _image_cache_lock = Lock()
 
     def __init__(self, runbook: schema.Platform) -> None:
         super().__init__(runbook=runbook)
 
         # for type detection
         self.credential: DefaultAzureCredential
+        self._deployment_batcher: Optional[DeploymentBatcher[Dict[str, Any]]] = None
 
     @classmethod
     def type_name(cls) -> str:
@@ -363,6 +496,7 @@ class AzurePlatform(Platform):
                 locations = [existing_location]
             else:
                 locations = LOCATIONS
+                self._prefetch_location_infos(locations, log)
 
             # check eligible locations
             found_or_skipped = False
@@ -378,20 +512,9 @@ class AzurePlatform(Platform):
                         continue
 
                     # find predefined vm size on all available's.
-                    location_info: AzureLocation = self._get_location_info(
-                        location_name, log
+                    matched_cap = self._find_capability_by_vm_size(
+                        location_name, node_runbook.vm_size, log
                     )
-                    matched_score: float = 0
-                    matched_cap: Optional[AzureCapability] = None
-                    matcher = SequenceMatcher(None, node_runbook.vm_size.lower(), "")
-                    for azure_cap in location_info.capabilities:
-                        matcher.set_seq2(azure_cap.vm_size.lower())
-                        if (
-                            node_runbook.vm_size.lower() in azure_cap.vm_size.lower()
-                            and matched_score < matcher.ratio()
-                        ):
-                            matched_cap = azure_cap
-                            matched_score = matcher.ratio()
                     if matched_cap:
                         predefined_cost += matched_cap.estimated_cost
 
@@ -440,14 +563,16 @@ class AzurePlatform(Platform):
                     continue
 
                 estimated_cost: int = 0
-                location_caps = self.get_eligible_vm_sizes(location_name, log)
                 for req_index, req in enumerate(nodes_requirement):
-                    for azure_cap in location_caps:
+                    if found_capabilities[req_index]:
+                        continue
+                    for azure_cap in self._get_candidate_capabilities(
+                        location_name, req, log
+                    ):
                         if found_capabilities[req_index]:
                             # found, so skipped
                             break
-                        check_result = req.check(azure_cap.capability)
-                        if check_result.result:
+                        if req.matches(azure_cap.capability):
                             min_cap = self._generate_min_capability(
                                 req, azure_cap, azure_cap.location
                             )
@@ -486,11 +611,37 @@ class AzurePlatform(Platform):
             environment_context.resource_group_is_created = True
 
         environment_context.resource_group_name = resource_group_name
+        # only the resource groups created by LISA can be batched or pooled,
+        # because they are created in the batch deployment, or kept in the pool.
+        is_batched = bool(
+            self._deployment_batcher
+            and self._azure_runbook.deploy
+            and environment_context.resource_group_is_created
+        )
+        is_pooled = bool(
+            self._azure_runbook.pool_size
+            and self._azure_runbook.deploy
+            and environment_context.resource_group_is_created
+        )
         if self._azure_runbook.dry_run:
             log.info(f"dry_run: {self._azure_runbook.dry_run}")
         else:
             try:
-                if self._azure_runbook.deploy:
+                location, deployment_parameters = self._create_deployment_parameters(
+                    resource_group_name, environment, log
+                )
+                pool_key = ""
+                if is_pooled:
+                    pool_key = self._get_pool_key(deployment_parameters)
+                    if self._lease_pooled_environment(environment, pool_key, log):
+                        return
+
+                if is_batched:
+                    log.info(
+                        f"resource group [{resource_group_name}] will be created "
+                        f"in a batch deployment"
+                    )
+                elif self._azure_runbook.deploy:
                     log.info(
                         f"creating or updating resource group: [{resource_group_name}]"
                     )
@@ -504,16 +655,33 @@ class AzurePlatform(Platform):
                 else:
                     log.info(f"reusing resource group: [{resource_group_name}]")
 
-                location, deployment_parameters = self._create_deployment_parameters(
-                    resource_group_name, environment, log
-                )
-
-                if self._azure_runbook.deploy:
+                deployment_outputs: Dict[str, Any] = {}
+                if is_batched:
+                    assert self._deployment_batcher
+                    # the resource group is created in the batch deployment, so
+                    # the same shape is validated in the shared resource group.
+                    self._validate_template(
+                        {
+                            **deployment_parameters,
+                            AZURE_RG_NAME_KEY: (
+                                self._azure_runbook.shared_resource_group_name
+                            ),
+                        },
+                        log,
+                    )
+                    deployment_outputs = self._deployment_batcher.deploy(
+                        location, deployment_parameters
+                    )
+                elif self._azure_runbook.deploy:
                     self._validate_template(deployment_parameters, log)
-                    self._deploy(location, deployment_parameters, log)
+                    deployment_outputs = self._deploy(
+                        location, deployment_parameters, log
+                    )
 
                 # Even skipped deploy, try best to initialize nodes
-                self._initialize_nodes(environment, log)
+                self._initialize_nodes(environment, log, deployment_outputs)
+                if pool_key:
+                    self._prepare_pooled_environment(environment, pool_key, log)
             except Exception as identifier:
                 self._delete_environment(environment, log)
                 raise identifier
@@ -527,6 +695,11 @@ class AzurePlatform(Platform):
             return
         assert self._azure_runbook
 
+        if environment_context.pool_key and self._release_pooled_environment(
+            environment, log
+        ):
+            return
+
         if not environment_context.resource_group_is_created:
             log.info(
                 f"skipped to delete resource group: {resource_group_name}, "
@@ -544,29 +717,344 @@ class AzurePlatform(Platform):
             )
             if not az_rg_exists:
                 return
-            log.info(
-                f"deleting resource group: {resource_group_name}, "
-                f"wait: {self._azure_runbook.wait_delete}"
-            )
+            log.info(f"deleting resource group: {resource_group_name}")
             try:
                 self._delete_boot_diagnostic_container(resource_group_name, log)
             except Exception as identifer:
                 log.debug(
                     f"exception on deleting boot diagnostic container: {identifer}"
                 )
-            delete_operation: Any = None
+            self._begin_delete_resource_group(resource_group_name, log)
+
+    def _begin_delete_resource_group(
+        self, resource_group_name: str, log: Logger
+    ) -> None:
+        # the deletion is tracked by the reaper in background, so it doesn't block
+        # the worker. If wait_delete is set, it's waited at the end of run.
+        reaper = self._get_deletion_reaper()
+        try:
+            delete_operation = self._rm_client.resource_groups.begin_delete(
+                resource_group_name
+            )
+        except Exception as identifier:
+            log.debug(f"exception on delete resource group: {identifier}")
+            reaper.add_failure(
+                self.subscription_id, resource_group_name, str(identifier)
+            )
+            return
+        reaper.submit(self.subscription_id, resource_group_name, delete_operation)
+
+    def _get_deletion_reaper(self) -> DeletionReaper:
+        journal_path = constants.CACHE_PATH / DELETION_JOURNAL_FILE_NAME
+        with self._deletion_reaper_lock:
+            if (
+                AzurePlatform._deletion_reaper is None
+                or AzurePlatform._deletion_reaper.journal.path != journal_path
+            ):
+                AzurePlatform._deletion_reaper = DeletionReaper(
+                    DeletionJournal(journal_path), self._log
+                )
+            return AzurePlatform._deletion_reaper
+
+    def _get_environment_pool(self) -> EnvironmentPool:
+        journal_path = constants.CACHE_PATH / POOL_JOURNAL_FILE_NAME
+        with self._environment_pool_lock:
+            if (
+                AzurePlatform._environment_pool is None
+                or AzurePlatform._environment_pool.path != journal_path
+            ):
+                AzurePlatform._environment_pool = EnvironmentPool(journal_path)
+            return AzurePlatform._environment_pool
+
+    def _get_pool_key(self, deployment_parameters: Dict[str, Any]) -> str:
+        """
+        The pool key is the deployment key with vm names, credentials and the
+        reset policy. So a leased environment can be used as a new deployed one.
+        """
+        parameters = deployment_parameters["parameters"].properties.parameters
+        content = json.dumps(
+            {
+                "deployment_key": self._get_deployment_key(deployment_parameters),
+                "names": [x["name"] for x in parameters["nodes"]["value"]],
+                "credentials": [
+                    parameters.get(name, {}).get("value", "")
+                    for name in _DEPLOYMENT_KEY_EXCLUDED_PARAMETERS
+                ],
+                "reset": self._azure_runbook.pool_reset,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _lease_pooled_environment(
+        self, environment: Environment, pool_key: str, log: Logger
+    ) -> bool:
+        """
+        lease a healthy environment from the pool. The unhealthy ones are
+        removed from the pool and deleted. Return False, if there is no one.
+        """
+        pool = self._get_environment_pool()
+        environment_context = get_environment_context(environment=environment)
+        original_name = environment_context.resource_group_name
+        owner = f"{constants.RUN_NAME}:{os.getpid()}"
+        while True:
+            resource_group_name = pool.lease(self.subscription_id, pool_key, owner)
+            if not resource_group_name:
+                _set_resource_group_name(environment, original_name)
+                return False
+
+            log.info(f"leased resource group from pool: [{resource_group_name}]")
+            _set_resource_group_name(environment, resource_group_name)
+            try:
+                self._reset_pooled_environment(environment, log)
+                self._initialize_nodes(environment, log)
+                self._check_pooled_environment(environment, log)
+            except Exception as identifier:
+                log.info(
+                    f"pooled resource group [{resource_group_name}] is unhealthy, "
+                    f"deleting it. {identifier}"
+                )
+                pool.remove(self.subscription_id, resource_group_name)
+                self._begin_delete_resource_group(resource_group_name, log)
+                continue
+
+            environment_context.pool_key = pool_key
+            return True
+
+    def _reset_pooled_environment(self, environment: Environment, log: Logger) -> None:
+        reset = self._azure_runbook.pool_reset
+        if reset == POOL_RESET_NONE:
+            return
+
+        environment_context = get_environment_context(environment=environment)
+        resource_group_name = environment_context.resource_group_name
+        compute_client = get_compute_client(self)
+        vms = self._load_vms(environment, log, compute_client)
+        log.debug(f"resetting {len(vms)} vms by {reset}")
+        if reset == POOL_RESET_REBOOT:
+            _wait_operations(
+                [
+                    compute_client.virtual_machines.begin_restart(
+                        resource_group_name, name
+                    )
+                    for name in vms
+                ]
+            )
+            return
+
+        # the ephemeral os disks cannot be snapshotted, but can be re-imaged.
+        ephemeral_vms = [
+            name
+            for name, vm in vms.items()
+            if vm.storage_profile.os_disk.diff_disk_settings
+        ]
+        _wait_operations(
+            [
+                compute_client.virtual_machines.begin_reimage(resource_group_name, name)
+                for name in ephemeral_vms
+            ]
+        )
+        vms = {name: vm for name, vm in vms.items() if name not in ephemeral_vms}
+        if not vms:
+            return
+
+        _wait_operations(
+            [
+                compute_client.virtual_machines.begin_deallocate(
+                    resource_group_name, name
+                )
+                for name in vms
+            ]
+        )
+        disk_operations: Dict[str, Any] = {}
+        for name, vm in vms.items():
+            snapshot = compute_client.snapshots.get(
+                resource_group_name, f"{name}{POOL_SNAPSHOT_POSTFIX}"
+            )
+            os_disk = vm.storage_profile.os_disk
+            disk_operations[name] = compute_client.disks.begin_create_or_update(
+                resource_group_name,
+                f"{name}-os-{datetime.now():%Y%m%d%H%M%S}",
+                {
+                    "location": vm.location,
+                    "sku": {"name": os_disk.managed_disk.storage_account_type},
+                    "creation_data": {
+                        "create_option": DiskCreateOption.copy,
+                        "source_resource_id": snapshot.id,
+                    },
+                },
+            )
+        # swap os disks with the restored ones.
+        old_disk_names: List[str] = []
+        update_operations: List[Any] = []
+        for name, operation in disk_operations.items():
+            wait_operation(operation)
+            disk = operation.result()
+            os_disk = vms[name].storage_profile.os_disk
+            old_disk_names.append(os_disk.name)
+            os_disk.name = disk.name
+            os_disk.managed_disk.id = disk.id
+            update_operations.append(
+                compute_client.virtual_machines.begin_create_or_update(
+                    resource_group_name, name, vms[name]
+                )
+            )
+        _wait_operations(update_operations)
+        _wait_operations(
+            [
+                compute_client.virtual_machines.begin_start(resource_group_name, name)
+                for name in vms
+            ]
+        )
+        # the old disks are detached, so they can be deleted in background.
+        for disk_name in old_disk_names:
+            compute_client.disks.begin_delete(resource_group_name, disk_name)
+
+    def _check_pooled_environment(self, environment: Environment, log: Logger) -> None:
+        """
+        the vms should be running, and their ssh ports should be reachable.
+        """
+        compute_client = get_compute_client(self)
+        environment_context = get_environment_context(environment=environment)
+        for node in environment.nodes.list():
+            node_context = get_node_context(node)
+            instance_view = compute_client.virtual_machines.instance_view(
+                environment_context.resource_group_name, node_context.vm_name
+            )
+            statuses = [x.code for x in instance_view.statuses or []]
+            if "PowerState/running" not in statuses:
+                raise LisaException(
+                    f"vm '{node_context.vm_name}' is not running: {statuses}"
+                )
+            assert isinstance(node, RemoteNode)
+            address = node.public_address
+            is_ready, error_code = wait_tcp_port_ready(
+                address, 22, log, timeout=POOL_HEALTH_CHECK_TIMEOUT
+            )
+            if not is_ready:
+                raise LisaException(
+                    f"cannot connect to vm '{node_context.vm_name}' "
+                    f"[{address}:22], error code: {error_code}"
+                )
+
+    def _prepare_pooled_environment(
+        self, environment: Environment, pool_key: str, log: Logger
+    ) -> None:
+        """
+        take snapshots of os disks, if they are needed by the reset policy. If
+        it fails, the environment isn't pooled, and it's deleted as usual.
+        """
+        environment_context = get_environment_context(environment=environment)
+        if self._azure_runbook.pool_reset == POOL_RESET_SNAPSHOT:
+            resource_group_name = environment_context.resource_group_name
+            compute_client = get_compute_client(self)
             try:
-                delete_operation = self._rm_client.resource_groups.begin_delete(
-                    resource_group_name
+                vms = self._load_vms(environment, log, compute_client)
+                _wait_operations(
+                    [
+                        compute_client.snapshots.begin_create_or_update(
+                            resource_group_name,
+                            f"{name}{POOL_SNAPSHOT_POSTFIX}",
+                            {
+                                "location": vm.location,
+                                "creation_data": {
+                                    "create_option": DiskCreateOption.copy,
+                                    "source_resource_id": (
+                                        vm.storage_profile.os_disk.managed_disk.id
+                                    ),
+                                },
+                            },
+                        )
+                        for name, vm in vms.items()
+                        if not vm.storage_profile.os_disk.diff_disk_settings
+                    ]
                 )
             except Exception as identifier:
-                log.debug(f"exception on delete resource group: {identifier}")
-            if delete_operation and self._azure_runbook.wait_delete:
-                result = wait_operation(delete_operation)
-                if result:
-                    raise LisaException(f"error on deleting resource group: {result}")
-            else:
-                log.debug("not wait deleting")
+                log.debug(f"skipped to pool, failed to take snapshots: {identifier}")
+                return
+        environment_context.pool_key = pool_key
+
+    def _release_pooled_environment(
+        self, environment: Environment, log: Logger
+    ) -> bool:
+        """
+        return the environment to the pool. Return False, if the pool of its
+        shape is full, and it should be deleted.
+        """
+        environment_context = get_environment_context(environment=environment)
+        resource_group_name = environment_context.resource_group_name
+        pool = self._get_environment_pool()
+        if pool.release(
+            self.subscription_id,
+            resource_group_name,
+            environment_context.pool_key,
+            self._azure_runbook.pool_size,
+        ):
+            log.info(f"returned resource group to pool: [{resource_group_name}]")
+            return True
+        return False
+
+    def _delete_journaled_resource_groups(self, log: Logger) -> None:
+        """
+        delete resource groups in background, which failed or didn't complete in
+        previous runs.
+        """
+        with self._deletion_reaper_lock:
+            if self.subscription_id in self._journal_checked_subscriptions:
+                return
+            self._journal_checked_subscriptions.add(self.subscription_id)
+
+        def _delete() -> None:
+            reaper = self._get_deletion_reaper()
+            for resource_group_name, error in reaper.journal.list(self.subscription_id):
+                try:
+                    if not self._rm_client.resource_groups.check_existence(
+                        resource_group_name
+                    ):
+                        reaper.journal.remove(self.subscription_id, resource_group_name)
+                        continue
+                except Exception as identifier:
+                    log.debug(
+                        f"failed to check resource group '{resource_group_name}': "
+                        f"{identifier}"
+                    )
+                    continue
+                log.debug(
+                    f"deleting resource group '{resource_group_name}' of previous "
+                    f"runs, last error: '{error}'"
+                )
+                self._begin_delete_resource_group(resource_group_name, log)
+
+        thread = Thread(target=_delete, name="delete_journaled", daemon=True)
+        thread.start()
+
+    @hookimpl
+    def on_run_finalize(self) -> None:
+        reaper = AzurePlatform._deletion_reaper
+        if not reaper:
+            return
+        azure_runbook: Optional[AzurePlatformSchema] = getattr(
+            self, "_azure_runbook", None
+        )
+        pending_count = reaper.pending_count
+        if azure_runbook and azure_runbook.wait_delete and pending_count:
+            self._log.info(f"waiting {pending_count} resource groups deleted...")
+            reaper.wait()
+
+        succeeded, failed, pending = reaper.summarize()
+        if not (succeeded or failed or pending):
+            return
+        self._log.info(
+            f"resource groups deleted: {len(succeeded)}, failed: {len(failed)}, "
+            f"pending: {len(pending)}"
+        )
+        for name, error in failed.items():
+            self._log.info(f"  failed to delete '{name}': {error}")
+        if failed or pending:
+            self._log.info(
+                f"failed and pending deletions are saved in '{reaper.journal.path}', "
+                f"they will be deleted again in next run."
+            )
 
     def _delete_boot_diagnostic_container(
         self, resource_group_name: str, log: Logger
@@ -789,6 +1277,14 @@ class AzurePlatform(Platform):
         self._rm_client = get_resource_management_client(
             self.credential, self.subscription_id
         )
+        if azure_runbook.deploy and not azure_runbook.dry_run:
+            self._delete_journaled_resource_groups(self._log)
+        if azure_runbook.deployment_batch_size > 1:
+            self._deployment_batcher = DeploymentBatcher[Dict[str, Any]](
+                self._deploy_batch,
+                max_size=azure_runbook.deployment_batch_size,
+                wait_time=azure_runbook.deployment_batch_wait,
+            )
 
     def _initialize_credential(self) -> None:
         azure_runbook = self._azure_runbook
@@ -865,83 +1361,196 @@ class AzurePlatform(Platform):
                 raise identifier
         return loaded_obj
 
-    def _get_location_info(self, location: str, log: Logger) -> AzureLocation:
-        cached_file_name = constants.CACHE_PATH.joinpath(
-            f"azure_locations_{location}.json"
-        )
-        should_refresh: bool = True
+    def _get_capability_store(self) -> AzureCapabilityStore:
+        store_path = constants.CACHE_PATH / CAPABILITY_STORE_FILE_NAME
+        with self._location_locks_lock:
+            if (
+                AzurePlatform._capability_store is None
+                or AzurePlatform._capability_store.path != store_path
+            ):
+                AzurePlatform._capability_store = AzureCapabilityStore(store_path)
+            return AzurePlatform._capability_store
+
+    def _get_location_lock(self, key: str) -> Lock:
+        with self._location_locks_lock:
+            lock = self._location_locks.get(key, None)
+            if not lock:
+                lock = Lock()
+                self._location_locks[key] = lock
+            return lock
+
+    def _get_location_info(
+        self, location: str, log: Logger
+    ) -> AzureLocationCapabilities:
         key = self._get_location_key(location)
         location_data = self._locations_data_cache.get(key, None)
         if not location_data:
-            location_data = self._load_location_info_from_file(
-                cached_file_name=cached_file_name, log=log
-            )
+            # one location is loaded or queried once, if it's called in threads.
+            with self._get_location_lock(key):
+                location_data = self._locations_data_cache.get(key, None)
+                if not location_data:
+                    location_data = self._load_location_info(location, log)
+                    self._locations_data_cache[key] = location_data
+
+        delta = datetime.now() - location_data.updated_time
+        # refresh cached locations every 1 day. The cached data is good enough to
+        # be used, so it's refreshed in background.
+        if delta.days >= 1:
+            log.debug(f"{key}: cache timeout: {location_data.updated_time}")
+            self._refresh_location_info_in_background(location, log)
+        return location_data
 
-        if location_data:
-            delta = datetime.now() - location_data.updated_time
-            # refresh cached locations every 1 day.
-            if delta.days < 1:
-                should_refresh = False
-                log.debug(
-                    f"{key}: cache used: {location_data.updated_time}, "
-                    f"sku count: {len(location_data.capabilities)}"
-                )
-            else:
-                log.debug(
-                    f"{key}: cache timeout: {location_data.updated_time},"
-                    f"sku count: {len(location_data.capabilities)}"
+    def _prefetch_location_infos(self, locations: List[str], log: Logger) -> None:
+        """
+        load or query locations concurrently, so the fallback on locations doesn't
+        wait on them one by one.
+        """
+        missing_locations = [
+            x
+            for x in locations
+            if self._get_location_key(x) not in self._locations_data_cache
+        ]
+        if len(missing_locations) < 2:
+            return
+        log.debug(f"prefetching locations: {missing_locations}")
+        task_manager = TaskManager[AzureLocationCapabilities](len(missing_locations))
+        for index, location in enumerate(missing_locations):
+            task_manager.submit_task(
+                Task[AzureLocationCapabilities](
+                    index, partial(self._get_location_info, location, log), log
                 )
-        else:
-            log.debug(f"{key}: no cache found")
-        if should_refresh:
-            compute_client = get_compute_client(self)
+            )
+        task_manager.wait_for_all_workers()
 
-            log.debug(f"{key}: querying")
-            all_skus: List[AzureCapability] = []
-            paged_skus = compute_client.resource_skus.list(
-                f"location eq '{location}'"
-            ).by_page()
-            for skus in paged_skus:
-                for sku_obj in skus:
-                    try:
-                        if sku_obj.resource_type == "virtualMachines":
-                            if sku_obj.restrictions and any(
-                                restriction.type == "Location"
-                                for restriction in sku_obj.restrictions
-                            ):
-                                # restricted on this location
-                                continue
-                            resource_sku = sku_obj.as_dict()
-                            capability = self._resource_sku_to_capability(
-                                location, sku_obj
-                            )
+    def _load_location_info(
+        self, location: str, log: Logger
+    ) -> AzureLocationCapabilities:
+        key = self._get_location_key(location)
+        store = self._get_capability_store()
+        stored_data = store.load(location)
+        if stored_data:
+            updated_time, records = stored_data
+            log.debug(f"{key}: cache used: {updated_time}, sku count: {len(records)}")
+            return AzureLocationCapabilities(
+                location=location,
+                updated_time=updated_time,
+                records=records,
+                store=store,
+            )
 
-                            # estimate vm cost for priority
-                            assert isinstance(capability.core_count, int)
-                            assert isinstance(capability.gpu_count, int)
-                            estimated_cost = (
-                                capability.core_count + capability.gpu_count * 100
-                            )
-                            azure_capability = AzureCapability(
-                                location=location,
-                                vm_size=sku_obj.name,
-                                capability=capability,
-                                resource_sku=resource_sku,
-                                estimated_cost=estimated_cost,
-                            )
-                            all_skus.append(azure_capability)
-                    except Exception as identifier:
-                        log.error(f"unknown sku: {sku_obj}")
-                        raise identifier
-            location_data = AzureLocation(location=location, capabilities=all_skus)
-            log.debug(f"{location}: saving to disk")
-            with open(cached_file_name, "w") as f:
-                json.dump(location_data.to_dict(), f)  # type: ignore
-            log.debug(f"{key}: new data, " f"sku: {len(location_data.capabilities)}")
-
-        assert location_data
-        self._locations_data_cache[key] = location_data
-        return location_data
+        # migrate from the json cache of previous versions.
+        cached_file_name = constants.CACHE_PATH.joinpath(
+            f"azure_locations_{location}.json"
+        )
+        legacy_data: Optional[AzureLocation] = self._load_location_info_from_file(
+            cached_file_name=cached_file_name, log=log
+        )
+        if legacy_data:
+            log.debug(f"{key}: migrated from {cached_file_name}")
+            return self._save_location_info(location, legacy_data)
+
+        log.debug(f"{key}: no cache found")
+        return self._query_location_info(location, log)
+
+    def _refresh_location_info_in_background(self, location: str, log: Logger) -> None:
+        key = self._get_location_key(location)
+        with self._location_locks_lock:
+            if key in self._refreshing_locations:
+                return
+            self._refreshing_locations.add(key)
+
+        def _refresh() -> None:
+            try:
+                # other processes may refresh it already.
+                store = self._get_capability_store()
+                updated_time = store.get_updated_time(location)
+                if updated_time and (datetime.now() - updated_time).days < 1:
+                    location_data = self._load_location_info(location, log)
+                else:
+                    location_data = self._query_location_info(location, log)
+                self._locations_data_cache[key] = location_data
+                self._eligible_capabilities.pop(key, None)
+                self._capability_indexes.pop(key, None)
+            except Exception as identifier:
+                log.debug(f"{key}: failed to refresh location info: {identifier}")
+            finally:
+                with self._location_locks_lock:
+                    self._refreshing_locations.discard(key)
+
+        thread = Thread(target=_refresh, name=f"refresh_{location}", daemon=True)
+        thread.start()
+
+    def _query_location_info(
+        self, location: str, log: Logger
+    ) -> AzureLocationCapabilities:
+        key = self._get_location_key(location)
+        compute_client = get_compute_client(self)
+
+        log.debug(f"{key}: querying")
+        all_skus: List[AzureCapability] = []
+        paged_skus = compute_client.resource_skus.list(
+            f"location eq '{location}'"
+        ).by_page()
+        for skus in paged_skus:
+            for sku_obj in skus:
+                try:
+                    if sku_obj.resource_type == "virtualMachines":
+                        if sku_obj.restrictions and any(
+                            restriction.type == "Location"
+                            for restriction in sku_obj.restrictions
+                        ):
+                            # restricted on this location
+                            continue
+                        resource_sku = sku_obj.as_dict()
+                        capability = self._resource_sku_to_capability(location, sku_obj)
+
+                        # estimate vm cost for priority
+                        assert isinstance(capability.core_count, int)
+                        assert isinstance(capability.gpu_count, int)
+                        estimated_cost = (
+                            capability.core_count + capability.gpu_count * 100
+                        )
+                        azure_capability = AzureCapability(
+                            location=location,
+                            vm_size=sku_obj.name,
+                            capability=capability,
+                            resource_sku=resource_sku,
+                            estimated_cost=estimated_cost,
+                        )
+                        all_skus.append(azure_capability)
+                except Exception as identifier:
+                    log.error(f"unknown sku: {sku_obj}")
+                    raise identifier
+        location_data = AzureLocation(location=location, capabilities=all_skus)
+        log.debug(f"{location}: saving to store")
+        result = self._save_location_info(location, location_data)
+        log.debug(f"{key}: new data, " f"sku: {len(location_data.capabilities)}")
+        return result
+
+    def _save_location_info(
+        self, location: str, location_data: AzureLocation
+    ) -> AzureLocationCapabilities:
+        records = [
+            create_capability_record(
+                vm_size=azure_cap.vm_size,
+                capability=azure_cap.capability,
+                estimated_cost=azure_cap.estimated_cost,
+                data=azure_cap.to_dict(),  # type: ignore
+            )
+            for azure_cap in location_data.capabilities
+        ]
+        store = self._get_capability_store()
+        store.save(location, location_data.updated_time, records)
+        # the data is in the store, and the parsed capabilities are kept.
+        for record in records:
+            record.data = {}
+        return AzureLocationCapabilities(
+            location=location,
+            updated_time=location_data.updated_time,
+            records=records,
+            store=store,
+            capabilities=location_data.capabilities,
+        )
 
     def _create_deployment_parameters(
         self, resource_group_name: str, environment: Environment, log: Logger
@@ -1147,6 +1756,15 @@ class AzurePlatform(Platform):
     def _validate_template(
         self, deployment_parameters: Dict[str, Any], log: Logger
     ) -> None:
+        deployment_key = self._get_deployment_key(deployment_parameters)
+        validated_time = self._get_validated_time(deployment_key)
+        if validated_time:
+            log.debug(
+                f"skipped validating deployment, the same deployment is "
+                f"validated at {validated_time}"
+            )
+            return
+
         log.debug("validating deployment")
 
         validate_operation: Any = None
@@ -1169,10 +1787,97 @@ class AzurePlatform(Platform):
             raise LisaException("\n".join(error_messages))
 
         assert result is None, f"validate error: {result}"
+        self._save_validated_time(deployment_key)
+
+    def _get_deployment_key(self, deployment_parameters: Dict[str, Any]) -> str:
+        """
+        The key is a hash of the template and parameters, without names and
+        secrets. So deployments with the same shape have the same key.
+        """
+        properties = deployment_parameters["parameters"].properties
+        parameters = {
+            name: value["value"]
+            for name, value in properties.parameters.items()
+            if name not in _DEPLOYMENT_KEY_EXCLUDED_PARAMETERS
+        }
+        # the resource group name is in tags.
+        parameters["vm_tags"] = {
+            name: value
+            for name, value in parameters.get("vm_tags", {}).items()
+            if name != "RG"
+        }
+        parameters["nodes"] = [
+            {name: value for name, value in node.items() if name != "name"}
+            for node in parameters.get("nodes", [])
+        ]
+        content = json.dumps(
+            {
+                "subscription_id": self.subscription_id,
+                "template": properties.template,
+                "parameters": parameters,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def _get_validated_time(self, deployment_key: str) -> Optional[datetime]:
+        validated_deployments = self._load_validated_deployments()
+        with self._validated_deployments_lock:
+            validated_time = validated_deployments.get(deployment_key, None)
+        if (
+            validated_time
+            and datetime.now() - validated_time < VALIDATION_CACHE_TIMEOUT
+        ):
+            return validated_time
+        return None
+
+    def _save_validated_time(self, deployment_key: str) -> None:
+        validated_deployments = self._load_validated_deployments()
+        now = datetime.now()
+        with self._validated_deployments_lock:
+            validated_deployments[deployment_key] = now
+            # keep recent ones only
+            content = {
+                key: value.isoformat()
+                for key, value in validated_deployments.items()
+                if now - value < VALIDATION_CACHE_TIMEOUT
+            }
+            cache_file = constants.CACHE_PATH / VALIDATED_DEPLOYMENTS_FILE_NAME
+            # write to a temp file and replace, so other processes don't read a
+            # partial file.
+            temp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_file, "w") as f:
+                json.dump(content, f)
+            os.replace(temp_file, cache_file)
+
+    def _load_validated_deployments(self) -> Dict[str, datetime]:
+        with self._validated_deployments_lock:
+            if AzurePlatform._validated_deployments is None:
+                validated_deployments: Dict[str, datetime] = {}
+                cache_file = constants.CACHE_PATH / VALIDATED_DEPLOYMENTS_FILE_NAME
+                if cache_file.exists():
+                    try:
+                        with open(cache_file, "r") as f:
+                            content = json.load(f)
+                        validated_deployments = {
+                            key: datetime.fromisoformat(value)
+                            for key, value in content.items()
+                        }
+                    except Exception as identifier:
+                        self._log.debug(
+                            f"failed to load validated deployments: {identifier}"
+                        )
+                AzurePlatform._validated_deployments = validated_deployments
+            return AzurePlatform._validated_deployments
 
     def _deploy(
         self, location: str, deployment_parameters: Dict[str, Any], log: Logger
-    ) -> None:
+    ) -> Dict[str, Any]:
+        """
+        return outputs of the deployment. It's empty, if the deployment failed
+        with ignorable errors.
+        """
         resource_group_name = deployment_parameters[AZURE_RG_NAME_KEY]
         storage_account_name = get_storage_account_name(self.subscription_id, location)
         check_or_create_storage_account(
@@ -1186,6 +1891,7 @@ class AzurePlatform(Platform):
 
         log.info(f"resource group '{resource_group_name}' deployment is in progress...")
         deployment_operation: Any = None
+        deployment_outputs: Dict[str, Any] = {}
         deployments = self._rm_client.deployments
         try:
             deployment_operation = deployments.begin_create_or_update(
@@ -1194,6 +1900,11 @@ class AzurePlatform(Platform):
             result = wait_operation(deployment_operation)
             if result:
                 raise LisaException(f"deploy failed: {result}")
+            outputs = deployment_operation.result().properties.outputs
+            if outputs:
+                deployment_outputs = {
+                    name: output.get("value", None) for name, output in outputs.items()
+                }
         except HttpResponseError as identifier:
             # Some errors happens underlying, so there is no detail errors from API.
             # For example,
@@ -1202,31 +1913,165 @@ class AzurePlatform(Platform):
             assert identifier.error, f"HttpResponseError: {identifier}"
 
             error_message = "\n".join(self._parse_detail_errors(identifier.error))
-            if "OSProvisioningTimedOut: OS Provisioning for VM" in error_message:
-                # Provisioning timeout causes by waagent is not ready.
-                # In smoke test, it still can verify some information.
-                # Eat information here, to run test case any way.
-                #
-                # It may cause other cases fail on assumptions. In this case, we can
-                # define a flag in config, to mark this exception is ignorable or not.
-                log.error(
-                    f"provisioning time out, try to run case. "
-                    f"Exception: {error_message}"
-                )
-            elif get_matched_str(error_message, AZURE_INTERNAL_ERROR_PATTERN):
-                # Similar situation with OSProvisioningTimedOut
-                # Some OSProvisioningInternalError caused by it doesn't support
-                # SSH key authentication
-                # e.g. hpe hpestoreoncevsa hpestoreoncevsa-3187 3.18.7
-                # After passthrough this exception,
-                # actually the 22 port of this VM is open.
-                log.error(
-                    f"provisioning failed for an internal error, try to run case. "
-                    f"Exception: {error_message}"
+            error = self._check_deployment_error(error_message, log)
+            if error:
+                raise error
+        return deployment_outputs
+
+    def _check_deployment_error(
+        self, error_message: str, log: Logger
+    ) -> Optional[Exception]:
+        """
+        return the exception of a failed deployment. It's None, if the error is
+        ignorable, and test cases can run on the deployed VMs.
+        """
+        if "OSProvisioningTimedOut: OS Provisioning for VM" in error_message:
+            # Provisioning timeout causes by waagent is not ready.
+            # In smoke test, it still can verify some information.
+            # Eat information here, to run test case any way.
+            #
+            # It may cause other cases fail on assumptions. In this case, we can
+            # define a flag in config, to mark this exception is ignorable or not.
+            log.error(
+                f"provisioning time out, try to run case. "
+                f"Exception: {error_message}"
+            )
+            return None
+        if get_matched_str(error_message, AZURE_INTERNAL_ERROR_PATTERN):
+            # Similar situation with OSProvisioningTimedOut
+            # Some OSProvisioningInternalError caused by it doesn't support
+            # SSH key authentication
+            # e.g. hpe hpestoreoncevsa hpestoreoncevsa-3187 3.18.7
+            # After passthrough this exception,
+            # actually the 22 port of this VM is open.
+            log.error(
+                f"provisioning failed for an internal error, try to run case. "
+                f"Exception: {error_message}"
+            )
+            return None
+        try:
+            # the hook raises exceptions for known failures, like skipped.
+            plugin_manager.hook.azure_deploy_failed(error_message=error_message)
+        except Exception as identifier:
+            return identifier
+        return LisaException(error_message)
+
+    def _deploy_batch(self, location: str, batch: List[Dict[str, Any]]) -> List[Any]:
+        """
+        deploy environments in one subscription level deployment. Each environment
+        has a resource group and a nested deployment in it, so it can be deleted
+        independently. Return outputs or the exception of each environment.
+        """
+        log = self._log
+        check_or_create_storage_account(
+            self.credential,
+            self.subscription_id,
+            get_storage_account_name(self.subscription_id, location),
+            self._azure_runbook.shared_resource_group_name,
+            location,
+            log,
+        )
+
+        resources: List[Dict[str, Any]] = []
+        resource_group_names: List[str] = []
+        for deployment_parameters in batch:
+            resource_group_name = deployment_parameters[AZURE_RG_NAME_KEY]
+            resource_group_names.append(resource_group_name)
+            properties = deployment_parameters["parameters"].properties
+            resources.append(
+                {
+                    "type": "Microsoft.Resources/resourceGroups",
+                    "apiVersion": "2021-04-01",
+                    "name": resource_group_name,
+                    "location": RESOURCE_GROUP_LOCATION,
+                }
+            )
+            resources.append(
+                {
+                    "type": "Microsoft.Resources/deployments",
+                    "apiVersion": "2021-04-01",
+                    "name": deployment_parameters["deployment_name"],
+                    "resourceGroup": resource_group_name,
+                    "dependsOn": [
+                        "[resourceId('Microsoft.Resources/resourceGroups', "
+                        f"'{resource_group_name}')]"
+                    ],
+                    "properties": {
+                        "mode": "Incremental",
+                        "expressionEvaluationOptions": {"scope": "inner"},
+                        "template": properties.template,
+                        "parameters": properties.parameters,
+                    },
+                }
+            )
+        template = {
+            "$schema": "https://schema.management.azure.com/schemas/2018-05-01/"
+            "subscriptionDeploymentTemplate.json#",
+            "contentVersion": "1.0.0.0",
+            "resources": resources,
+        }
+        # the name is limited to 64 characters.
+        batch_hash = hashlib.sha256(",".join(resource_group_names).encode("utf-8"))
+        deployment_name = f"lisa_batch_{batch_hash.hexdigest()[:16]}"
+        log.info(
+            f"deploying {len(batch)} environments in one deployment: "
+            f"{resource_group_names}"
+        )
+        try:
+            deployments = self._rm_client.deployments
+            operation = deployments.begin_create_or_update_at_subscription_scope(
+                deployment_name,
+                Deployment(
+                    location=RESOURCE_GROUP_LOCATION,
+                    properties=DeploymentProperties(
+                        mode=DeploymentMode.incremental, template=template
+                    ),
+                ),
+            )
+            wait_operation(operation)
+        except Exception as identifier:
+            # some environments may succeed, so check them one by one.
+            log.debug(f"batch deployment failed: {identifier}")
+
+        results: List[Any] = []
+        for deployment_parameters in batch:
+            results.append(
+                self._get_nested_deployment_outputs(deployment_parameters, log)
+            )
+        return results
+
+    def _get_nested_deployment_outputs(
+        self, deployment_parameters: Dict[str, Any], log: Logger
+    ) -> Any:
+        """
+        return outputs or the exception of a nested deployment. Errors are
+        checked like the deployment of a single environment.
+        """
+        resource_group_name = deployment_parameters[AZURE_RG_NAME_KEY]
+        try:
+            deployment = self._rm_client.deployments.get(
+                resource_group_name, deployment_parameters["deployment_name"]
+            )
+        except Exception as identifier:
+            return LisaException(
+                f"deployment is not found in '{resource_group_name}': {identifier}"
+            )
+        properties = deployment.properties
+        if properties.provisioning_state != "Succeeded":
+            if not properties.error:
+                return LisaException(
+                    f"provisioning state: {properties.provisioning_state}"
                 )
-            else:
-                plugin_manager.hook.azure_deploy_failed(error_message=error_message)
-                raise LisaException(error_message)
+            error_message = "\n".join(self._parse_detail_errors(properties.error))
+            error = self._check_deployment_error(error_message, log)
+            if error:
+                return error
+            # the outputs are not set on failures.
+            return {}
+        return {
+            name: output.get("value", None)
+            for name, output in (properties.outputs or {}).items()
+        }
 
     def _parse_detail_errors(self, error: Any) -> List[str]:
         # original message may be a summary, get lowest level details.
@@ -1246,12 +2091,25 @@ class AzurePlatform(Platform):
                 errors = [f"{error.code}: {error.message}"]
         return errors
 
-    # the VM may not be queried after deployed. use retry to mitigate it.
-    @retry(exceptions=LisaException, tries=150, delay=2)  # type: ignore
+    # the VM may not be queried after deployed. use retry to mitigate it. The
+    # delay grows exponentially with jitter, so concurrent environments don't
+    # query at the same time.
+    @retry(
+        exceptions=LisaException,
+        tries=40,
+        delay=1,
+        backoff=1.3,
+        max_delay=10,
+        jitter=(0, 1),
+    )  # type: ignore
     def _load_vms(
-        self, environment: Environment, log: Logger
+        self,
+        environment: Environment,
+        log: Logger,
+        compute_client: Optional[ComputeManagementClient] = None,
     ) -> Dict[str, VirtualMachine]:
-        compute_client = get_compute_client(self)
+        if not compute_client:
+            compute_client = get_compute_client(self)
         environment_context = get_environment_context(environment=environment)
 
         log.debug(
@@ -1274,11 +2132,22 @@ class AzurePlatform(Platform):
 
     # Use Exception, because there may be credential conflict error. Make it
     # retriable.
-    @retry(exceptions=Exception, tries=150, delay=2)  # type: ignore
+    @retry(
+        exceptions=Exception,
+        tries=40,
+        delay=1,
+        backoff=1.3,
+        max_delay=10,
+        jitter=(0, 1),
+    )  # type: ignore
     def _load_nics(
-        self, environment: Environment, log: Logger
+        self,
+        environment: Environment,
+        log: Logger,
+        network_client: Optional[NetworkManagementClient] = None,
     ) -> Dict[str, NetworkInterface]:
-        network_client = get_network_client(self)
+        if not network_client:
+            network_client = get_network_client(self)
         environment_context = get_environment_context(environment=environment)
 
         log.debug(
@@ -1310,11 +2179,22 @@ class AzurePlatform(Platform):
             )
         return nics_map
 
-    @retry(exceptions=LisaException, tries=150, delay=2)  # type: ignore
+    @retry(
+        exceptions=LisaException,
+        tries=40,
+        delay=1,
+        backoff=1.3,
+        max_delay=10,
+        jitter=(0, 1),
+    )  # type: ignore
     def _load_public_ips(
-        self, resource_group_name: str, log: Logger
+        self,
+        resource_group_name: str,
+        log: Logger,
+        network_client: Optional[NetworkManagementClient] = None,
     ) -> Dict[str, PublicIPAddress]:
-        network_client = get_network_client(self)
+        if not network_client:
+            network_client = get_network_client(self)
         log.debug(f"listing public ips in resource group '{resource_group_name}'")
         # get public IP
         public_ip_addresses = network_client.public_ip_addresses.list(
@@ -1345,33 +2225,32 @@ class AzurePlatform(Platform):
             )
         return public_ips_map
 
-    def _initialize_nodes(self, environment: Environment, log: Logger) -> None:
+    def _initialize_nodes(
+        self,
+        environment: Environment,
+        log: Logger,
+        deployment_outputs: Optional[Dict[str, Any]] = None,
+    ) -> None:
         node_context_map: Dict[str, Node] = {}
         for node in environment.nodes.list():
             node_context = get_node_context(node)
             node_context_map[node_context.vm_name] = node
 
-        vms_map: Dict[str, VirtualMachine] = self._load_vms(environment, log)
-        nics_map: Dict[str, NetworkInterface] = self._load_nics(environment, log)
-        environment_context = get_environment_context(environment=environment)
-        public_ips_map: Dict[str, PublicIPAddress] = self._load_public_ips(
-            environment_context.resource_group_name, log
+        addresses = self._get_addresses_from_outputs(
+            deployment_outputs, list(node_context_map.keys())
         )
+        if addresses:
+            log.debug("addresses are loaded from deployment outputs.")
+        else:
+            addresses = self._load_addresses(environment, log)
 
         for vm_name, node in node_context_map.items():
             node_context = get_node_context(node)
-            vm = vms_map.get(vm_name, None)
-            if not vm:
+            if vm_name not in addresses:
                 raise LisaException(
                     f"cannot find vm: '{vm_name}', make sure deployment is correct."
                 )
-            nic = nics_map[vm_name]
-            public_ip = public_ips_map[vm_name]
-            assert (
-                public_ip.ip_address
-            ), f"public IP address cannot be empty, public_ip object: {public_ip}"
-
-            address = nic.ip_configurations[0].private_ip_address
+            address, public_address = addresses[vm_name]
             if not node.name:
                 node.name = vm_name
 
@@ -1379,13 +2258,93 @@ class AzurePlatform(Platform):
             node.set_connection_info(
                 address=address,
                 port=22,
-                public_address=public_ip.ip_address,
+                public_address=public_address,
                 public_port=22,
                 username=node_context.username,
                 password=node_context.password,
                 private_key_file=node_context.private_key_file,
             )
 
+    def _get_addresses_from_outputs(
+        self, deployment_outputs: Optional[Dict[str, Any]], vm_names: List[str]
+    ) -> Dict[str, Tuple[str, str]]:
+        """
+        return private and public addresses of vms from outputs of the arm
+        template. If any of them is missing, return empty, so they are listed from
+        resources.
+        """
+        addresses: Dict[str, Tuple[str, str]] = {}
+        if not deployment_outputs:
+            return addresses
+        for output in deployment_outputs.get("nodes", None) or []:
+            name = output.get("name", "")
+            private_address = output.get("private_ip_address", "")
+            public_address = output.get("public_ip_address", "")
+            if name and private_address and public_address:
+                addresses[name] = (private_address, public_address)
+        if any(x not in addresses for x in vm_names):
+            return {}
+        return addresses
+
+    def _load_addresses(
+        self, environment: Environment, log: Logger
+    ) -> Dict[str, Tuple[str, str]]:
+        """
+        list vms, nics and public ips concurrently, and return private and public
+        addresses of vms.
+        """
+        environment_context = get_environment_context(environment=environment)
+        compute_client = get_compute_client(self)
+        # nics and public ips share the network client.
+        network_client = get_network_client(self)
+
+        results: Dict[str, Dict[str, Any]] = {}
+
+        def _save_result(result: Tuple[str, Dict[str, Any]]) -> None:
+            results[result[0]] = result[1]
+
+        loaders: List[Tuple[str, Callable[[], Dict[str, Any]]]] = [
+            ("vms", partial(self._load_vms, environment, log, compute_client)),
+            ("nics", partial(self._load_nics, environment, log, network_client)),
+            (
+                "public_ips",
+                partial(
+                    self._load_public_ips,
+                    environment_context.resource_group_name,
+                    log,
+                    network_client,
+                ),
+            ),
+        ]
+        task_manager = TaskManager[Tuple[str, Dict[str, Any]]](
+            len(loaders), _save_result
+        )
+        for index, (name, loader) in enumerate(loaders):
+            task_manager.submit_task(
+                Task[Tuple[str, Dict[str, Any]]](
+                    index, partial(_run_loader, name, loader), log
+                )
+            )
+        task_manager.wait_for_all_workers()
+
+        addresses: Dict[str, Tuple[str, str]] = {}
+        for vm_name in results["vms"]:
+            nic: Optional[NetworkInterface] = results["nics"].get(vm_name, None)
+            public_ip: Optional[PublicIPAddress] = results["public_ips"].get(
+                vm_name, None
+            )
+            if not nic or not public_ip:
+                log.debug(f"skipped vm '{vm_name}', its nic or public ip not found.")
+                continue
+            assert (
+                public_ip.ip_address
+            ), f"public IP address cannot be empty, public_ip object: {public_ip}"
+            addresses[vm_name] = (
+                nic.ip_configurations[0].private_ip_address,
+                public_ip.ip_address,
+            )
+        return addresses
+
     def _resource_sku_to_capability(  # noqa: C901
         self, location: str, resource_sku: ResourceSku
     ) -> schema.NodeSpace:
@@ -1504,51 +2463,151 @@ class AzurePlatform(Platform):
         # 1. vm size supported in current location
         # 2. vm size match predefined pattern
 
-        location_capabilities: List[AzureCapability] = []
-
         key = self._get_location_key(location)
         if key not in self._eligible_capabilities:
-            location_info: AzureLocation = self._get_location_info(location, log)
-            # loop all fall back levels
-            for fallback_pattern in VM_SIZE_FALLBACK_PATTERNS:
-                level_capabilities: List[AzureCapability] = []
-
-                # loop all capabilities
-                for capability in location_info.capabilities:
-                    if fallback_pattern.match(capability.vm_size):
-                        level_capabilities.append(capability)
-
-                # sort by rough cost
-                level_capabilities.sort(key=lambda x: (x.estimated_cost))
-                log.debug(
-                    f"{key}, pattern '{fallback_pattern.pattern}'"
-                    f" {len(level_capabilities)} candidates: "
-                    f"{[x.vm_size for x in level_capabilities]}"
-                )
-                location_capabilities.extend(level_capabilities)
-            self._eligible_capabilities[key] = location_capabilities
+            location_info, records, _ = self._get_capability_index(location, log)
+            self._eligible_capabilities[key] = location_info.get(
+                [x.vm_size for x in records]
+            )
         return self._eligible_capabilities[key]
 
+    def _get_eligible_records(
+        self, location_info: AzureLocationCapabilities, log: Logger
+    ) -> List[CapabilityRecord]:
+        eligible_records: List[CapabilityRecord] = []
+        key = self._get_location_key(location_info.location)
+        # loop all fall back levels
+        for fallback_pattern in VM_SIZE_FALLBACK_PATTERNS:
+            level_records = [
+                x for x in location_info.records if fallback_pattern.match(x.vm_size)
+            ]
+
+            # sort by rough cost
+            level_records.sort(key=lambda x: (x.estimated_cost))
+            log.debug(
+                f"{key}, pattern '{fallback_pattern.pattern}'"
+                f" {len(level_records)} candidates: "
+                f"{[x.vm_size for x in level_records]}"
+            )
+            eligible_records.extend(level_records)
+        return eligible_records
+
+    def _get_capability_index(
+        self, location: str, log: Logger
+    ) -> Tuple[AzureLocationCapabilities, List[CapabilityRecord], CapabilityIndex]:
+        key = self._get_location_key(location)
+        location_info = self._get_location_info(location, log)
+        result = self._capability_indexes.get(key, None)
+        if not result or result[0] is not location_info:
+            records = self._get_eligible_records(location_info, log)
+            index = CapabilityIndex(
+                records, disk_settings_type=features.AzureDiskOptionSettings
+            )
+            result = (location_info, records, index)
+            self._capability_indexes[key] = result
+        return result
+
+    def _find_capability_by_vm_size(
+        self, location: str, vm_size: str, log: Logger
+    ) -> Optional[AzureCapability]:
+        location_info, records, index = self._get_capability_index(location, log)
+        # exact match is the best match, so no need to compare all vm sizes. The
+        # eligible records include all vm sizes of the location.
+        matched_index = index.get_by_name(vm_size)
+        if matched_index is not None:
+            matched_vm_size = records[matched_index].vm_size
+        else:
+            vm_size = vm_size.lower()
+            matched_score: float = 0
+            matched_vm_size = ""
+            matcher = SequenceMatcher(None, vm_size, "")
+            for record in location_info.records:
+                matcher.set_seq2(record.vm_size.lower())
+                if (
+                    vm_size in record.vm_size.lower()
+                    and matched_score < matcher.ratio()
+                ):
+                    matched_vm_size = record.vm_size
+                    matched_score = matcher.ratio()
+            if not matched_vm_size:
+                return None
+        return next(iter(location_info.get([matched_vm_size])), None)
+
+    def _get_candidate_capabilities(
+        self, location: str, requirement: schema.NodeSpace, log: Logger
+    ) -> List[AzureCapability]:
+        """
+        return eligible capabilities, which pass the index, in the order of
+        eligible vm sizes. They still need to be checked with the requirement.
+        Only the candidates are parsed.
+        """
+        location_info, records, index = self._get_capability_index(location, log)
+        return location_info.get([records[x].vm_size for x in index.find(requirement)])
+
     def _parse_marketplace_image(
         self, location: str, marketplace: AzureVmMarketplaceSchema
     ) -> AzureVmMarketplaceSchema:
-        compute_client = get_compute_client(self)
         new_marketplace = copy.copy(marketplace)
         if marketplace.version.lower() == "latest":
-            with global_credential_access_lock:
-                # latest doesn't work, it needs a specified version.
-                versioned_images = compute_client.virtual_machine_images.list(
-                    location=location,
-                    publisher_name=marketplace.publisher,
-                    offer=marketplace.offer,
-                    skus=marketplace.sku,
-                )
             # any one should be the same to get purchase plan
-            new_marketplace.version = versioned_images[-1].name
+            new_marketplace.version = self._get_cached_image_value(
+                "version", location, marketplace, self._query_latest_image_version
+            )
         return new_marketplace
 
+    def _query_latest_image_version(
+        self, location: str, marketplace: AzureVmMarketplaceSchema
+    ) -> str:
+        compute_client = get_compute_client(self)
+        with global_credential_access_lock:
+            # latest doesn't work, it needs a specified version.
+            versioned_images = compute_client.virtual_machine_images.list(
+                location=location,
+                publisher_name=marketplace.publisher,
+                offer=marketplace.offer,
+                skus=marketplace.sku,
+            )
+        version: str = versioned_images[-1].name
+        return version
+
+    def _get_cached_image_value(
+        self,
+        kind: str,
+        location: str,
+        marketplace: AzureVmMarketplaceSchema,
+        query: Callable[[str, AzureVmMarketplaceSchema], Any],
+    ) -> Any:
+        """
+        memoize image related queries in a run. The lock of each key makes sure
+        a query runs once, even it's called by multiple environments at the same
+        time.
+        """
+        key = (
+            f"{kind}/{self.subscription_id}/{location}/{marketplace.publisher}/"
+            f"{marketplace.offer}/{marketplace.sku}/{marketplace.version}"
+        ).lower()
+        with self._image_cache_lock:
+            if key in self._image_cache:
+                return self._image_cache[key]
+            lock = self._get_location_lock(f"image/{key}")
+        with lock:
+            if key not in self._image_cache:
+                value = query(location, marketplace)
+                with self._image_cache_lock:
+                    self._image_cache[key] = value
+            return self._image_cache[key]
+
     def _process_marketplace_image_plan(
         self, location: str, marketplace: AzureVmMarketplaceSchema
+    ) -> Optional[PurchasePlan]:
+        # the terms are accepted once, so it's memoized.
+        plan: Optional[PurchasePlan] = self._get_cached_image_value(
+            "plan", location, marketplace, self._query_marketplace_image_plan
+        )
+        return plan
+
+    def _query_marketplace_image_plan(
+        self, location: str, marketplace: AzureVmMarketplaceSchema
     ) -> Optional[PurchasePlan]:
         """
         this method to fill plan, if a VM needs it. If don't fill it, the deployment
@@ -1742,32 +2801,61 @@ class AzurePlatform(Platform):
         )
         full_vhd_path = f"{container_client.url}/{vhd_path}"
 
-        # lock here to prevent a vhd is copied in multi-thread
-        global _global_sas_vhd_copy_lock
-        cached_key: Optional[bytearray] = None
-        with _global_sas_vhd_copy_lock:
-            blobs = container_client.list_blobs(name_starts_with=vhd_path)
-            for blob in blobs:
-                if blob:
-                    # check if hash key matched with original key.
-                    if blob.content_settings:
-                        cached_key = blob.content_settings.get("content_md5", None)
-                    if original_key == cached_key:
-                        # if it exists, return the link, not to copy again.
-                        log.debug("the sas url is copied already, use it directly.")
-                        return full_vhd_path
-                    else:
-                        log.debug("found cached vhd, but the hash key mismatched.")
+        # only one thread copies a vhd, others wait for the result of it.
+        with _sas_vhd_copies_lock:
+            copy_future = _sas_vhd_copies.get(full_vhd_path, None)
+            is_copier = copy_future is None
+            if copy_future is None:
+                copy_future = Future()
+                _sas_vhd_copies[full_vhd_path] = copy_future
+        if not is_copier:
+            log.debug("the vhd is copying by other environment, wait for it.")
+            return copy_future.result()
 
-            blob_client = container_client.get_blob_client(vhd_path)
-            blob_client.start_copy_from_url(
-                original_vhd_path, metadata=None, incremental_copy=False
+        try:
+            self._copy_sas_vhd(
+                container_client, original_vhd_path, original_key, vhd_path, log
             )
-
-            wait_copy_blob(blob_client, vhd_path, log)
+            copy_future.set_result(full_vhd_path)
+        except Exception as identifier:
+            copy_future.set_exception(identifier)
+            raise identifier
+        finally:
+            # the copied vhd is found by listing blobs in later calls.
+            with _sas_vhd_copies_lock:
+                _sas_vhd_copies.pop(full_vhd_path, None)
 
         return full_vhd_path
 
+    def _copy_sas_vhd(
+        self,
+        container_client: Any,
+        original_vhd_path: str,
+        original_key: Optional[bytearray],
+        vhd_path: str,
+        log: Logger,
+    ) -> None:
+        cached_key: Optional[bytearray] = None
+        blobs = container_client.list_blobs(name_starts_with=vhd_path)
+        for blob in blobs:
+            if blob:
+                # check if hash key matched with original key.
+                if blob.content_settings:
+                    cached_key = blob.content_settings.get("content_md5", None)
+                if original_key == cached_key:
+                    # if it exists, return the link, not to copy again.
+                    log.debug("the sas url is copied already, use it directly.")
+                    return
+                else:
+                    log.debug("found cached vhd, but the hash key mismatched.")
+
+        blob_client = container_client.get_blob_client(vhd_path)
+        blob_client.start_copy_from_url(
+            original_vhd_path, metadata=None, incremental_copy=False
+        )
+
+        wait_copy_blob(blob_client, vhd_path, log)
+
     def _generate_data_disks(
         self,
         node: Node,
@@ -1814,8 +2902,15 @@ class AzurePlatform(Platform):
     def _get_image_info(
         self, location: str, marketplace: Optional[AzureVmMarketplaceSchema]
     ) -> VirtualMachineImage:
-        compute_client = get_compute_client(self)
         assert isinstance(marketplace, AzureVmMarketplaceSchema)
+        return self._get_cached_image_value(
+            "info", location, marketplace, self._query_image_info
+        )
+
+    def _query_image_info(
+        self, location: str, marketplace: AzureVmMarketplaceSchema
+    ) -> VirtualMachineImage:
+        compute_client = get_compute_client(self)
         with global_credential_access_lock:
             image_info = compute_client.virtual_machine_images.get(
                 location=location,
@@ -1840,6 +2935,27 @@ class AzurePlatform(Platform):
         return public_ips_map[vm_name].ip_address  # type: ignore
 
 
+def _run_loader(
+    name: str, loader: Callable[[], Dict[str, Any]]
+) -> Tuple[str, Dict[str, Any]]:
+    return name, loader()
+
+
+def _set_resource_group_name(environment: Environment, name: str) -> None:
+    get_environment_context(environment=environment).resource_group_name = name
+    for node in environment.nodes.list():
+        get_node_context(node).resource_group_name = name
+
+
+def _wait_operations(operations: List[Any]) -> List[Any]:
+    # the operations run in parallel, and are waited one by one.
+    results: List[Any] = []
+    for operation in operations:
+        wait_operation(operation)
+        results.append(operation.result())
+    return results
+
+
 def _convert_to_azure_node_space(node_space: schema.NodeSpace) -> None:
     if node_space:
         if node_space.features:
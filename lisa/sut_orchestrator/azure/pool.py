@@ -0,0 +1,167 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+# wait for the write lock of other processes.
+_BUSY_TIMEOUT = 60
+# a lease isn't released in this period, it's considered abandoned by a crashed
+# run, and the environment can be leased again.
+DEFAULT_LEASE_TIMEOUT = timedelta(hours=24)
+
+POOL_STATE_IDLE = "idle"
+POOL_STATE_LEASED = "leased"
+
+_create_table_sql = """
+    CREATE TABLE IF NOT EXISTS pooled_environments (
+        subscription_id TEXT NOT NULL,
+        resource_group_name TEXT NOT NULL,
+        pool_key TEXT NOT NULL,
+        state TEXT NOT NULL,
+        owner TEXT NOT NULL,
+        updated_time TEXT NOT NULL,
+        PRIMARY KEY (subscription_id, resource_group_name)
+    )
+    """
+
+
+class EnvironmentPool:
+    """
+    A SQLite journal of deployed environments, which are kept between runs. An
+    environment is idle in the pool, or leased by a run. The leasing is in a
+    write transaction, so concurrent runs on the same machine don't lease the
+    same environment.
+
+    The pool key identifies the shape of environments, so only environments of
+    the same shape are reused.
+    """
+
+    def __init__(
+        self, path: Path, lease_timeout: timedelta = DEFAULT_LEASE_TIMEOUT
+    ) -> None:
+        self._path = path
+        self._lease_timeout = lease_timeout
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(_create_table_sql)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def lease(self, subscription_id: str, pool_key: str, owner: str) -> Optional[str]:
+        """
+        lease an idle or abandoned environment, and return its resource group
+        name. Return None, if there is no matched environment.
+        """
+        now = datetime.now()
+        expired_time = (now - self._lease_timeout).isoformat()
+        with self._connect() as connection:
+            # take the write lock before reading, so the selected environment
+            # isn't leased by others.
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT resource_group_name FROM pooled_environments "
+                "WHERE subscription_id = ? AND pool_key = ? "
+                "AND (state = ? OR (state = ? AND updated_time < ?)) "
+                "ORDER BY updated_time LIMIT 1",
+                (
+                    subscription_id,
+                    pool_key,
+                    POOL_STATE_IDLE,
+                    POOL_STATE_LEASED,
+                    expired_time,
+                ),
+            ).fetchone()
+            if not row:
+                return None
+            connection.execute(
+                "UPDATE pooled_environments SET state = ?, owner = ?, "
+                "updated_time = ? WHERE subscription_id = ? "
+                "AND resource_group_name = ?",
+                (POOL_STATE_LEASED, owner, now.isoformat(), subscription_id, row[0]),
+            )
+        return str(row[0])
+
+    def release(
+        self,
+        subscription_id: str,
+        resource_group_name: str,
+        pool_key: str,
+        max_idle_count: int,
+    ) -> bool:
+        """
+        return the environment to the pool. If there are enough idle
+        environments of the same pool key, it's removed from the pool, and
+        return False, so the caller should delete it.
+        """
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            idle_count = connection.execute(
+                "SELECT COUNT(*) FROM pooled_environments WHERE subscription_id = ? "
+                "AND pool_key = ? AND state = ? AND resource_group_name != ?",
+                (subscription_id, pool_key, POOL_STATE_IDLE, resource_group_name),
+            ).fetchone()[0]
+            if idle_count >= max_idle_count:
+                self._remove(connection, subscription_id, resource_group_name)
+                return False
+            connection.execute(
+                "INSERT OR REPLACE INTO pooled_environments (subscription_id, "
+                "resource_group_name, pool_key, state, owner, updated_time) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    subscription_id,
+                    resource_group_name,
+                    pool_key,
+                    POOL_STATE_IDLE,
+                    "",
+                    datetime.now().isoformat(),
+                ),
+            )
+        return True
+
+    def remove(self, subscription_id: str, resource_group_name: str) -> None:
+        with self._connect() as connection:
+            self._remove(connection, subscription_id, resource_group_name)
+
+    def list(self, subscription_id: str) -> List[Tuple[str, str, str]]:
+        """
+        return resource group names, pool keys and states of a subscription.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT resource_group_name, pool_key, state FROM "
+                "pooled_environments WHERE subscription_id = ? ORDER BY updated_time",
+                (subscription_id,),
+            ).fetchall()
+        return [(x[0], x[1], x[2]) for x in rows]
+
+    def _remove(
+        self,
+        connection: sqlite3.Connection,
+        subscription_id: str,
+        resource_group_name: str,
+    ) -> None:
+        connection.execute(
+            "DELETE FROM pooled_environments WHERE subscription_id = ? "
+            "AND resource_group_name = ?",
+            (subscription_id, resource_group_name),
+        )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # it's in autocommit mode, and transactions are begun explicitly, when
+        # they need the write lock before reading.
+        connection = sqlite3.connect(
+            str(self._path), timeout=_BUSY_TIMEOUT, isolation_level=None
+        )
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
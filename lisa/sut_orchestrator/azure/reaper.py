@@ -0,0 +1,256 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import random
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from threading import Condition, Event, Lock, Thread
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from lisa.util.logger import Logger
+
+# wait for the write lock of other processes.
+_BUSY_TIMEOUT = 60
+# the delay of checking an operation grows from the min to the max.
+_MIN_CHECK_DELAY = 2.0
+_MAX_CHECK_DELAY = 60.0
+DEFAULT_MAX_PENDING = 200
+
+_create_table_sql = """
+    CREATE TABLE IF NOT EXISTS deletions (
+        subscription_id TEXT NOT NULL,
+        resource_group_name TEXT NOT NULL,
+        error TEXT NOT NULL,
+        updated_time TEXT NOT NULL,
+        PRIMARY KEY (subscription_id, resource_group_name)
+    )
+    """
+
+
+class DeletionJournal:
+    """
+    A SQLite journal of resource groups, which are deleting or failed to delete.
+    An entry is added before deleting, and removed after the deletion succeeded.
+    So the remaining entries can be deleted again in next run, even if the
+    process exited before deletions completed.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(_create_table_sql)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def add(
+        self, subscription_id: str, resource_group_name: str, error: str = ""
+    ) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO deletions (subscription_id, "
+                "resource_group_name, error, updated_time) VALUES (?, ?, ?, ?)",
+                (
+                    subscription_id,
+                    resource_group_name,
+                    error,
+                    datetime.now().isoformat(),
+                ),
+            )
+
+    def remove(self, subscription_id: str, resource_group_name: str) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "DELETE FROM deletions WHERE subscription_id = ? "
+                "AND resource_group_name = ?",
+                (subscription_id, resource_group_name),
+            )
+
+    def list(self, subscription_id: str) -> List[Tuple[str, str]]:
+        """
+        return resource group names and errors of a subscription.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT resource_group_name, error FROM deletions "
+                "WHERE subscription_id = ? ORDER BY updated_time",
+                (subscription_id,),
+            ).fetchall()
+        return [(x[0], x[1]) for x in rows]
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(str(self._path), timeout=_BUSY_TIMEOUT)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+
+@dataclass
+class _Deletion:
+    subscription_id: str
+    resource_group_name: str
+    operation: Any
+    delay: float = _MIN_CHECK_DELAY
+    next_check_time: float = field(default_factory=time.time)
+
+
+class DeletionReaper:
+    """
+    It tracks delete operations in a background thread, so the callers don't
+    wait on deletions. The operations are checked with exponential backoff and
+    jitter. The succeeded deletions are removed from the journal, and the
+    failed ones are kept in the journal with errors.
+
+    If there are too many pending deletions, new ones are not tracked, but they
+    are still in the journal, and they will be checked in next run.
+    """
+
+    def __init__(
+        self,
+        journal: DeletionJournal,
+        log: Logger,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ) -> None:
+        self._journal = journal
+        self._log = log
+        self._max_pending = max_pending
+        self._lock = Lock()
+        self._idle = Condition(self._lock)
+        self._wake_up = Event()
+        self._pending: List[_Deletion] = []
+        self._thread: Optional[Thread] = None
+
+        self._succeeded: List[str] = []
+        self._failed: Dict[str, str] = {}
+        self._untracked: List[str] = []
+
+    @property
+    def journal(self) -> DeletionJournal:
+        return self._journal
+
+    @property
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def add_failure(
+        self, subscription_id: str, resource_group_name: str, error: str
+    ) -> None:
+        """
+        record a deletion, which failed before an operation is created.
+        """
+        self._journal.add(subscription_id, resource_group_name, error)
+        with self._lock:
+            self._failed[resource_group_name] = error
+
+    def submit(
+        self, subscription_id: str, resource_group_name: str, operation: Any
+    ) -> None:
+        self._journal.add(subscription_id, resource_group_name)
+        with self._lock:
+            if len(self._pending) >= self._max_pending:
+                self._untracked.append(resource_group_name)
+                self._log.debug(
+                    f"too many pending deletions, '{resource_group_name}' "
+                    f"will be checked in next run."
+                )
+                return
+            self._pending.append(
+                _Deletion(
+                    subscription_id=subscription_id,
+                    resource_group_name=resource_group_name,
+                    operation=operation,
+                    next_check_time=time.time() + _MIN_CHECK_DELAY,
+                )
+            )
+            if not self._thread:
+                self._thread = Thread(
+                    target=self._run, name="deletion_reaper", daemon=True
+                )
+                self._thread.start()
+        self._wake_up.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        wait all pending deletions completed. Return False, if it's timeout.
+        """
+        # check pending deletions now, instead of waiting for the backoff.
+        with self._lock:
+            for deletion in self._pending:
+                deletion.delay = _MIN_CHECK_DELAY
+                deletion.next_check_time = time.time()
+        self._wake_up.set()
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def summarize(self) -> Tuple[List[str], Dict[str, str], List[str]]:
+        """
+        return and reset succeeded, failed, and pending resource groups.
+        """
+        with self._lock:
+            pending = [x.resource_group_name for x in self._pending]
+            pending.extend(self._untracked)
+            result = (self._succeeded, self._failed, pending)
+            self._succeeded = []
+            self._failed = {}
+            self._untracked = []
+        return result
+
+    def _run(self) -> None:
+        while True:
+            now = time.time()
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    self._idle.notify_all()
+                    return
+                due_deletions = [x for x in self._pending if x.next_check_time <= now]
+
+            for deletion in due_deletions:
+                if self._check(deletion):
+                    with self._lock:
+                        self._pending.remove(deletion)
+
+            with self._lock:
+                if not self._pending:
+                    continue
+                wait_time = min(x.next_check_time for x in self._pending) - time.time()
+            self._wake_up.wait(max(wait_time, 0))
+            self._wake_up.clear()
+
+    def _check(self, deletion: _Deletion) -> bool:
+        """
+        return True, if the operation is completed.
+        """
+        name = deletion.resource_group_name
+        try:
+            if not deletion.operation.done():
+                deletion.delay = min(deletion.delay * 2, _MAX_CHECK_DELAY)
+                deletion.next_check_time = time.time() + deletion.delay * (
+                    0.5 + random.random() / 2
+                )
+                return False
+            deletion.operation.result()
+        except Exception as identifier:
+            error = str(identifier)
+            self._log.debug(f"failed to delete resource group '{name}': {error}")
+            self._journal.add(deletion.subscription_id, name, error)
+            with self._lock:
+                self._failed[name] = error
+            return True
+
+        self._log.debug(f"deleted resource group '{name}'")
+        self._journal.remove(deletion.subscription_id, name)
+        with self._lock:
+            self._succeeded.append(name)
+        return True
@@ -2,23 +2,56 @@
 # Licensed under the MIT license.
 
 import re
-from functools import partial
-from typing import Callable, Dict, List, Mapping, Optional, Pattern, Set, Union, cast
+from collections import defaultdict
+from functools import lru_cache, partial
+from types import SimpleNamespace
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Pattern,
+    Set,
+    TypeVar,
+    Union,
+)
 
 from lisa import schema
-from lisa.testsuite import TestCaseMetadata, TestCaseRuntimeData, get_cases_metadata
+from lisa.testsuite import (
+    TestCaseMetadata,
+    TestCaseRuntimeData,
+    TestSuiteMetadata,
+    get_cases_metadata,
+    is_lazy_suite,
+    load_lazy_suites,
+)
 from lisa.util import LisaException, constants, set_filtered_fields
 from lisa.util.logger import get_logger
 
 _get_logger = partial(get_logger, "init", "selector")
 
+_T = TypeVar("_T")
+
+_CRITERIA_KEYS = [
+    constants.NAME,
+    constants.TESTCASE_CRITERIA_AREA,
+    constants.TESTCASE_CRITERIA_CATEGORY,
+    constants.TESTCASE_CRITERIA_PRIORITY,
+    constants.TESTCASE_CRITERIA_TAGS,
+]
+
 
 def select_testcases(
     filters: Optional[List[schema.TestCase]] = None,
     init_cases: Optional[List[TestCaseMetadata]] = None,
+    load_suites: bool = True,
 ) -> List[TestCaseRuntimeData]:
     """
     based on filters to select test cases. If filters are None, return all cases.
+    If load_suites is False, the selected cases may be placeholders from the test
+    manifest, which have no requirements and test methods.
     """
     log = _get_logger()
     if init_cases:
@@ -31,9 +64,15 @@ def select_testcases(
         selected: Dict[str, TestCaseRuntimeData] = {}
         force_included: Set[str] = set()
         force_excluded: Set[str] = set()
+        case_index = _CaseIndex(full_list)
         for filter in filters:
             selected = _apply_filter(
-                filter, selected, force_included, force_excluded, full_list
+                filter,
+                selected,
+                force_included,
+                force_excluded,
+                full_list,
+                case_index,
             )
         results: List[TestCaseRuntimeData] = []
         for case in selected.values():
@@ -48,86 +87,153 @@ def select_testcases(
         for metadata in full_list.values():
             results.append(TestCaseRuntimeData(metadata))
 
+    if load_suites:
+        _load_lazy_cases(results)
+
     log.info(f"selected count: {len(results)}")
-    for result in results:
-        metadata = result.metadata
-        log.info(
-            f"{metadata.full_name}, "
-            f"area: {metadata.suite.area}, "
-            f"category: {metadata.suite.category}, "
-            f"tags: {metadata.tags}, "
-            f"priority: {metadata.priority}"
+    # log all cases in one record, it's much faster than one by one.
+    log.debug(
+        "selected cases:\n"
+        + "\n".join(
+            f"{x.metadata.full_name}, "
+            f"area: {x.metadata.suite.area}, "
+            f"category: {x.metadata.suite.category}, "
+            f"tags: {x.metadata.tags}, "
+            f"priority: {x.metadata.priority}"
+            for x in results
         )
+    )
     return results
 
 
-def _match_string(
-    case: Union[TestCaseRuntimeData, TestCaseMetadata],
-    pattern: Pattern[str],
-    attr_name: str,
-) -> bool:
-    content = cast(str, getattr(case, attr_name))
-    match = pattern.fullmatch(content)
-    return match is not None
+def _load_lazy_cases(results: List[TestCaseRuntimeData]) -> None:
+    # import modules of selected cases only, and replace the placeholders.
+    names = {
+        x.metadata.suite.name for x in results if is_lazy_suite(x.metadata.suite.name)
+    }
+    if not names:
+        return
+    load_lazy_suites(names)
+    all_cases = get_cases_metadata()
+    for result in results:
+        result.metadata = all_cases[result.metadata.full_name]
 
 
-def _match_priority(
-    case: Union[TestCaseRuntimeData, TestCaseMetadata], pattern: Union[int, List[int]]
-) -> bool:
-    priority = case.priority
-    is_matched: bool = False
-    if isinstance(pattern, int):
-        is_matched = priority == pattern
-    else:
-        is_matched = any(x == priority for x in pattern)
-    return is_matched
+@lru_cache(maxsize=None)
+def _compile(pattern: str) -> Pattern[str]:
+    # patterns are the same across iterations of combinators, so cache them.
+    return re.compile(pattern)
 
 
-def _match_tags(
-    case: Union[TestCaseRuntimeData, TestCaseMetadata],
-    criteria_tags: Union[str, List[str]],
-) -> bool:
-    case_tags = case.tags
-    is_matched: bool = False
-    if isinstance(criteria_tags, str):
-        is_matched = criteria_tags in case_tags
-    else:
-        is_matched = any(x in case_tags for x in criteria_tags)
-    return is_matched
+def _to_list(value: Union[_T, List[_T]]) -> List[_T]:
+    return value if isinstance(value, list) else [value]
 
 
-def _match_cases(
-    candidates: Mapping[str, Union[TestCaseRuntimeData, TestCaseMetadata]],
-    patterns: List[Callable[[Union[TestCaseRuntimeData, TestCaseMetadata]], bool]],
-) -> Dict[str, TestCaseRuntimeData]:
-    changed_cases: Dict[str, TestCaseRuntimeData] = {}
+class _CaseIndex:
+    """
+    The indexes of test cases by area, category, tag and priority. The criteria
+    are matched by set operations on them, and the name patterns are evaluated
+    on remaining candidates only.
+    """
+
+    def __init__(self, cases: Mapping[str, TestCaseMetadata]) -> None:
+        self._cases = cases
+        self._positions: Dict[str, int] = {}
+        self._areas: Dict[str, Set[str]] = defaultdict(set)
+        self._categories: Dict[str, Set[str]] = defaultdict(set)
+        self._tags: Dict[str, Set[str]] = defaultdict(set)
+        self._priorities: Dict[int, Set[str]] = defaultdict(set)
+        self._names: Dict[str, Set[str]] = defaultdict(set)
+        # area, category and tags are defined on suites, so index them by suite.
+        suites: Dict[int, TestSuiteMetadata] = {}
+        suite_cases: Dict[int, Set[str]] = defaultdict(set)
+        for position, (name, case) in enumerate(cases.items()):
+            self._positions[name] = position
+            self._names[case.name].add(name)
+            self._priorities[case.priority].add(name)
+            suite = case.suite
+            suites[id(suite)] = suite
+            suite_cases[id(suite)].add(name)
+        for suite_id, names in suite_cases.items():
+            suite = suites[suite_id]
+            self._areas[suite.area].update(names)
+            self._categories[suite.category].update(names)
+            for tag in suite.tags:
+                self._tags[tag].update(names)
+
+    def query(
+        self, criteria: schema.Criteria, candidates: Mapping[str, Any]
+    ) -> List[str]:
+        """
+        return names of matched candidates, in the order of all cases.
+        """
+        # all rules are AND condition, None means no rule is applied.
+        matched: Optional[Set[str]] = None
+        if criteria.area is not None:
+            matched = self._intersect(
+                matched, self._match_pattern(self._areas, criteria.area)
+            )
+        if criteria.category is not None:
+            matched = self._intersect(
+                matched, self._match_pattern(self._categories, criteria.category)
+            )
+        if criteria.priority is not None:
+            matched = self._intersect(
+                matched, self._union(self._priorities, _to_list(criteria.priority))
+            )
+        if criteria.tags is not None:
+            matched = self._intersect(
+                matched, self._union(self._tags, _to_list(criteria.tags))
+            )
+
+        if criteria.name is not None:
+            if matched is None:
+                matched = self._match_pattern(self._names, criteria.name)
+            else:
+                pattern = _compile(criteria.name)
+                matched = {x for x in matched if pattern.fullmatch(self._cases[x].name)}
+
+        if matched is None:
+            names: Set[str] = set(candidates)
+        else:
+            names = {x for x in matched if x in candidates}
+
+        return sorted(names, key=self._positions.__getitem__)
+
+    def _match_pattern(self, index: Dict[str, Set[str]], pattern: str) -> Set[str]:
+        expression = _compile(pattern)
+        return self._union(index, [x for x in index if expression.fullmatch(x)])
 
-    for candidate_name in candidates:
-        candidate = candidates[candidate_name]
-        is_matched = all(pattern(candidate) for pattern in patterns)
-        if is_matched:
-            if isinstance(candidate, TestCaseMetadata):
-                candidate = TestCaseRuntimeData(candidate)
-            changed_cases[candidate_name] = candidate
-    return changed_cases
+    def _union(self, index: Dict[_T, Set[str]], keys: List[_T]) -> Set[str]:
+        result: Set[str] = set()
+        for key in keys:
+            result.update(index.get(key, ()))
+        return result
+
+    def _intersect(self, matched: Optional[Set[str]], names: Set[str]) -> Set[str]:
+        return names if matched is None else matched & names
 
 
 def _apply_settings(
-    applied_case_data: TestCaseRuntimeData, case_runbook: schema.TestCase, action: str
+    cases: Iterable[TestCaseRuntimeData], case_runbook: schema.TestCase, action: str
 ) -> None:
+    # get settings once, and apply them on all cases.
     fields = [
         constants.TESTCASE_TIMES,
         constants.TESTCASE_RETRY,
         constants.TESTCASE_IGNORE_FAILURE,
         constants.ENVIRONMENT,
     ]
-    set_filtered_fields(case_runbook, applied_case_data, fields)
-    applied_case_data.use_new_environment = (
-        applied_case_data.use_new_environment or case_runbook.use_new_environment
-    )
+    settings = SimpleNamespace()
+    set_filtered_fields(case_runbook, settings, fields)
+    for applied_case_data in cases:
+        applied_case_data.__dict__.update(settings.__dict__)
+        applied_case_data.use_new_environment = (
+            applied_case_data.use_new_environment or case_runbook.use_new_environment
+        )
 
-    # use default value from selector
-    applied_case_data.select_action = action
+        # use default value from selector
+        applied_case_data.select_action = action
 
 
 def _force_check(
@@ -150,46 +256,29 @@ def _force_check(
     return is_skip
 
 
-def _apply_filter(  # noqa: C901
+def _count_criteria(criteria: schema.Criteria) -> int:
+    count = 0
+    for runbook_key, runbook_value in criteria.__dict__.items():
+        if runbook_value is None:
+            continue
+        if runbook_key not in _CRITERIA_KEYS:
+            raise LisaException(f"unknown criteria key: {runbook_key}")
+        count += 1
+    return count
+
+
+def _apply_filter(
     case_runbook: schema.TestCase,
     current_selected: Dict[str, TestCaseRuntimeData],
     force_included: Set[str],
     force_excluded: Set[str],
-    full_list: Dict[str, TestCaseMetadata],
+    full_list: Mapping[str, TestCaseMetadata],
+    index: _CaseIndex,
 ) -> Dict[str, TestCaseRuntimeData]:
-    # TODO: Reduce this function's complexity and remove the disabled warning.
-
     log = _get_logger()
-    # initialize criteria
-    patterns: List[Callable[[Union[TestCaseRuntimeData, TestCaseMetadata]], bool]] = []
     criteria_runbook = case_runbook.criteria
     assert criteria_runbook, "test case criteria cannot be None"
-    criteria_runbook_dict = criteria_runbook.__dict__
-    for runbook_key, runbook_value in criteria_runbook_dict.items():
-        if runbook_value is None:
-            continue
-        if runbook_key in [
-            constants.NAME,
-            constants.TESTCASE_CRITERIA_AREA,
-            constants.TESTCASE_CRITERIA_CATEGORY,
-        ]:
-            pattern = cast(str, criteria_runbook_dict[runbook_key])
-            expression = re.compile(pattern)
-            patterns.append(
-                partial(_match_string, pattern=expression, attr_name=runbook_key)
-            )
-        elif runbook_key == constants.TESTCASE_CRITERIA_PRIORITY:
-            priority_pattern = cast(
-                Union[int, List[int]], criteria_runbook_dict[runbook_key]
-            )
-            patterns.append(partial(_match_priority, pattern=priority_pattern))
-        elif runbook_key == constants.TESTCASE_CRITERIA_TAGS:
-            tag_pattern = cast(
-                Union[str, List[str]], criteria_runbook_dict[runbook_key]
-            )
-            patterns.append(partial(_match_tags, criteria_tags=tag_pattern))
-        else:
-            raise LisaException(f"unknown criteria key: {runbook_key}")
+    criteria_count = _count_criteria(criteria_runbook)
 
     # match by select Action:
     changed_cases: Dict[str, TestCaseRuntimeData] = {}
@@ -205,14 +294,14 @@ def _apply_filter(  # noqa: C901
     temp_force_set: Set[str] = set()
     if case_runbook.select_action is constants.TESTCASE_SELECT_ACTION_NONE:
         # Just apply settings on test cases
-        changed_cases = _match_cases(current_selected, patterns)
+        for name in index.query(criteria_runbook, current_selected):
+            changed_cases[name] = current_selected[name]
     elif case_runbook.select_action in [
         constants.TESTCASE_SELECT_ACTION_INCLUDE,
         constants.TESTCASE_SELECT_ACTION_FORCE_INCLUDE,
     ]:
         # to include cases
-        changed_cases = _match_cases(full_list, patterns)
-        for name, new_case_data in changed_cases.items():
+        for name in index.query(criteria_runbook, full_list):
             is_skip = _force_check(
                 name,
                 is_force,
@@ -225,15 +314,16 @@ def _apply_filter(  # noqa: C901
                 continue
 
             # reuse original test cases
-            case_data = current_selected.get(name, new_case_data)
-            current_selected[name] = case_data
+            case_data = current_selected.get(name, None)
+            if case_data is None:
+                case_data = TestCaseRuntimeData(full_list[name])
+                current_selected[name] = case_data
             changed_cases[name] = case_data
     elif case_runbook.select_action in [
         constants.TESTCASE_SELECT_ACTION_EXCLUDE,
         constants.TESTCASE_SELECT_ACTION_FORCE_EXCLUDE,
     ]:
-        changed_cases = _match_cases(current_selected, patterns)
-        for name in changed_cases:
+        for name in index.query(criteria_runbook, current_selected):
             is_skip = _force_check(
                 name,
                 is_force,
@@ -244,21 +334,19 @@ def _apply_filter(  # noqa: C901
             )
             if is_skip:
                 continue
-            del current_selected[name]
+            changed_cases[name] = current_selected.pop(name)
     else:
         raise LisaException(f"unknown selectAction: '{case_runbook.select_action}'")
 
-    # changed set cannot be operated in it's for loop, so update it here.
-    for name in temp_force_set:
-        del changed_cases[name]
     if is_update_setting:
-        for case_data in changed_cases.values():
-            _apply_settings(case_data, case_runbook, case_runbook.select_action)
+        _apply_settings(
+            changed_cases.values(), case_runbook, case_runbook.select_action
+        )
 
     log.debug(
         f"applying action: [{case_runbook.select_action}] on "
-        f"case [{changed_cases.keys()}], "
-        f"data: {case_runbook}, loaded criteria count: {len(patterns)}"
+        f"{len(changed_cases)} cases, "
+        f"data: {case_runbook}, loaded criteria count: {criteria_count}"
     )
 
     return current_selected
@@ -4,6 +4,9 @@
 from __future__ import annotations
 
 import copy
+import hashlib
+import json
+import sys
 from dataclasses import dataclass, field
 from enum import Enum
 from functools import wraps
@@ -14,8 +17,11 @@ from typing import (
     Any,
     Callable,
     Dict,
+    Iterable,
+    Iterator,
     List,
     Optional,
+    Set,
     Tuple,
     Type,
     Union,
@@ -30,6 +36,7 @@ from lisa.feature import Feature
 from lisa.operating_system import OperatingSystem, Windows
 from lisa.util import (
     BadEnvironmentStateException,
+    BaseClassMixin,
     LisaException,
     PassedException,
     SkippedException,
@@ -45,10 +52,12 @@ from lisa.util.logger import (
     Logger,
     add_handler,
     create_file_handler,
+    get_case_log_max_size,
     get_logger,
     remove_handler,
 )
 from lisa.util.perf_timer import Timer, create_timer
+from lisa.util.tracing import CATEGORY_TEST, start_span
 
 if TYPE_CHECKING:
     from lisa.environment import Environment
@@ -76,6 +85,18 @@ TestStatus = Enum(
 
 _all_suites: Dict[str, TestSuiteMetadata] = {}
 _all_cases: Dict[str, TestCaseMetadata] = {}
+# the suites and cases are registered from manifest, and their modules are not
+# imported. The value of lazy suites is the function to import the module.
+_lazy_suites: Dict[str, Callable[[], None]] = {}
+_lazy_cases: Set[str] = set()
+
+MANIFEST_FILE_NAME = "test_manifest.json"
+# increase it, when the format of manifest is changed.
+_MANIFEST_VERSION = 1
+
+# results of checking environment requirements with capabilities.
+_CHECK_RESULT_CACHE_SIZE = 10000
+_check_result_cache = search_space.CheckResultCache(_CHECK_RESULT_CACHE_SIZE)
 
 
 @dataclass
@@ -110,6 +131,7 @@ class TestResult:
     def __post_init__(self, *args: Any, **kwargs: Any) -> None:
         self._send_result_message()
         self._timer: Timer
+        self._requirement_fingerprint = search_space.CachedFingerprint()
 
     @property
     def is_queued(self) -> bool:
@@ -185,26 +207,26 @@ class TestResult:
         self, environment: Environment, save_reason: bool = False
     ) -> bool:
         requirement = self.runtime_data.metadata.requirement
-        assert requirement.environment
-        check_result = requirement.environment.check(environment.capability)
-        if (
-            check_result.result
-            and requirement.os_type
-            and environment.status == EnvironmentStatus.Connected
-        ):
-            for node in environment.nodes.list():
-                # the UT has no OS initialized, skip the check
-                if not hasattr(node, "os"):
-                    continue
-                # use __mro__ to match any super types.
-                # for example, Ubuntu satisfies Linux
-                node_os_capability = search_space.SetSpace[Type[OperatingSystem]](
-                    is_allow_set=True, items=type(node.os).__mro__
-                )
-                check_result.merge(
-                    requirement.os_type.check(node_os_capability), "os_type"
-                )
-                if not check_result.result:
+        environment_requirement = requirement.environment
+        assert environment_requirement
+        # many cases share the same requirement, and the same pair is checked
+        # many times by the scheduler, so the result is cached by fingerprints.
+        check_result = _check_result_cache.get_or_check(
+            # the nodes may be replaced by the platform requirement.
+            self._requirement_fingerprint.get(
+                [environment_requirement, *environment_requirement.nodes],
+                lambda: environment_requirement,
+            ),
+            environment.capability_fingerprint,
+            environment_requirement,
+            lambda: environment.capability,
+        )
+        if check_result.result and requirement.os_type:
+            for node_os_capability in self._get_os_capabilities(environment):
+                if not requirement.os_type.matches(node_os_capability):
+                    check_result.merge(
+                        requirement.os_type.check(node_os_capability), "os_type"
+                    )
                     break
         if save_reason:
             if self.check_results:
@@ -213,6 +235,21 @@ class TestResult:
                 self.check_results = check_result
         return check_result.result
 
+    def _get_os_capabilities(
+        self, environment: Environment
+    ) -> Iterator[search_space.SetSpace[Type[OperatingSystem]]]:
+        if environment.status != EnvironmentStatus.Connected:
+            return
+        for node in environment.nodes.list():
+            # the UT has no OS initialized, skip the check
+            if not hasattr(node, "os"):
+                continue
+            # use __mro__ to match any super types.
+            # for example, Ubuntu satisfies Linux
+            yield search_space.SetSpace[Type[OperatingSystem]](
+                is_allow_set=True, items=type(node.os).__mro__
+            )
+
     def _send_result_message(self) -> None:
         if hasattr(self, "_timer"):
             self.elapsed = self._timer.elapsed(False)
@@ -563,7 +600,14 @@ class TestSuite:
             case_log_path = self.__create_case_log_path(case_name)
             case_unique_name = case_log_path.name
             case_log_file = case_log_path / f"{case_log_path.name}.log"
-            case_log_handler = create_file_handler(case_log_file, case_log)
+            case_log_handler = create_file_handler(
+                case_log_file, case_log, max_size=get_case_log_max_size()
+            )
+            if case_log_handler:
+                # the file name may be changed, if it's compressed.
+                case_log_file = case_log_file.with_name(
+                    Path(case_log_handler.baseFilename).name
+                )
             add_handler(case_log_handler, environment.log)
 
             case_kwargs = test_kwargs.copy()
@@ -582,30 +626,36 @@ class TestSuite:
             case_result.set_status(TestStatus.RUNNING, "")
             case_timeout = case_result.runtime_data.metadata.timeout
 
-            if is_continue:
-                is_continue = self.__before_case(
-                    case_result=case_result,
-                    timeout=case_timeout,
-                    test_kwargs=case_kwargs,
-                    log=case_log,
-                )
-            else:
-                case_result.set_status(TestStatus.SKIPPED, suite_error_message)
-
-            if is_continue:
-                self.__run_case(
+            with start_span(
+                f"run {case_result.runtime_data.full_name}",
+                CATEGORY_TEST,
+                environment=environment.name,
+            ) as case_span:
+                if is_continue:
+                    is_continue = self.__before_case(
+                        case_result=case_result,
+                        timeout=case_timeout,
+                        test_kwargs=case_kwargs,
+                        log=case_log,
+                    )
+                else:
+                    case_result.set_status(TestStatus.SKIPPED, suite_error_message)
+
+                if is_continue:
+                    self.__run_case(
+                        case_result=case_result,
+                        timeout=case_timeout,
+                        test_kwargs=case_kwargs,
+                        log=case_log,
+                    )
+
+                self.__after_case(
                     case_result=case_result,
                     timeout=case_timeout,
                     test_kwargs=case_kwargs,
                     log=case_log,
                 )
-
-            self.__after_case(
-                case_result=case_result,
-                timeout=case_timeout,
-                test_kwargs=case_kwargs,
-                log=case_log,
-            )
+                case_span.set_attribute("status", case_result.status.name)
 
             case_log.info(
                 f"result: {case_result.status.name}, " f"elapsed: {total_timer}"
@@ -765,6 +815,193 @@ def get_cases_metadata() -> Dict[str, TestCaseMetadata]:
     return _all_cases
 
 
+def is_lazy_suite(name: str) -> bool:
+    return name in _lazy_suites
+
+
+def load_lazy_suites(names: Iterable[str]) -> None:
+    """
+    import modules of lazy suites, so the placeholders are replaced by the real
+    metadata.
+    """
+    for name in names:
+        loader = _lazy_suites.get(name, None)
+        if loader is None:
+            continue
+        loader()
+        if name in _lazy_suites:
+            raise LisaException(
+                f"test suite '{name}' is not found after its module is imported. "
+                f"The test manifest may be outdated, delete it and retry."
+            )
+
+
+class TestSuiteManifest:
+    """
+    It caches metadata of test suites in extension modules. If a module is not
+    changed, its test suites are registered from the manifest without importing
+    the module, and it's imported only when its test cases are selected.
+
+    The modules are compared by modified time and size, and by content hash if
+    they are different. Modules which define subclasses for factories, or
+    register plugins, are always imported.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._is_changed = False
+        self._log = get_logger("init", "manifest")
+        if path.exists():
+            try:
+                with open(path, "r") as f:
+                    data = json.load(f)
+                if data.get("version", None) == _MANIFEST_VERSION:
+                    self._files = data["files"]
+            except Exception as identifier:
+                # a broken manifest is rebuilt.
+                self._log.debug(f"ignored broken manifest '{path}': {identifier}")
+
+    def import_module(
+        self, file: Path, full_module_name: str, import_module: Callable[[], None]
+    ) -> None:
+        """
+        It's the importer of lisa.util.package.import_package. The module is
+        imported, or its test suites are registered from the manifest.
+        """
+        key = str(file.absolute())
+        stat = file.stat()
+        entry = self._files.get(key, None)
+        if entry and entry["module"] != full_module_name:
+            entry = None
+        if entry and (entry["mtime"], entry["size"]) != (stat.st_mtime, stat.st_size):
+            # the modified time may be changed by checking out, so compare the
+            # content.
+            if entry["sha256"] == _hash_file(file):
+                entry["mtime"] = stat.st_mtime
+                self._is_changed = True
+            else:
+                entry = None
+
+        if entry and entry["suites"] and full_module_name not in sys.modules:
+            for suite in entry["suites"]:
+                _add_lazy_suite_metadata(suite, import_module)
+            return
+
+        if entry is None:
+            self._files[key] = self._create_entry(file, full_module_name, import_module)
+            self._is_changed = True
+        else:
+            import_module()
+
+    def save(self) -> None:
+        if not self._is_changed:
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temp file and replace, so concurrent runs don't read a
+        # partial manifest.
+        temp_path = self._path.with_suffix(f".{id(self)}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump({"version": _MANIFEST_VERSION, "files": self._files}, f)
+        temp_path.replace(self._path)
+        self._is_changed = False
+
+    def _create_entry(
+        self, file: Path, full_module_name: str, import_module: Callable[[], None]
+    ) -> Dict[str, Any]:
+        is_imported = full_module_name in sys.modules
+        plugin_count = len(plugin_manager.get_plugins())
+        import_module()
+
+        suites = [
+            x
+            for x in _all_suites.values()
+            if x.__dict__.get("test_class", None)
+            and x.test_class.__module__ == full_module_name
+        ]
+        module = sys.modules[full_module_name]
+        has_subclasses = any(
+            isinstance(x, type)
+            and issubclass(x, BaseClassMixin)
+            and x.__module__ == full_module_name
+            for x in vars(module).values()
+        )
+        is_lazy = (
+            not is_imported
+            and not has_subclasses
+            and plugin_count == len(plugin_manager.get_plugins())
+        )
+        stat = file.stat()
+        return {
+            "module": full_module_name,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "sha256": _hash_file(file),
+            "suites": [_suite_to_dict(x) for x in suites] if is_lazy else [],
+        }
+
+
+def _hash_file(file: Path) -> str:
+    with open(file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _suite_to_dict(suite: TestSuiteMetadata) -> Dict[str, Any]:
+    return {
+        "name": suite.name,
+        "area": suite.area,
+        "category": suite.category,
+        "description": suite.description,
+        "tags": suite.tags,
+        "owner": suite.owner,
+        "cases": [
+            {
+                "name": x.name,
+                "full_name": x.full_name,
+                "description": x.description,
+                "priority": x.priority,
+                "timeout": x.timeout,
+                "use_new_environment": x.use_new_environment,
+                "owner": x._owner,
+            }
+            for x in suite.cases
+        ],
+    }
+
+
+def _add_lazy_suite_metadata(data: Dict[str, Any], loader: Callable[[], None]) -> None:
+    # the requirements are not in manifest, they are loaded with the module,
+    # after test cases are selected.
+    suite = TestSuiteMetadata(
+        area=data["area"],
+        category=data["category"],
+        description=data["description"],
+        tags=data["tags"],
+        name=data["name"],
+        owner=data["owner"],
+    )
+    key = suite.name
+    if key in _all_suites:
+        raise LisaException(f"duplicate test class name: {key}")
+    _all_suites[key] = suite
+    _lazy_suites[key] = loader
+    for case_data in data["cases"]:
+        case = TestCaseMetadata(
+            description=case_data["description"],
+            priority=case_data["priority"],
+            timeout=case_data["timeout"],
+            use_new_environment=case_data["use_new_environment"],
+            owner=case_data["owner"],
+        )
+        case.name = case_data["name"]
+        case.full_name = case_data["full_name"]
+        if case.full_name in _all_cases:
+            raise LisaException(f"duplicate test class name: {case.full_name}")
+        _all_cases[case.full_name] = case
+        _lazy_cases.add(case.full_name)
+        _add_case_to_suite(suite, case)
+
+
 def _add_suite_metadata(metadata: TestSuiteMetadata) -> None:
     if metadata.name:
         key = metadata.name
@@ -773,6 +1010,15 @@ def _add_suite_metadata(metadata: TestSuiteMetadata) -> None:
     exist_metadata = _all_suites.get(key)
     if exist_metadata is None:
         _all_suites[key] = metadata
+    elif key in _lazy_suites:
+        # replace the placeholder from manifest, and remove its cases, which are
+        # not redefined.
+        del _lazy_suites[key]
+        for test_case in exist_metadata.cases:
+            if test_case.full_name in _lazy_cases:
+                _lazy_cases.remove(test_case.full_name)
+                del _all_cases[test_case.full_name]
+        _all_suites[key] = metadata
     else:
         raise LisaException(
             f"duplicate test class name: {key}, "
@@ -795,6 +1041,10 @@ def _add_case_metadata(metadata: TestCaseMetadata) -> None:
     full_name = metadata.full_name
     if _all_cases.get(full_name) is None:
         _all_cases[full_name] = metadata
+    elif full_name in _lazy_cases:
+        # replace the placeholder from manifest.
+        _lazy_cases.remove(full_name)
+        _all_cases[full_name] = metadata
     else:
         raise LisaException(f"duplicate test class name: {full_name}")
 
@@ -804,7 +1054,7 @@ def _add_case_metadata(metadata: TestCaseMetadata) -> None:
     #   to make two collection consistent.
     class_name = full_name.split(".")[0]
     test_suite = _all_suites.get(class_name)
-    if test_suite:
+    if test_suite and class_name not in _lazy_suites:
         log = get_logger("init", "test")
         log.debug(f"add case '{metadata.name}' to suite '{test_suite.name}'")
         _add_case_to_suite(test_suite, metadata)
@@ -3,10 +3,14 @@
 import re
 from decimal import Decimal
 from enum import Enum
-from typing import Any, Dict, List, cast
+from typing import Any, Dict, List, Optional, Tuple, cast
 
 from lisa.executable import Tool
-from lisa.notifier import DiskPerformanceMessage
+from lisa.notifier import (
+    DiskPerformanceMessage,
+    PerfMetricMessage,
+    create_perf_metric_messages,
+)
 from lisa.operating_system import Debian, Posix, Redhat, Suse
 from lisa.util import LisaException, dict_to_fields
 
@@ -137,6 +141,46 @@ class Fio(Tool):
             fio_message.append(fio_result_message)
         return fio_message
 
+    def create_metric_messages(
+        self,
+        fio_message: DiskPerformanceMessage,
+        tags: Optional[Dict[str, Any]] = None,
+    ) -> List[PerfMetricMessage]:
+        """
+        Convert a disk performance message to generic metrics. The message holds
+        results of all modes on the same qdepth.
+        """
+        result_tags: Dict[str, Any] = dict(tags) if tags else {}
+        result_tags.update(
+            {
+                "core_count": fio_message.core_count,
+                "disk_count": fio_message.disk_count,
+                "block_size": fio_message.block_size,
+                "disk_setup_type": fio_message.disk_setup_type.name,
+                "disk_type": fio_message.disk_type.name,
+                "qdepth": fio_message.qdepth,
+                "iodepth": fio_message.iodepth,
+                "numjob": fio_message.numjob,
+            }
+        )
+        metrics: Dict[str, Tuple[Any, str]] = {}
+        for mode in FIOMODES:
+            iops = getattr(fio_message, f"{mode.name}_iops")
+            # the mode isn't run, if there is no iops.
+            if not iops:
+                continue
+            metrics[f"{mode.name}_iops"] = (iops, "IOPS")
+            metrics[f"{mode.name}_lat_usec"] = (
+                getattr(fio_message, f"{mode.name}_lat_usec"),
+                "usec",
+            )
+        return create_perf_metric_messages(
+            tool=self.command,
+            metrics=metrics,
+            test_case_name=fio_message.test_case_name,
+            tags=result_tags,
+        )
+
     def _install_dep_packages(self) -> None:
         posix_os: Posix = cast(Posix, self.node.os)
         if isinstance(self.node.os, Redhat):
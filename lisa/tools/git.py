@@ -21,6 +21,7 @@ class Git(Tool):
         r"and is not an empty directory.",
         re.M,
     )
+    COMMIT_PATTERN = re.compile(r"[0-9a-f]{40}")
 
     @property
     def command(self) -> str:
@@ -126,6 +127,30 @@ class Git(Tool):
         )
         result.assert_exit_code(message=f"failed on applying patches. {result.stdout}")
 
+    def get_remote_commit(self, url: str, ref: str = "") -> str:
+        """
+        resolve a ref of the remote repo to a commit id without cloning. The
+        commit of an annotated tag is returned, instead of the tag object.
+        """
+        if self.COMMIT_PATTERN.fullmatch(ref):
+            return ref
+        if not ref:
+            ref = "HEAD"
+        result = self.run(
+            f"ls-remote {url} {ref} {ref}^{{}}",
+            force_run=True,
+            no_info_log=True,
+            expected_exit_code=0,
+            expected_exit_code_failure_message=f"failed to query '{ref}' of {url}",
+        )
+        lines = [x.split() for x in result.stdout.splitlines() if x.strip()]
+        if not lines:
+            raise LisaException(f"cannot find '{ref}' in {url}")
+        for line in lines:
+            if line[-1].endswith("^{}"):
+                return line[0]
+        return lines[0][0]
+
     def list_tags(self, cwd: pathlib.PurePath) -> List[str]:
         result = self.run(
             "--no-pager tag --color=never",
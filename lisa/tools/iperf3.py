@@ -1,19 +1,37 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
-from typing import List, Type, cast
+import re
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Type, cast
 
 from lisa.executable import Tool
+from lisa.notifier import PerfMetricMessage, create_perf_metric_messages
 from lisa.operating_system import Posix
-from lisa.util.process import Process
+from lisa.util import LisaException, find_groups_in_lines
+from lisa.util.process import ExecutableResult, Process
 
 from .git import Git
 from .make import Make
 
+# convert to Gbps
+_bitrate_units: Dict[str, Decimal] = {
+    "": Decimal(1) / 1000 / 1000 / 1000,
+    "K": Decimal(1) / 1000 / 1000,
+    "M": Decimal(1) / 1000,
+    "G": Decimal(1),
+}
+
 
 class Iperf3(Tool):
     repo = "https://github.com/esnet/iperf"
     branch = "3.10.1"
+    # [  5]   0.00-10.00  sec  10.9 GBytes  9.39 Gbits/sec    0             sender
+    # [SUM]   0.00-10.04  sec  10.9 GBytes  9.35 Gbits/sec                  receiver
+    _summary_pattern = re.compile(
+        r"^\[\s*(?P<id>SUM|\d+)\]\s+\S+\s+sec\s+\S+\s+\w?Bytes\s+"
+        r"(?P<value>[\d.]+)\s+(?P<unit>\w?)bits/sec.*?(?P<role>sender|receiver)\s*$"
+    )
 
     @property
     def command(self) -> str:
@@ -93,13 +111,46 @@ class Iperf3(Tool):
         seconds: int = 10,
         parallel_number: int = 0,
         client_ip: str = "",
-    ) -> None:
+    ) -> ExecutableResult:
         process = self.run_as_client_async(
             server_ip, log_file, seconds, parallel_number, client_ip
         )
         timeout = seconds + 10
-        process.wait_result(
+        return process.wait_result(
             timeout,
             expected_exit_code=0,
             expected_exit_code_failure_message="fail to lanuch iperf3 client",
         )
+
+    def get_throughput_in_gbps(self, output: str) -> Dict[str, Decimal]:
+        """
+        Return throughput of sender and receiver from the client output. If
+        there are multiple streams, the SUM lines are used.
+        """
+        summaries = find_groups_in_lines(output, self._summary_pattern)
+        if any(x["id"] == "SUM" for x in summaries):
+            summaries = [x for x in summaries if x["id"] == "SUM"]
+        result: Dict[str, Decimal] = {}
+        for summary in summaries:
+            result[summary["role"]] = (
+                Decimal(summary["value"]) * _bitrate_units[summary["unit"]]
+            )
+        if not result:
+            raise LisaException("cannot find throughput summary in iperf3 output")
+        return result
+
+    def create_throughput_messages(
+        self,
+        output: str,
+        test_case_name: str = "",
+        tags: Optional[Dict[str, Any]] = None,
+    ) -> List[PerfMetricMessage]:
+        return create_perf_metric_messages(
+            tool=self.command,
+            metrics={
+                f"{role}_throughput_in_gbps": (value, "Gbps")
+                for role, value in self.get_throughput_in_gbps(output).items()
+            },
+            test_case_name=test_case_name,
+            tags=tags,
+        )
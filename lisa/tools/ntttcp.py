@@ -2,16 +2,29 @@
 # Licensed under the MIT license.
 
 import re
-from typing import List, Type
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Type
 
 from lisa.executable import Tool
+from lisa.notifier import PerfMetricMessage, create_perf_metric_messages
 from lisa.tools import Gcc, Git, Make
+from lisa.util import LisaException
 from lisa.util.process import ExecutableResult
 
+# convert to Gbps
+_throughput_units: Dict[str, Decimal] = {
+    "bps": Decimal(1) / 1000 / 1000 / 1000,
+    "Kbps": Decimal(1) / 1000 / 1000,
+    "Mbps": Decimal(1) / 1000,
+    "Gbps": Decimal(1),
+}
+
 
 class Ntttcp(Tool):
     repo = "https://github.com/microsoft/ntttcp-for-linux"
     throughput_pattern = re.compile(r" 	 throughput	:(.+)")
+    # 9.41Gbps
+    throughput_value_pattern = re.compile(r"^\s*(?P<value>[\d.]+)\s*(?P<unit>\w?bps)")
 
     @property
     def dependencies(self) -> List[Type[Tool]]:
@@ -44,3 +57,27 @@ class Ntttcp(Tool):
         else:
             result = "cannot find throughput"
         return result
+
+    def get_throughput_in_gbps(self, stdout: str) -> Decimal:
+        throughput = self.get_throughput(stdout)
+        matched = self.throughput_value_pattern.match(throughput)
+        if not matched or matched.group("unit") not in _throughput_units:
+            raise LisaException(f"cannot parse ntttcp throughput: '{throughput}'")
+        return (
+            Decimal(matched.group("value")) * _throughput_units[matched.group("unit")]
+        )
+
+    def create_throughput_messages(
+        self,
+        stdout: str,
+        test_case_name: str = "",
+        tags: Optional[Dict[str, Any]] = None,
+    ) -> List[PerfMetricMessage]:
+        return create_perf_metric_messages(
+            tool=self.command,
+            metrics={
+                "throughput_in_gbps": (self.get_throughput_in_gbps(stdout), "Gbps")
+            },
+            test_case_name=test_case_name,
+            tags=tags,
+        )
@@ -3,16 +3,37 @@
 
 import copy
 import functools
-from typing import Any, Dict, List, Set
+import glob
+import hashlib
+import json
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import Context, copy_context
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
 
 from lisa import schema
 from lisa.parameter_parser.runbook import RunbookBuilder
 from lisa.util import InitializableMixin, LisaException, constants, subclasses
 from lisa.util.logger import get_logger
+from lisa.util.output_cache import OutputCache
+from lisa.util.tracing import CATEGORY_TRANSFORMER, start_span
 from lisa.variable import VariableEntry, merge_variables, replace_variables
 
 _get_init_logger = functools.partial(get_logger, "init", "transformer")
 
+# the max count of transformers, which run at the same time.
+_MAX_CONCURRENCY = 8
+
+TRANSFORMER_CACHE_FOLDER_NAME = "transformer_outputs"
+# the fields don't change outputs of transformers, so they are not in the cache
+# key.
+_CACHE_EXCLUDED_FIELDS = ["name", "prefix", "rename", "depends_on", "enabled", "cache"]
+
+
+def get_default_cache_path() -> Path:
+    return constants.CACHE_PATH / TRANSFORMER_CACHE_FOLDER_NAME
+
 
 class Transformer(subclasses.BaseClassWithRunbookMixin, InitializableMixin):
     def __init__(
@@ -25,7 +46,7 @@ class Transformer(subclasses.BaseClassWithRunbookMixin, InitializableMixin):
         super().__init__(runbook, *args, **kwargs)
         self.name = runbook.name
         self.prefix = runbook.prefix
-        self.depends_on = runbook.depends_on
+        self.depends_on = runbook.depends_on or []
         self.rename = runbook.rename
 
         self._runbook_builder = runbook_builder
@@ -42,7 +63,10 @@ class Transformer(subclasses.BaseClassWithRunbookMixin, InitializableMixin):
             variables = {x: "mock value" for x in output_names}
         else:
             self._log.info("transformer is running.")
-            variables = self._internal_run()
+            with start_span(
+                f"transformer {self.name}", CATEGORY_TRANSFORMER, type=self.type_name()
+            ):
+                variables = self._run_with_cache()
 
         results: Dict[str, VariableEntry] = dict()
         unmatched_rename = copy.copy(self.rename)
@@ -69,6 +93,14 @@ class Transformer(subclasses.BaseClassWithRunbookMixin, InitializableMixin):
         """
         raise NotImplementedError()
 
+    @property
+    def _cache_inputs(self) -> Dict[str, str]:
+        """
+        Inputs, which decide outputs, but are not in the runbook. For example,
+        the commit of a git branch. They are a part of the cache key.
+        """
+        return {}
+
     def _initialize(self, *args: Any, **kwargs: Any) -> None:
         ...
 
@@ -78,6 +110,56 @@ class Transformer(subclasses.BaseClassWithRunbookMixin, InitializableMixin):
         """
         raise NotImplementedError()
 
+    def _run_with_cache(self) -> Dict[str, Any]:
+        cache_runbook: Optional[schema.TransformerCache] = self.runbook.cache
+        if not cache_runbook or not cache_runbook.enabled:
+            return self._internal_run()
+        if not self._output_names:
+            # a cache hit skips the run, so the side effects are skipped too.
+            # It's meaningful only for transformers, which return outputs.
+            self._log.info("run without cache, the transformer has no output.")
+            return self._internal_run()
+
+        try:
+            key = self._get_cache_key(cache_runbook)
+        except Exception as identifier:
+            self._log.info(f"run without cache, failed to get inputs: {identifier}")
+            return self._internal_run()
+
+        cache = OutputCache(get_default_cache_path())
+        outputs = cache.get(key, timedelta(hours=cache_runbook.ttl))
+        if outputs is not None:
+            self._log.info(f"returned cached outputs, key: {key}")
+            return outputs
+
+        outputs = self._internal_run()
+        if not cache.set(key, self.type_name(), self.name, outputs):
+            self._log.debug("outputs are not cached, they cannot be serialized.")
+        return outputs
+
+    def _get_cache_key(self, cache_runbook: schema.TransformerCache) -> str:
+        runbook_data = self.runbook.to_dict()
+        for name in _CACHE_EXCLUDED_FIELDS:
+            runbook_data.pop(name, None)
+
+        file_hashes: Dict[str, str] = {}
+        for pattern in cache_runbook.files:
+            paths = sorted(glob.glob(pattern, recursive=True))
+            if not paths:
+                raise LisaException(f"no file matches cache input '{pattern}'")
+            for path in paths:
+                file_hashes[path] = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+        key_data = {
+            "type": self.type_name(),
+            "runbook": runbook_data,
+            "inputs": self._cache_inputs,
+            "runbook_inputs": cache_runbook.inputs,
+            "files": file_hashes,
+        }
+        serialized = json.dumps(key_data, sort_keys=True, default=str)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
 
 def _sort(transformers: List[schema.Transformer]) -> List[schema.Transformer]:
     visited: Set[str] = set()
@@ -113,7 +195,7 @@ def _sort(transformers: List[schema.Transformer]) -> List[schema.Transformer]:
     # check cycle reference
     referenced: Set[str] = set()
     for transformer in sorted_transformers:
-        for item in transformer.depends_on:
+        for item in transformer.depends_on or []:
             if item not in referenced:
                 raise LisaException(
                     f"found cycle dependented transformers: "
@@ -131,7 +213,7 @@ def _sort_dfs(
     sorted_transformers: List[schema.Transformer],
 ) -> None:
     visited.add(transformer.name)
-    for item in transformer.depends_on:
+    for item in transformer.depends_on or []:
         if item not in visited:
             dependent = transformers.get(item, None)
             if not dependent:
@@ -149,6 +231,88 @@ def _run_transformers(
     is_dry_run: bool = False,
     phase: str = constants.TRANSFORMER_PHASE_INIT,
 ) -> Dict[str, VariableEntry]:
+    transformers_runbook = _load_transformers_runbook(runbook_builder, phase)
+
+    copied_variables: Dict[str, VariableEntry] = dict()
+    for value in runbook_builder.variables.values():
+        copied_variables[value.name] = value.copy()
+
+    # run transformers by the dependency graph. A transformer starts, when
+    # its dependencies are completed, so independent ones run in parallel.
+    dependencies = _get_dependencies(transformers_runbook)
+    outputs: Dict[str, Dict[str, VariableEntry]] = {}
+    failures: Dict[str, Exception] = {}
+    cancelled: Set[str] = set()
+    pending = transformers_runbook.copy()
+    running: Dict[Future[Dict[str, VariableEntry]], str] = {}
+    with ThreadPoolExecutor(max_workers=_MAX_CONCURRENCY) as pool:
+        while pending or running:
+            for runbook in pending.copy():
+                depended = dependencies[runbook.name]
+                if depended.intersection(failures) or depended.intersection(cancelled):
+                    pending.remove(runbook)
+                    cancelled.add(runbook.name)
+                    continue
+                if not all(x in outputs for x in depended):
+                    continue
+                pending.remove(runbook)
+
+                variables = _get_transformer_variables(
+                    copied_variables, transformers_runbook, depended, outputs
+                )
+                try:
+                    transformer = _create_transformer(
+                        runbook, runbook_builder, variables
+                    )
+                except Exception as identifier:
+                    failures[runbook.name] = identifier
+                    continue
+                # copy the context, so the tracing span is kept in the thread.
+                running[
+                    pool.submit(
+                        _run_transformer, transformer, is_dry_run, copy_context()
+                    )
+                ] = runbook.name
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    outputs[name] = future.result()
+                except Exception as identifier:
+                    failures[name] = identifier
+
+    _raise_failures(transformers_runbook, failures, cancelled)
+
+    # merge outputs in the sorted order, so the latter overwrites the former,
+    # no matter which one completes first.
+    for runbook in transformers_runbook:
+        merge_variables(copied_variables, outputs[runbook.name])
+
+    return copied_variables
+
+
+def _raise_failures(
+    transformers: List[schema.Transformer],
+    failures: Dict[str, Exception],
+    cancelled: Set[str],
+) -> None:
+    if cancelled:
+        _get_init_logger().info(
+            f"cancelled transformers on failed dependencies: "
+            f"{[x.name for x in transformers if x.name in cancelled]}"
+        )
+    # raise the first failure in the sorted order, so it's deterministic.
+    for transformer in transformers:
+        if transformer.name in failures:
+            raise failures[transformer.name]
+
+
+def _load_transformers_runbook(
+    runbook_builder: RunbookBuilder, phase: str
+) -> List[schema.Transformer]:
     root_runbook_data = runbook_builder.raw_data
     transformers_data: List[Any] = root_runbook_data[constants.TRANSFORMER]
     assert isinstance(
@@ -167,32 +331,82 @@ def _run_transformers(
             transformers_runbook.append(runbook)
 
     # resort the runbooks, and it's used in real run
-    transformers_runbook = _sort(transformers_runbook)
+    return _sort(transformers_runbook)
 
-    copied_variables: Dict[str, VariableEntry] = dict()
-    for value in runbook_builder.variables.values():
-        copied_variables[value.name] = value.copy()
 
+def _get_transformer_variables(
+    variables: Dict[str, VariableEntry],
+    transformers: List[schema.Transformer],
+    depended: Set[str],
+    outputs: Dict[str, Dict[str, VariableEntry]],
+) -> Dict[str, VariableEntry]:
+    # the variables include outputs of depended transformers only, and they are
+    # merged in the sorted order.
+    result = {x.name: x.copy() for x in variables.values()}
+    for item in transformers:
+        if item.name in depended:
+            merge_variables(result, outputs[item.name])
+    return result
+
+
+def _get_dependencies(
+    transformers: List[schema.Transformer],
+) -> Dict[str, Set[str]]:
+    """
+    return all direct and indirect dependencies of sorted transformers. If
+    depends_on is not specified, the transformer depends on all transformers
+    before it, so it runs in the order of runbook.
+    """
+    dependencies: Dict[str, Set[str]] = {}
+    for index, transformer in enumerate(transformers):
+        if transformer.depends_on is None:
+            direct_dependencies = [x.name for x in transformers[:index]]
+        else:
+            direct_dependencies = transformer.depends_on
+        all_dependencies: Set[str] = set()
+        for name in direct_dependencies:
+            all_dependencies.add(name)
+            all_dependencies.update(dependencies[name])
+        dependencies[transformer.name] = all_dependencies
+    return dependencies
+
+
+def _create_transformer(
+    runbook: schema.Transformer,
+    runbook_builder: RunbookBuilder,
+    variables: Dict[str, VariableEntry],
+) -> Transformer:
+    # serialize to data for replacing variables
+    runbook_data = runbook.to_dict()  # type: ignore
+
+    # replace to validate all variables exist
+    replace_variables(runbook_data, variables)
+
+    # revert to runbook
+    runbook = schema.load_by_type(schema.Transformer, runbook_data)
+
+    derived_builder = runbook_builder.derive(variables)
     factory = subclasses.Factory[Transformer](Transformer)
-    for runbook in transformers_runbook:
-        # serialize to data for replacing variables
-        runbook_data = runbook.to_dict()  # type: ignore
+    transformer = factory.create_by_runbook(
+        runbook=runbook, runbook_builder=derived_builder
+    )
+    transformer.initialize()
+    return transformer
 
-        # replace to validate all variables exist
-        replace_variables(runbook_data, copied_variables)
 
-        # revert to runbook
-        runbook = schema.load_by_type(schema.Transformer, runbook_data)
+def _run_transformer(
+    transformer: Transformer, is_dry_run: bool, context: Context
+) -> Dict[str, VariableEntry]:
+    return context.run(transformer.run, is_dry_run)
 
-        derived_builder = runbook_builder.derive(copied_variables)
-        transformer = factory.create_by_runbook(
-            runbook=runbook, runbook_builder=derived_builder
-        )
-        transformer.initialize()
-        values = transformer.run(is_dry_run=is_dry_run)
-        merge_variables(copied_variables, values)
 
-    return copied_variables
+def has_transformers(runbook_builder: RunbookBuilder, phase: str) -> bool:
+    """
+    return True, if there are enabled transformers in the phase.
+    """
+    if constants.TRANSFORMER not in runbook_builder.raw_data:
+        return False
+    return bool(_load_transformers_runbook(runbook_builder, phase))
 
 
 def run(
@@ -216,7 +430,8 @@ def run(
 
     # real run
     log.debug("running transformers...")
-    output_variables = _run_transformers(runbook_builder, phase=phase)
+    with start_span(f"transformer phase {phase}", CATEGORY_TRANSFORMER):
+        output_variables = _run_transformers(runbook_builder, phase=phase)
     merge_variables(runbook_builder.variables, output_variables)
 
     # check if all variable in dry run shows up in real run. It helps fail
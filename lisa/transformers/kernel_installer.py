@@ -4,6 +4,7 @@
 
 import re
 from dataclasses import dataclass, field
+from functools import partial
 from typing import Any, Dict, List, Optional, Type, cast
 
 from dataclasses_json import dataclass_json
@@ -16,6 +17,7 @@ from lisa.tools import Uname
 from lisa.transformer import Transformer
 from lisa.util import field_metadata, filter_ansi_escape, get_matched_str, subclasses
 from lisa.util.logger import Logger, get_logger
+from lisa.util.parallel import Task, TaskManager
 
 
 @dataclass_json()
@@ -72,6 +74,9 @@ class KernelInstallerTransformerSchema(schema.Transformer):
     installer: Optional[BaseInstallerSchema] = field(
         default=None, metadata=field_metadata(required=True)
     )
+    # other nodes, which install the same kernel in parallel. The source
+    # installer with a build node builds the kernel once for all nodes.
+    extra_connections: List[schema.RemoteNode] = field(default_factory=list)
 
 
 class BaseInstaller(subclasses.BaseClassWithRunbookMixin):
@@ -112,7 +117,24 @@ class KernelInstallerTransformer(Transformer):
         assert runbook.connection, "connection must be defined."
         assert runbook.installer, "installer must be defined."
 
-        node = quick_connect(runbook.connection, "installer_node")
+        connections = [runbook.connection, *runbook.extra_connections]
+        task_manager = TaskManager[None](len(connections))
+        for index, connection in enumerate(connections):
+            task_manager.submit_task(
+                Task[None](
+                    index,
+                    partial(self._install_on_node, connection, index),
+                    self._log,
+                )
+            )
+        task_manager.wait_for_all_workers()
+
+        return {}
+
+    def _install_on_node(self, connection: schema.RemoteNode, index: int) -> None:
+        runbook: KernelInstallerTransformerSchema = self.runbook
+        assert runbook.installer, "installer must be defined."
+        node = quick_connect(connection, "installer_node", index=index)
 
         uname = node.tools[Uname]
         self._log.info(
@@ -142,8 +164,6 @@ class KernelInstallerTransformer(Transformer):
             f"{uname.get_linux_information(force_run=True)}"
         )
 
-        return {}
-
 
 class RepoInstaller(BaseInstaller):
     def __init__(
@@ -1,17 +1,20 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import hashlib
+import json
 from dataclasses import dataclass, field
-from pathlib import PurePath
-from typing import Any, List, Optional, Type, cast
+from pathlib import Path, PurePath
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple, Type, cast
 
 from dataclasses_json import dataclass_json
 
 from lisa import schema
-from lisa.node import Node
-from lisa.operating_system import Redhat, Ubuntu
+from lisa.node import Node, quick_connect
+from lisa.operating_system import Debian, Fedora, Redhat, Ubuntu
 from lisa.tools import Echo, Git, Make, Sed, Uname
-from lisa.util import LisaException, field_metadata, subclasses
+from lisa.util import LisaException, constants, field_metadata, subclasses
 from lisa.util.logger import Logger, get_logger
 
 from .kernel_installer import BaseInstaller, BaseInstallerSchema
@@ -76,6 +79,37 @@ class SourceInstallerSchema(BaseInstallerSchema):
     # Steps to modify code by patches and others.
     modifier: List[BaseModifierSchema] = field(default_factory=list)
 
+    # build kernel packages on this node, and install the packages on target
+    # nodes. It can be a local node to build on the orchestrator. The packages
+    # are built once, and cached by the source and config. If it's not set,
+    # the kernel is built on each target node.
+    build_node: Optional[schema.Node] = None
+    # use ccache on the build node, so rebuilds with small changes are faster.
+    # The ccache folder is kept on the build node between runs. If the path is
+    # empty, the default folder of ccache is used.
+    use_ccache: bool = True
+    ccache_path: str = ""
+
+
+KERNEL_PACKAGES_FOLDER_NAME = "kernel_packages"
+_KERNEL_VERSION_FILE_NAME = "kernel_version"
+_PACKAGE_TYPE_DEB = "deb"
+_PACKAGE_TYPE_RPM = "rpm"
+
+# builds of the current run, the key is the installer runbook. Installers of
+# target nodes run in parallel, and they wait on the lock of the same runbook,
+# so different builds run in parallel.
+_kernel_builds: Dict[str, "KernelPackages"] = {}
+_kernel_build_locks: Dict[str, Lock] = {}
+_kernel_build_locks_lock = Lock()
+
+
+@dataclass
+class KernelPackages:
+    kernel_version: str
+    package_type: str
+    paths: List[Path]
+
 
 class SourceInstaller(BaseInstaller):
     @classmethod
@@ -90,6 +124,31 @@ class SourceInstaller(BaseInstaller):
     def _output_names(self) -> List[str]:
         return []
 
+    def _get_source_commits(self) -> Dict[str, str]:
+        # the refs like branches may be moved, so they are resolved to commits.
+        source_runbook: SourceInstallerSchema = self.runbook
+        assert source_runbook.location, "the repo must be defined."
+        if source_runbook.location.type != RepoLocation.type_name():
+            raise LisaException(
+                f"cannot get the version of '{source_runbook.location.type}' "
+                "location, only the repo location is supported."
+            )
+        location = schema.load_by_type(RepoLocationSchema, source_runbook.location)
+        repos: Dict[str, Tuple[str, str]] = {"location": (location.repo, location.ref)}
+        for index, modifier in enumerate(source_runbook.modifier):
+            if modifier.type == PatchModifier.type_name():
+                patch = schema.load_by_type(PatchModifierSchema, modifier)
+                repos[f"modifier_{index}"] = (patch.repo, patch.ref)
+
+        node = quick_connect(
+            schema.LocalNode(), "source_commits", parent_logger=self._log
+        )
+        git = node.tools[Git]
+        return {
+            name: git.get_remote_commit(url=repo, ref=ref)
+            for name, (repo, ref) in repos.items()
+        }
+
     def validate(self) -> None:
         # nothing to validate before source installer started.
         ...
@@ -99,6 +158,11 @@ class SourceInstaller(BaseInstaller):
         runbook: SourceInstallerSchema = self.runbook
         assert runbook.location, "the repo must be defined."
 
+        if runbook.build_node:
+            packages = self._get_packages()
+            self._install_packages(node=node, packages=packages)
+            return packages.kernel_version
+
         self._install_build_tools(node)
 
         factory = subclasses.Factory[BaseLocation](BaseLocation)
@@ -132,6 +196,161 @@ class SourceInstaller(BaseInstaller):
 
         return kernel_version
 
+    def _get_packages(self) -> KernelPackages:
+        runbook: SourceInstallerSchema = self.runbook
+        assert runbook.build_node
+        runbook_key = json.dumps(runbook.to_dict(), sort_keys=True)  # type: ignore
+        with _kernel_build_locks_lock:
+            build_lock = _kernel_build_locks.setdefault(runbook_key, Lock())
+        with build_lock:
+            packages = _kernel_builds.get(runbook_key, None)
+            if not packages:
+                build_node = quick_connect(
+                    runbook.build_node, "kernel_builder", parent_logger=self._log
+                )
+                packages = self._build_packages(build_node)
+                _kernel_builds[runbook_key] = packages
+        return packages
+
+    def _build_packages(self, node: Node) -> KernelPackages:
+        runbook: SourceInstallerSchema = self.runbook
+        assert runbook.location, "the repo must be defined."
+        package_type = _get_package_type(node)
+        cache_path = self._get_packages_cache_path(node, package_type)
+        if cache_path:
+            packages = _load_packages(cache_path)
+            if packages:
+                self._log.info(f"use cached kernel packages: {cache_path}")
+                return packages
+
+        self._install_build_tools(node)
+        factory = subclasses.Factory[BaseLocation](BaseLocation)
+        source = factory.create_by_runbook(
+            runbook=runbook.location, node=node, parent_log=self._log
+        )
+        code_path = source.get_source_code()
+        assert node.shell.exists(code_path), f"cannot find code path: {code_path}"
+        self._log.info(f"kernel code path: {code_path}")
+        self._modify_code(node=node, code_path=code_path)
+
+        arguments, update_envs = self._get_build_arguments(node, package_type)
+        if package_type == _PACKAGE_TYPE_RPM:
+            # remove packages of previous builds, so only new ones are listed.
+            node.execute("rm -rf $HOME/rpmbuild/RPMS", shell=True)
+        self._build_code(
+            node=node,
+            code_path=code_path,
+            arguments=arguments,
+            update_envs=update_envs,
+        )
+
+        result = node.execute(
+            "make kernelrelease 2>/dev/null", cwd=code_path, shell=True
+        )
+        kernel_version = result.stdout
+        result.assert_exit_code(0, f"failed on get kernel version: {kernel_version}")
+
+        patterns = _get_package_patterns(code_path, kernel_version, package_type)
+        result = node.execute(f"ls {' '.join(patterns)}", shell=True)
+        result.assert_exit_code(0, f"failed on finding kernel packages: {result}")
+        node_paths = [node.get_pure_path(x) for x in result.stdout.splitlines()]
+
+        if not cache_path:
+            cache_path = (
+                constants.RUN_LOCAL_PATH / KERNEL_PACKAGES_FOLDER_NAME / kernel_version
+            )
+        cache_path.mkdir(parents=True, exist_ok=True)
+        paths: List[Path] = []
+        for node_path in node_paths:
+            path = cache_path / node_path.name
+            node.shell.copy_back(node_path, path)
+            paths.append(path)
+        # the version file is written at last, so a partial cache isn't used.
+        (cache_path / _KERNEL_VERSION_FILE_NAME).write_text(kernel_version)
+        self._log.info(f"built kernel packages: {[x.name for x in paths]}")
+
+        return KernelPackages(
+            kernel_version=kernel_version, package_type=package_type, paths=paths
+        )
+
+    def _get_build_arguments(
+        self, node: Node, package_type: str
+    ) -> Tuple[str, Dict[str, str]]:
+        runbook: SourceInstallerSchema = self.runbook
+        arguments = f"bin{package_type}-pkg"
+        update_envs: Dict[str, str] = {}
+        if not runbook.use_ccache:
+            return arguments, update_envs
+
+        # ccache is installed only if it's in the repo of the build node.
+        result = node.execute("command -v ccache", shell=True)
+        if result.exit_code != 0:
+            self._log.info("ccache is not found on the build node, build without it.")
+            return arguments, update_envs
+
+        arguments = f"CC='ccache gcc' {arguments}"
+        if runbook.ccache_path:
+            update_envs["CCACHE_DIR"] = runbook.ccache_path
+        return arguments, update_envs
+
+    def _get_packages_cache_path(self, node: Node, package_type: str) -> Optional[Path]:
+        """
+        The packages are cached by commits of the source, the kernel config of
+        the build node and the package type. Return None, if the source has no
+        commit, like a local folder.
+        """
+        try:
+            inputs = self._get_source_commits()
+        except Exception as identifier:
+            self._log.debug(f"kernel packages are not cached: {identifier}")
+            return None
+
+        uname = node.tools[Uname]
+        kernel_information = uname.get_linux_information()
+        result = node.execute(
+            f"cat /boot/config-{kernel_information.kernel_version_raw}"
+        )
+        result.assert_exit_code(0, "failed on reading kernel config")
+
+        key_data = {
+            "inputs": inputs,
+            "config": hashlib.sha256(result.stdout.encode("utf-8")).hexdigest(),
+            "package_type": package_type,
+            "modifier": [x.to_dict() for x in self.runbook.modifier],
+        }
+        serialized = json.dumps(key_data, sort_keys=True)
+        key = hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+        return constants.CACHE_PATH / KERNEL_PACKAGES_FOLDER_NAME / key
+
+    def _install_packages(self, node: Node, packages: KernelPackages) -> None:
+        package_path = node.working_path / KERNEL_PACKAGES_FOLDER_NAME
+        node.shell.mkdir(package_path, exist_ok=True)
+        node_paths: List[str] = []
+        for path in packages.paths:
+            node_path = package_path / path.name
+            node.shell.copy(path, node_path)
+            node_paths.append(str(node_path))
+        self._log.info(
+            f"installing kernel packages: {[x.name for x in packages.paths]}"
+        )
+
+        if packages.package_type == _PACKAGE_TYPE_DEB and isinstance(node.os, Debian):
+            result = node.execute(f"dpkg -i {' '.join(node_paths)}", sudo=True)
+        elif packages.package_type == _PACKAGE_TYPE_RPM and isinstance(node.os, Fedora):
+            result = node.execute(f"rpm -ivh --force {' '.join(node_paths)}", sudo=True)
+        else:
+            raise LisaException(
+                f"os '{node.os.name}' doesn't support '{packages.package_type}' "
+                f"kernel packages."
+            )
+        result.assert_exit_code(0, f"failed on installing kernel packages: {result}")
+
+        if isinstance(node.os, Redhat):
+            result = node.execute("grub2-set-default 0", sudo=True)
+            result.assert_exit_code()
+            result = node.execute("grub2-mkconfig -o /boot/grub2/grub.cfg", sudo=True)
+            result.assert_exit_code()
+
     def _install_build(self, node: Node, code_path: PurePath) -> None:
         make = node.tools[Make]
         make.make(arguments="modules", cwd=code_path, sudo=True)
@@ -170,7 +389,13 @@ class SourceInstaller(BaseInstaller):
             self._log.debug(f"modifying code by {modifier.type_name()}")
             modifier.modify()
 
-    def _build_code(self, node: Node, code_path: PurePath) -> None:
+    def _build_code(
+        self,
+        node: Node,
+        code_path: PurePath,
+        arguments: str = "",
+        update_envs: Optional[Dict[str, str]] = None,
+    ) -> None:
         self._log.info("building code...")
 
         uname = node.tools[Uname]
@@ -183,7 +408,7 @@ class SourceInstaller(BaseInstaller):
         result.assert_exit_code()
 
         config_path = code_path.joinpath(".config")
-        sed = self._node.tools[Sed]
+        sed = node.tools[Sed]
         sed.substitute(
             regexp="CONFIG_DEBUG_INFO_BTF=.*",
             replacement="CONFIG_DEBUG_INFO_BTF=no",
@@ -230,7 +455,12 @@ class SourceInstaller(BaseInstaller):
         make.make(arguments="olddefconfig", cwd=code_path)
 
         # set timeout to 2 hours
-        make.make(arguments="", cwd=code_path, timeout=60 * 60 * 2)
+        make.make(
+            arguments=arguments,
+            cwd=code_path,
+            timeout=60 * 60 * 2,
+            update_envs=update_envs,
+        )
 
     def _install_build_tools(self, node: Node) -> None:
         os = node.os
@@ -242,6 +472,8 @@ class SourceInstaller(BaseInstaller):
                 if os.is_package_in_repo(package):
                     os.install_packages(package)
             os.group_install_packages("Development Tools")
+            if os.is_package_in_repo("ccache"):
+                os.install_packages("ccache")
 
             if os.information.version < "8.0.0":
                 # git from default CentOS/RedHat 7.x does not support git tag format
@@ -395,3 +627,39 @@ def _get_code_path(path: str, node: Node, default_name: str) -> PurePath:
         code_path = node.working_path / default_name
 
     return code_path
+
+
+def _get_package_type(node: Node) -> str:
+    if isinstance(node.os, Debian):
+        return _PACKAGE_TYPE_DEB
+    if isinstance(node.os, Fedora):
+        return _PACKAGE_TYPE_RPM
+    raise LisaException(
+        f"os '{node.os.name}' doesn't support to build kernel packages."
+    )
+
+
+def _get_package_patterns(
+    code_path: PurePath, kernel_version: str, package_type: str
+) -> List[str]:
+    # only the kernel image and headers are needed by target nodes.
+    if package_type == _PACKAGE_TYPE_DEB:
+        return [
+            f"{code_path.parent}/linux-image-{kernel_version}_*.deb",
+            f"{code_path.parent}/linux-headers-{kernel_version}_*.deb",
+        ]
+    return ["$HOME/rpmbuild/RPMS/*/kernel-[0-9]*.rpm"]
+
+
+def _load_packages(path: Path) -> Optional[KernelPackages]:
+    version_file = path / _KERNEL_VERSION_FILE_NAME
+    if not version_file.exists():
+        return None
+    paths = sorted(x for x in path.iterdir() if x.suffix in [".deb", ".rpm"])
+    if not paths:
+        return None
+    return KernelPackages(
+        kernel_version=version_file.read_text(),
+        package_type=paths[0].suffix[1:],
+        paths=paths,
+    )
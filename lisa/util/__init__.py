@@ -441,6 +441,22 @@ def parse_version(version: str) -> VersionInfo:
     return release_version
 
 
+# schemas of dataclasses_json are generated on each call, and it's slow. So
+# cache them by type, they are stateless on loading.
+_schemas: Dict[type, Any] = {}
+
+
+def get_schema(schema_type: type) -> Any:
+    """
+    return the cached marshmallow schema of a dataclass_json type.
+    """
+    result = _schemas.get(schema_type, None)
+    if result is None:
+        result = schema_type.schema()  # type: ignore
+        _schemas[schema_type] = result
+    return result
+
+
 def field_metadata(
     field_function: Optional[Callable[..., Any]] = None, *args: Any, **kwargs: Any
 ) -> Any:
@@ -1,19 +1,56 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import atexit
+import gzip
 import logging
 import sys
 import time
+from collections import deque
 from functools import partial
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Any, Dict, List, Optional, TextIO, Union, cast
+from queue import Empty, SimpleQueue
+from threading import Lock
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Set,
+    TextIO,
+    Union,
+    cast,
+)
 
 from lisa.secret import mask
 from lisa.util import LisaException, filter_ansi_escape, is_unittest
+from lisa.util.perf_timer import create_timer
 
 # to prevent circular import, hard code it here.
 ENV_KEY_RUN_LOCAL_PATH = "LISA_RUN_LOCAL_PATH"
 DEFAULT_LOG_NAME = "lisa"
+# log files are written by a single thread, so the buffer can be large. The
+# buffered content is flushed periodically.
+_FILE_BUFFER_SIZE = 64 * 1024
+# in seconds
+_FILE_FLUSH_INTERVAL = 1.0
+
+LOG_COMPRESSION_NONE = "none"
+LOG_COMPRESSION_GZIP = "gzip"
+LOG_COMPRESSION_ZSTD = "zstd"
+_compression_suffixes: Dict[str, str] = {
+    LOG_COMPRESSION_GZIP: ".gz",
+    LOG_COMPRESSION_ZSTD: ".zst",
+}
+
+# they are set by command line arguments.
+_log_compression = LOG_COMPRESSION_NONE
+# 0 means no limitation. It's in characters of text.
+_case_log_max_size = 0
 
 
 class Logger(logging.Logger):
@@ -111,6 +148,223 @@ class LogWriter(object):
         self.flush()
 
 
+class QueuedFileHandler(logging.FileHandler):
+    """
+    A file handler, which is written by the log writer thread only. Test threads
+    put records into a queue, and never block on disk I/O. Records are
+    buffered, and flushed periodically by the writer thread.
+
+    The file can be compressed. If max_size is set, the head of content is
+    written until the half of max_size, and the tail is kept in memory. The tail
+    is written when the handler is closed, so the middle part is dropped.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        compression: str = LOG_COMPRESSION_NONE,
+        max_size: int = 0,
+    ) -> None:
+        self._compression = compression
+        self._head_size = max_size - max_size // 2
+        self._tail_max_size = max_size // 2
+        self._size = 0
+        self._is_head_full = False
+        self._tail: Deque[str] = deque()
+        self._tail_size = 0
+        self._truncated_size = 0
+        super().__init__(path, "w", "utf-8")
+
+    def _open(self) -> IO[Any]:
+        return _open_log_stream(
+            Path(self.baseFilename), self.mode, self._compression, self.encoding
+        )
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # don't flush on each record like the StreamHandler, the writer thread
+        # flushes files periodically.
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            content = f"{self.format(record)}{self.terminator}"
+            if self._head_size and (
+                self._is_head_full or self._size + len(content) > self._head_size
+            ):
+                self._is_head_full = True
+                self._keep_tail(content)
+            else:
+                self.stream.write(content)
+                self._size += len(content)
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        # close it after all records before this point are written.
+        _log_listener.close_handler(self)
+
+    def _close_file(self) -> None:
+        if self.stream and (self._tail or self._truncated_size):
+            self.stream.write(
+                f"... {self._truncated_size} characters are truncated, "
+                f"the log file exceeds max size ...{self.terminator}"
+            )
+            for content in self._tail:
+                self.stream.write(content)
+            self._tail.clear()
+            self._truncated_size = 0
+        logging.FileHandler.close(self)
+
+    def _keep_tail(self, content: str) -> None:
+        self._tail.append(content)
+        self._tail_size += len(content)
+        while self._tail and self._tail_size > self._tail_max_size:
+            dropped = self._tail.popleft()
+            self._tail_size -= len(dropped)
+            self._truncated_size += len(dropped)
+
+
+class QueuedLogListener(QueueListener):
+    """
+    The single writer of all queued file handlers. Records are routed by the
+    logger name. A handler receives records of the loggers, which it's added
+    to, and their children. It's same as the logging hierarchy, but the file
+    I/O happens in the writer thread only.
+
+    Routing changes are queued as same as records, so the order is kept. For
+    example, records are logged before a handler is removed from a logger,
+    they are still written to the file.
+    """
+
+    def __init__(self, flush_interval: float = _FILE_FLUSH_INTERVAL) -> None:
+        super().__init__(SimpleQueue(), respect_handler_level=False)
+        self._flush_interval = flush_interval
+        self._queue_handler = QueueHandler(self.queue)
+        self._lock = Lock()
+        self._is_running = False
+        self._loggers: List[logging.Logger] = []
+
+        # below fields are accessed in the writer thread only.
+        self._routes: Dict[str, List[QueuedFileHandler]] = {}
+        self._resolved_routes: Dict[str, List[QueuedFileHandler]] = {}
+        self._opened_handlers: Set[QueuedFileHandler] = set()
+        self._dirty_handlers: Set[QueuedFileHandler] = set()
+        self._flush_timer = create_timer()
+
+    @property
+    def is_running(self) -> bool:
+        return self._is_running
+
+    def start(self) -> None:
+        with self._lock:
+            if not self._is_running:
+                super().start()
+                self._is_running = True
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._is_running:
+                for logger in self._loggers:
+                    logger.removeHandler(self._queue_handler)
+                self._loggers.clear()
+                # all queued records are written, before the thread exits.
+                super().stop()
+                self._is_running = False
+                for handler in list(self._opened_handlers):
+                    handler.flush()
+                self._dirty_handlers.clear()
+
+    def attach(self, logger: logging.Logger) -> None:
+        """
+        Queue records of the logger and its children.
+        """
+        with self._lock:
+            if logger not in self._loggers:
+                self._queue_handler.setLevel(logging.DEBUG)
+                logger.addHandler(self._queue_handler)
+                self._loggers.append(logger)
+
+    def add_route(self, logger_name: str, handler: QueuedFileHandler) -> None:
+        self._enqueue(partial(self._add_route, logger_name, handler))
+
+    def remove_route(self, logger_name: str, handler: QueuedFileHandler) -> None:
+        self._enqueue(partial(self._remove_route, logger_name, handler))
+
+    def close_handler(self, handler: QueuedFileHandler) -> None:
+        if self.is_running:
+            self._enqueue(partial(self._close_handler, handler))
+        else:
+            self._close_handler(handler)
+
+    def dequeue(self, block: bool) -> Any:
+        while True:
+            try:
+                return self.queue.get(block, self._flush_interval)
+            except Empty:
+                # flush buffered content, when there is nothing to write.
+                self._flush()
+                if not block:
+                    raise
+
+    def handle(self, record: Any) -> None:
+        if callable(record):
+            # it's a routing operation.
+            record()
+        else:
+            for handler in self._resolve_handlers(record.name):
+                handler.handle(record)
+                self._dirty_handlers.add(handler)
+        if self._flush_timer.elapsed(False) > self._flush_interval:
+            self._flush()
+
+    def _enqueue(self, operation: Callable[[], None]) -> None:
+        self.queue.put_nowait(operation)
+
+    def _add_route(self, logger_name: str, handler: QueuedFileHandler) -> None:
+        handlers = self._routes.setdefault(logger_name, [])
+        if handler not in handlers:
+            handlers.append(handler)
+        self._opened_handlers.add(handler)
+        self._resolved_routes.clear()
+
+    def _remove_route(self, logger_name: str, handler: QueuedFileHandler) -> None:
+        handlers = self._routes.get(logger_name, [])
+        if handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                del self._routes[logger_name]
+        self._resolved_routes.clear()
+
+    def _close_handler(self, handler: QueuedFileHandler) -> None:
+        for logger_name in list(self._routes.keys()):
+            self._remove_route(logger_name, handler)
+        self._opened_handlers.discard(handler)
+        self._dirty_handlers.discard(handler)
+        handler._close_file()
+
+    def _resolve_handlers(self, logger_name: str) -> List[QueuedFileHandler]:
+        handlers = self._resolved_routes.get(logger_name)
+        if handlers is None:
+            # match the logger and its parents, it's the same rule as logging.
+            handlers = []
+            name = logger_name
+            while name:
+                for handler in self._routes.get(name, []):
+                    if handler not in handlers:
+                        handlers.append(handler)
+                name = name.rpartition(".")[0]
+            self._resolved_routes[logger_name] = handlers
+        return handlers
+
+    def _flush(self) -> None:
+        for handler in self._dirty_handlers:
+            handler.flush()
+        self._dirty_handlers.clear()
+        self._flush_timer = create_timer()
+
+
+_log_listener = QueuedLogListener()
+atexit.register(_log_listener.stop)
+
 _get_root_logger = partial(logging.getLogger, DEFAULT_LOG_NAME)
 
 _format = logging.Formatter(
@@ -143,6 +397,8 @@ def uninit_logger() -> None:
     # whole log file.
     sys.stdout = _original_stdout
     sys.stderr = _original_stderr
+    # write all queued records to files.
+    _log_listener.stop()
 
 
 def enable_console_timestamp() -> None:
@@ -164,7 +420,10 @@ def add_handler(
     if not formatter:
         formatter = _format
     handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    if isinstance(handler, QueuedFileHandler):
+        _log_listener.add_route(logger.name, handler)
+    else:
+        logger.addHandler(handler)
 
 
 def remove_handler(
@@ -175,23 +434,123 @@ def remove_handler(
 
     if logger is None:
         logger = _get_root_logger()
-    logger.removeHandler(log_handler)
+    if isinstance(log_handler, QueuedFileHandler):
+        _log_listener.remove_route(logger.name, log_handler)
+    else:
+        logger.removeHandler(log_handler)
 
 
 def create_file_handler(
     path: Path,
     logger: Optional[logging.Logger] = None,
     formatter: Optional[logging.Formatter] = None,
+    max_size: int = 0,
 ) -> logging.FileHandler:
+    """
+    The file is compressed by the log file options, so the actual path may be
+    different with the given path. Use baseFilename of the returned handler to
+    get the actual path.
+    """
     # skip to create log file in UT
     if is_unittest():
         return None  # type: ignore
 
-    file_handler = logging.FileHandler(path, "w", "utf-8")
+    # records are written to files by the writer thread, so test threads
+    # don't wait on disk I/O.
+    _log_listener.attach(_get_root_logger())
+    _log_listener.start()
+
+    file_handler = QueuedFileHandler(
+        get_log_file_path(path), compression=_log_compression, max_size=max_size
+    )
     add_handler(file_handler, logger, formatter)
     return file_handler
 
 
+def set_log_file_options(
+    compression: str = LOG_COMPRESSION_NONE, case_max_size: int = 0
+) -> None:
+    """
+    compression: one of none, gzip and zstd. It applies to all log files.
+    case_max_size: the max size of each test case log, in characters. 0 means
+        no limitation. The head and the tail are kept, if it exceeds.
+    """
+    global _log_compression
+    global _case_log_max_size
+
+    if compression != LOG_COMPRESSION_NONE:
+        # fail earlier, if the compression is not supported.
+        _get_compression_module(compression)
+    _log_compression = compression
+    _case_log_max_size = case_max_size
+
+
+def get_case_log_max_size() -> int:
+    return _case_log_max_size
+
+
+def get_log_file_path(path: Path) -> Path:
+    """
+    Return the actual path of a log file, a suffix is added if it's compressed.
+    """
+    suffix = _compression_suffixes.get(_log_compression, "")
+    if suffix:
+        path = path.parent / f"{path.name}{suffix}"
+    return path
+
+
+def save_log_file(path: Path, content: bytes) -> Path:
+    """
+    Save downloaded logs, like serial console logs. It's compressed and
+    truncated by the same settings of case logs.
+    """
+    path = get_log_file_path(path)
+    max_size = _case_log_max_size
+    if max_size and len(content) > max_size:
+        head_size = max_size - max_size // 2
+        tail_size = max_size // 2
+        truncated_size = len(content) - head_size - tail_size
+        content = b"".join(
+            [
+                content[:head_size],
+                f"\n... {truncated_size} bytes are truncated, the log file "
+                "exceeds max size ...\n".encode("utf-8"),
+                content[len(content) - tail_size :],
+            ]
+        )
+    with _open_log_stream(path, "wb", _log_compression) as f:
+        f.write(content)
+    return path
+
+
+def decompress_log_file(path: Path, output_path: Optional[Path] = None) -> Path:
+    """
+    Decompress a log file to plain text. The compression type is detected by
+    the file suffix.
+    """
+    compression = LOG_COMPRESSION_NONE
+    for name, suffix in _compression_suffixes.items():
+        if path.suffix == suffix:
+            compression = name
+            break
+    if compression == LOG_COMPRESSION_NONE:
+        raise LisaException(
+            f"unknown compression of '{path}', supported suffixes: "
+            f"{list(_compression_suffixes.values())}"
+        )
+    if output_path is None:
+        output_path = path.parent / path.stem
+
+    with _open_log_stream(path, "rb", compression) as source:
+        with open(output_path, "wb") as target:
+            while True:
+                chunk = source.read(_FILE_BUFFER_SIZE)
+                if not chunk:
+                    break
+                target.write(chunk)
+    return output_path
+
+
 def set_level(level: int) -> None:
     _console_handler.setLevel(level)
 
@@ -208,3 +567,37 @@ def get_logger(
     logger = cast(Logger, parent.getChild(name))
 
     return logger
+
+
+def _get_compression_module(compression: str) -> Any:
+    if compression == LOG_COMPRESSION_GZIP:
+        module: Any = gzip
+    elif compression == LOG_COMPRESSION_ZSTD:
+        try:
+            import zstandard  # type: ignore
+        except ModuleNotFoundError:
+            raise LisaException(
+                "zstd compression needs the package 'zstandard', install it by "
+                "'pip install zstandard'."
+            )
+        module = zstandard
+    else:
+        raise LisaException(
+            f"unknown log compression '{compression}', supported: "
+            f"{[LOG_COMPRESSION_NONE, *_compression_suffixes.keys()]}"
+        )
+    return module
+
+
+def _open_log_stream(
+    path: Path, mode: str, compression: str, encoding: Optional[str] = None
+) -> IO[Any]:
+    if compression == LOG_COMPRESSION_NONE:
+        if "b" in mode:
+            return open(path, mode)
+        return open(path, mode, encoding=encoding, buffering=_FILE_BUFFER_SIZE)
+
+    module = _get_compression_module(compression)
+    if "b" not in mode and "t" not in mode:
+        mode = f"{mode}t"
+    return cast(IO[Any], module.open(path, mode, encoding=encoding))
@@ -0,0 +1,111 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class OutputCacheEntry:
+    key: str
+    type_name: str
+    name: str
+    created_time: datetime
+    outputs: Dict[str, Any]
+
+
+class OutputCache:
+    """
+    A content-addressed cache of outputs. The key is a hash of all inputs, so
+    the same inputs get the saved outputs. Each entry is a json file in the
+    folder, and it's expired after the ttl.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def get(self, key: str, ttl: timedelta) -> Optional[Dict[str, Any]]:
+        """
+        return outputs of the key, or None if it's not cached or expired.
+        """
+        entry = self._load(self._get_entry_path(key))
+        if not entry:
+            return None
+        if datetime.now() - entry.created_time > ttl:
+            self._get_entry_path(key).unlink(missing_ok=True)
+            return None
+        return entry.outputs
+
+    def set(self, key: str, type_name: str, name: str, outputs: Dict[str, Any]) -> bool:
+        """
+        save outputs of the key. Return False, if outputs cannot be serialized
+        to json.
+        """
+        try:
+            content = json.dumps(
+                {
+                    "type": type_name,
+                    "name": name,
+                    "created_time": datetime.now().isoformat(),
+                    "outputs": outputs,
+                }
+            )
+        except (TypeError, ValueError):
+            return False
+
+        self._path.mkdir(parents=True, exist_ok=True)
+        entry_path = self._get_entry_path(key)
+        # write to a temp file and replace, so concurrent readers don't get a
+        # partial file.
+        temp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        temp_path.write_text(content)
+        temp_path.replace(entry_path)
+        return True
+
+    def list(self, type_name: str = "") -> List[OutputCacheEntry]:
+        """
+        return entries of the type, or all entries if type_name is empty.
+        """
+        entries: List[OutputCacheEntry] = []
+        if not self._path.exists():
+            return entries
+        for entry_path in sorted(self._path.glob("*.json")):
+            entry = self._load(entry_path)
+            if entry and (not type_name or entry.type_name == type_name):
+                entries.append(entry)
+        return sorted(entries, key=lambda x: x.created_time)
+
+    def remove(self, type_name: str = "") -> int:
+        """
+        remove entries of the type, or all entries if type_name is empty.
+        Return the count of removed entries.
+        """
+        entries = self.list(type_name)
+        for entry in entries:
+            self._get_entry_path(entry.key).unlink(missing_ok=True)
+        return len(entries)
+
+    def _get_entry_path(self, key: str) -> Path:
+        return self._path / f"{key}.json"
+
+    def _load(self, entry_path: Path) -> Optional[OutputCacheEntry]:
+        try:
+            data = json.loads(entry_path.read_text())
+            return OutputCacheEntry(
+                key=entry_path.stem,
+                type_name=data["type"],
+                name=data["name"],
+                created_time=datetime.fromisoformat(data["created_time"]),
+                outputs=data["outputs"],
+            )
+        except (OSError, ValueError, KeyError):
+            # not exists or broken, treat it as not cached.
+            return None
@@ -5,7 +5,7 @@ import importlib
 import importlib.util
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Dict, List, Optional
 
 from lisa.util.logger import Logger, get_logger
 
@@ -22,14 +22,26 @@ Steps,
 1. Import the root folder as a package. It's used by importlib.import_module
 2. Go through all files, and check if it exists in sys.modules. If it's not, import it.
 
+Some packages depend on heavy libraries, like SDKs of platforms. They can be marked
+as lazy packages, and are imported only when a subclass is not found by factories.
+
 """
 
+# the importer is called with the file, the full module name, and a function to
+# import the module. It decides to import the module now or later.
+ModuleImporter = Callable[[Path, str, Callable[[], None]], None]
+
+# full module names and functions to import them, which are imported on demand.
+_lazy_modules: Dict[str, Callable[[], None]] = {}
+
 
 def _import_module(
     file: Path,
     root_package_name: Optional[str],
     package_dir: Path,
     log: Optional[Logger] = None,
+    lazy_packages: Optional[List[str]] = None,
+    importer: Optional[ModuleImporter] = None,
 ) -> None:
     dir_name = file.parent
     module_name = file.stem
@@ -47,15 +59,42 @@ def _import_module(
     else:
         full_module_name = module_name
 
-    if full_module_name not in sys.modules:
+    if full_module_name in sys.modules:
+        return
+
+    def _import() -> None:
+        if full_module_name in sys.modules:
+            return
         if log:
             log.debug(
                 f"  loading module from file: {file}, "
                 f"full_module_name: '{full_module_name}'",
             )
-
         importlib.import_module(name=module_name, package=root_package_name)
 
+    if lazy_packages and any(
+        full_module_name == x or full_module_name.startswith(f"{x}.")
+        for x in lazy_packages
+    ):
+        _lazy_modules[full_module_name] = _import
+    elif importer:
+        importer(file, full_module_name, _import)
+    else:
+        _import()
+
+
+def import_lazy_modules() -> bool:
+    """
+    import all modules of lazy packages. Return True, if any module is imported.
+    """
+    if not _lazy_modules:
+        return False
+    modules = list(_lazy_modules.values())
+    _lazy_modules.clear()
+    for module in modules:
+        module()
+    return True
+
 
 def _import_root_package(package_name: str, path: Path) -> None:
     # the module can be imported with __init__.py only, but it doesn't need to exist
@@ -74,7 +113,11 @@ def _import_root_package(package_name: str, path: Path) -> None:
 
 
 def import_package(
-    path: Path, package_name: Optional[str] = None, enable_log: bool = True
+    path: Path,
+    package_name: Optional[str] = None,
+    enable_log: bool = True,
+    lazy_packages: Optional[List[str]] = None,
+    importer: Optional[ModuleImporter] = None,
 ) -> None:
 
     if not path.exists():
@@ -109,4 +152,6 @@ def import_package(
             root_package_name=package_name,
             package_dir=package_dir,
             log=log,
+            lazy_packages=lazy_packages,
+            importer=importer,
         )
@@ -0,0 +1,215 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import sqlite3
+import statistics
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from lisa.util import LisaException
+
+# tags, which are used to identify comparable results. The column name is the
+# key, and the value is the tag name in perf messages.
+KEY_TAGS: Dict[str, str] = {
+    "vmsize": "vmsize",
+    "distro": "distro_version",
+    "kernel": "kernel_version",
+    "block_size": "block_size",
+    "qdepth": "qdepth",
+}
+KEY_COLUMNS = ["test_case_name", "tool", "metric_name", *KEY_TAGS.keys()]
+
+# latency like metrics are better when they are lower.
+_lower_better_units = {"s", "sec", "ms", "msec", "us", "usec", "ns", "nsec"}
+
+_create_table_sql = f"""
+CREATE TABLE IF NOT EXISTS perf_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    run_name TEXT NOT NULL,
+    test_date TEXT NOT NULL,
+    {", ".join(f"{x} TEXT NOT NULL" for x in KEY_COLUMNS)},
+    unit TEXT NOT NULL,
+    value REAL NOT NULL,
+    tags TEXT NOT NULL
+)
+"""
+_create_index_sql = (
+    "CREATE INDEX IF NOT EXISTS perf_results_key ON perf_results "
+    f"({', '.join(KEY_COLUMNS)}, test_date)"
+)
+
+
+@dataclass
+class PerfRecord:
+    test_case_name: str
+    tool: str
+    metric_name: str
+    unit: str
+    value: float
+    run_id: str = ""
+    run_name: str = ""
+    test_date: datetime = field(default_factory=datetime.utcnow)
+    tags: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def key(self) -> Dict[str, str]:
+        key = {
+            "test_case_name": self.test_case_name,
+            "tool": self.tool,
+            "metric_name": self.metric_name,
+        }
+        for column, tag in KEY_TAGS.items():
+            key[column] = self.tags.get(tag, "")
+        return key
+
+    @property
+    def is_lower_better(self) -> bool:
+        return self.unit.lower() in _lower_better_units or "lat" in self.metric_name
+
+
+@dataclass
+class PerfRegression:
+    record: PerfRecord
+    baseline_mean: float
+    baseline_stdev: float
+    sample_count: int
+    # relative change to the baseline, negative means worse.
+    change: float
+
+    def __str__(self) -> str:
+        key = ", ".join(f"{k}: {v}" for k, v in self.record.key.items() if v)
+        return (
+            f"{key}, value: {self.record.value} {self.record.unit}, "
+            f"baseline: {self.baseline_mean:.3f} "
+            f"(stdev: {self.baseline_stdev:.3f}, samples: {self.sample_count}), "
+            f"change: {self.change:.2%}"
+        )
+
+
+class PerfResultStore:
+    """
+    A local SQLite database of performance results. Results are indexed by the
+    test case, metric and the key tags, so history of same configuration can be
+    queried quickly to compute baselines.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(path))
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            self._connection.execute(_create_table_sql)
+            self._connection.execute(_create_index_sql)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def add(self, records: List[PerfRecord]) -> None:
+        columns = ["run_id", "run_name", "test_date", *KEY_COLUMNS]
+        columns += ["unit", "value", "tags"]
+        sql = (
+            f"INSERT INTO perf_results ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' for _ in columns)})"
+        )
+        with self._connection:
+            self._connection.executemany(
+                sql,
+                [
+                    (
+                        x.run_id,
+                        x.run_name,
+                        x.test_date.isoformat(),
+                        *x.key.values(),
+                        x.unit,
+                        x.value,
+                        json.dumps(x.tags, sort_keys=True),
+                    )
+                    for x in records
+                ],
+            )
+
+    def query(
+        self,
+        conditions: Optional[Dict[str, str]] = None,
+        exclude_run_id: str = "",
+        limit: int = 0,
+    ) -> List[PerfRecord]:
+        """
+        conditions: the keys are column names in KEY_COLUMNS. Results are sorted by
+            test date in descending order.
+        """
+        conditions = conditions or {}
+        for name in conditions:
+            if name not in KEY_COLUMNS:
+                raise LisaException(
+                    f"unknown column '{name}', supported columns: {KEY_COLUMNS}"
+                )
+        clauses = [f"{x} = ?" for x in conditions]
+        parameters: List[Any] = list(conditions.values())
+        if exclude_run_id:
+            clauses.append("run_id != ?")
+            parameters.append(exclude_run_id)
+        sql = "SELECT * FROM perf_results"
+        if clauses:
+            sql += f" WHERE {' AND '.join(clauses)}"
+        sql += " ORDER BY test_date DESC"
+        if limit > 0:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+        rows = self._connection.execute(sql, parameters).fetchall()
+        return [self._row_to_record(x) for x in rows]
+
+    def check_regression(
+        self,
+        record: PerfRecord,
+        window: int = 10,
+        min_samples: int = 5,
+        threshold: float = 3.0,
+        min_change: float = 0.05,
+    ) -> Optional[PerfRegression]:
+        """
+        Compare the record with the rolling baseline of previous runs. It's a
+        regression, when the result is worse than the mean by more than
+        `threshold` times of the standard deviation, and the relative change is
+        larger than `min_change`. The `min_change` avoids flagging noise of very
+        stable results.
+        """
+        history = self.query(record.key, exclude_run_id=record.run_id, limit=window)
+        if len(history) < min_samples:
+            return None
+        values = [x.value for x in history]
+        mean = statistics.mean(values)
+        stdev = statistics.stdev(values)
+        if mean == 0:
+            return None
+        change = (record.value - mean) / abs(mean)
+        deviation = record.value - mean
+        if record.is_lower_better:
+            change = -change
+            deviation = -deviation
+        if change < -min_change and -deviation > threshold * stdev:
+            return PerfRegression(
+                record=record,
+                baseline_mean=mean,
+                baseline_stdev=stdev,
+                sample_count=len(values),
+                change=change,
+            )
+        return None
+
+    def _row_to_record(self, row: sqlite3.Row) -> PerfRecord:
+        return PerfRecord(
+            test_case_name=row["test_case_name"],
+            tool=row["tool"],
+            metric_name=row["metric_name"],
+            unit=row["unit"],
+            value=row["value"],
+            run_id=row["run_id"],
+            run_name=row["run_name"],
+            test_date=datetime.fromisoformat(row["test_date"]),
+            tags=json.loads(row["tags"]),
+        )
@@ -18,6 +18,7 @@ from spur.errors import NoSuchCommandError  # type: ignore
 from lisa.util.logger import Logger, LogWriter, get_logger
 from lisa.util.perf_timer import create_timer
 from lisa.util.shell import Shell
+from lisa.util.tracing import CATEGORY_COMMAND, Span, start_span
 
 
 @dataclass
@@ -61,6 +62,13 @@ class Process:
         self._result: Optional[ExecutableResult] = None
         self._sudo: bool = False
 
+    def __del__(self) -> None:
+        # the process may be started async, and never waited. End the span, so
+        # it's exported with the time until the process is released.
+        span: Optional[Span] = getattr(self, "_span", None)
+        if span:
+            span.end(error="the process is not waited")
+
     def start(
         self,
         command: str,
@@ -123,6 +131,13 @@ class Process:
 
         try:
             self._timer = create_timer()
+            self._span = start_span(
+                command,
+                CATEGORY_COMMAND,
+                id=self._id_,
+                remote=self._shell.is_remote,
+                sudo=sudo,
+            )
             self._process = self._shell.spawn(
                 command=split_command,
                 stdout=self._stdout_writer,
@@ -143,6 +158,11 @@ class Process:
                 "", identifier.strerror, 1, split_command, self._timer.elapsed()
             )
             self._log.log(stderr_level, f"not found command: {identifier}")
+            self._span.end(error=f"not found command: {identifier}")
+        except Exception as identifier:
+            # end the span of failed commands, so they are in the trace.
+            self._span.end(error=f"{type(identifier).__name__}: {identifier}")
+            raise
 
     def wait_result(
         self,
@@ -196,6 +216,8 @@ class Process:
             self._log.debug(
                 f"execution time: {self._timer}, exit code: {self._result.exit_code}"
             )
+            self._span.set_attribute("exit_code", self._result.exit_code)
+            self._span.end()
 
         if expected_exit_code is not None:
             self._result.assert_exit_code(
@@ -211,6 +233,7 @@ class Process:
     def kill(self) -> None:
         if self._process:
             self._log.debug(f"Killing process : {self._id_}")
+            self._span.end(error="killed")
             try:
                 if self._shell.is_remote:
                     # Support remote Posix so far
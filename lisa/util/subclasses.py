@@ -2,11 +2,12 @@
 # Licensed under the MIT license.
 
 from collections import UserDict
-from typing import TYPE_CHECKING, Any, Generic, Iterable, Type, TypeVar, cast
+from typing import TYPE_CHECKING, Any, Generic, Iterable, Optional, Type, TypeVar, cast
 
 from lisa import schema
 from lisa.util import BaseClassMixin, InitializableMixin, LisaException, constants
 from lisa.util.logger import get_logger
+from lisa.util.package import import_lazy_modules
 
 
 class BaseClassWithRunbookMixin(BaseClassMixin):
@@ -49,6 +50,9 @@ class Factory(InitializableMixin, Generic[T_BASECLASS], SubClassTypeDict):
         for subclass_type in self._get_subclasses(self._base_type):
             subclass_type_name = subclass_type.type_name()
             exists_type = self.get(subclass_type_name)
+            if exists_type is subclass_type:
+                # registered already, when it's rescanned after lazy importing.
+                continue
             if exists_type:
                 # so far, it happens on ut only.
                 # When UT code import each other, it happens.
@@ -67,7 +71,7 @@ class Factory(InitializableMixin, Generic[T_BASECLASS], SubClassTypeDict):
     def load_typed_runbook(self, raw_runbook: Any) -> T_BASECLASS:
         self.initialize()
         type_name = raw_runbook[constants.TYPE]
-        sub_type = self.get(type_name)
+        sub_type = self._get_type(type_name)
         if sub_type is None:
             raise LisaException(
                 f"cannot find subclass '{type_name}' of {self._base_type.__name__}"
@@ -82,7 +86,7 @@ class Factory(InitializableMixin, Generic[T_BASECLASS], SubClassTypeDict):
 
     def create_by_type_name(self, type_name: str, **kwargs: Any) -> T_BASECLASS:
         self.initialize()
-        sub_type = self.get(type_name)
+        sub_type = self._get_type(type_name)
         if sub_type is None:
             raise LisaException(
                 f"cannot find subclass '{type_name}' of {self._base_type.__name__}"
@@ -93,7 +97,7 @@ class Factory(InitializableMixin, Generic[T_BASECLASS], SubClassTypeDict):
         self, runbook: schema.TypedSchema, **kwargs: Any
     ) -> T_BASECLASS:
         self.initialize()
-        sub_type = self.get(runbook.type)
+        sub_type = self._get_type(runbook.type)
         if sub_type is None:
             raise LisaException(
                 f"cannot find subclass '{runbook.type}' of runbook {runbook}"
@@ -108,6 +112,14 @@ class Factory(InitializableMixin, Generic[T_BASECLASS], SubClassTypeDict):
 
         return cast(T_BASECLASS, sub_object)
 
+    def _get_type(self, type_name: str) -> Optional[type]:
+        sub_type = self.get(type_name)
+        if sub_type is None and import_lazy_modules():
+            # the type may be in lazy packages, rescan after they are imported.
+            self._initialize()
+            sub_type = self.get(type_name)
+        return sub_type
+
     def _get_subclasses(
         self, type: Type[BaseClassMixin]
     ) -> Iterable[Type[BaseClassMixin]]:
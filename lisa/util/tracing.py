@@ -0,0 +1,284 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextvars import ContextVar, Token
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Dict, List, Optional, Type
+
+from lisa.secret import mask
+
+# categories of spans
+CATEGORY_RUNBOOK = "runbook"
+CATEGORY_TRANSFORMER = "transformer"
+CATEGORY_ENVIRONMENT = "environment"
+CATEGORY_TEST = "test"
+CATEGORY_TOOL = "tool"
+CATEGORY_COMMAND = "command"
+CATEGORY_NOTIFIER = "notifier"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("_current_span", default=None)
+
+
+class Span:
+    """
+    A time range of an operation. It can be used in a with statement, so nested
+    spans get it as parent. If an operation starts and ends in different methods,
+    call end() explicitly.
+    """
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        category: str,
+        attributes: Dict[str, Any],
+        parent: Optional["Span"],
+    ) -> None:
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else ""
+        thread = threading.current_thread()
+        self.thread_id = thread.ident or 0
+        self.thread_name = thread.name
+        self.error = ""
+        self.start_time = time.time_ns()
+        self.end_time = 0
+        self._tracer = tracer
+        self._token: Optional[Token[Optional[Span]]] = None
+
+    @property
+    def elapsed(self) -> float:
+        end_time = self.end_time or time.time_ns()
+        return (end_time - self.start_time) / 1e9
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: str = "") -> None:
+        if self.end_time:
+            return
+        self.end_time = time.time_ns()
+        if error:
+            self.error = error
+        self._tracer._add(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        if self._token:
+            _current_span.reset(self._token)
+            self._token = None
+        self.end(error=f"{exc_type.__name__}: {exc_value}" if exc_type else "")
+
+
+class _NoopSpan(Span):
+    """
+    returned when tracing is disabled, so callers don't need to check it.
+    """
+
+    def __init__(self) -> None:
+        self.name = ""
+        self.category = ""
+        self.attributes = {}
+        self.error = ""
+
+    @property
+    def elapsed(self) -> float:
+        return 0
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def end(self, error: str = "") -> None:
+        pass
+
+    def __enter__(self) -> "Span":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        pass
+
+
+_noop_span = _NoopSpan()
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.trace_id = uuid.uuid4().hex
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, category: str = "", **attributes: Any) -> Span:
+        if not self.enabled:
+            return _noop_span
+        return Span(
+            tracer=self,
+            name=name,
+            category=category,
+            attributes=attributes,
+            parent=_current_span.get(),
+        )
+
+    @property
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+    def summarize(self) -> Dict[str, float]:
+        """
+        return total seconds of each category. A span nested in another span
+        of the same category is not counted, because its time is in the outer
+        one already.
+        """
+        spans = self.spans
+        spans_by_id = {x.span_id: x for x in spans}
+        result: Dict[str, float] = {}
+        for span in spans:
+            parent = spans_by_id.get(span.parent_id, None)
+            while parent and parent.category != span.category:
+                parent = spans_by_id.get(parent.parent_id, None)
+            if parent:
+                continue
+            result[span.category] = result.get(span.category, 0) + span.elapsed
+        return result
+
+    # secrets are masked on exporting, because they may be added after spans
+    # created.
+    def export_chrome_trace(self, path: Path) -> None:
+        """
+        The trace event format can be opened by chrome://tracing or Perfetto.
+        """
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = []
+        thread_names: Dict[int, str] = {}
+        for span in self.spans:
+            thread_names[span.thread_id] = span.thread_name
+            args = {key: mask(str(value)) for key, value in span.attributes.items()}
+            if span.error:
+                args["error"] = mask(span.error)
+            events.append(
+                {
+                    "name": mask(span.name),
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": span.start_time / 1000,
+                    "dur": (span.end_time - span.start_time) / 1000,
+                    "pid": pid,
+                    "tid": span.thread_id,
+                    "args": args,
+                }
+            )
+        for thread_id, thread_name in thread_names.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": thread_id,
+                    "args": {"name": thread_name},
+                }
+            )
+        self._write_json(path, {"traceEvents": events, "displayTimeUnit": "ms"})
+
+    def export_otel(self, path: Path, service_name: str = "lisa") -> None:
+        """
+        The OTLP JSON format, it can be imported by OpenTelemetry collectors.
+        """
+        spans: List[Dict[str, Any]] = []
+        for span in self.spans:
+            attributes = [
+                {"key": key, "value": {"stringValue": mask(str(value))}}
+                for key, value in span.attributes.items()
+            ]
+            attributes.append(
+                {"key": "category", "value": {"stringValue": span.category}}
+            )
+            attributes.append(
+                {"key": "thread.name", "value": {"stringValue": span.thread_name}}
+            )
+            otel_span: Dict[str, Any] = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": mask(span.name),
+                # internal
+                "kind": 1,
+                "startTimeUnixNano": str(span.start_time),
+                "endTimeUnixNano": str(span.end_time),
+                "attributes": attributes,
+            }
+            if span.parent_id:
+                otel_span["parentSpanId"] = span.parent_id
+            if span.error:
+                # error
+                otel_span["status"] = {"code": 2, "message": mask(span.error)}
+            spans.append(otel_span)
+        self._write_json(
+            path,
+            {
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [
+                                {
+                                    "key": "service.name",
+                                    "value": {"stringValue": service_name},
+                                }
+                            ]
+                        },
+                        "scopeSpans": [{"scope": {"name": "lisa"}, "spans": spans}],
+                    }
+                ]
+            },
+        )
+
+    def _add(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def _write_json(self, path: Path, content: Dict[str, Any]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(content, f)
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def enable_tracing() -> None:
+    _tracer.enabled = True
+
+
+def start_span(name: str, category: str = "", **attributes: Any) -> Span:
+    """
+    start a span. It does nothing, if tracing is not enabled.
+    """
+    return _tracer.start_span(name, category, **attributes)
@@ -1,10 +1,11 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import copy
 import os
 import re
 from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 
 import yaml
 
@@ -13,6 +14,9 @@ from lisa.util import LisaException, constants
 
 DataType = Union[str, bool, int]
 
+# keys and indexes from the root to a string, which references variables.
+VariablePath = Tuple[Union[str, int], ...]
+
 _VARIABLE_PATTERN = re.compile(r"(\$\(.+?\))", re.MULTILINE)
 _ENV_START = "LISA_"
 _SECRET_ENV_START = "S_LISA_"
@@ -49,6 +53,45 @@ def replace_variables(data: Any, variables: Dict[str, VariableEntry]) -> Any:
     return _replace_variables(data, new_variables)
 
 
+def find_variable_paths(data: Any) -> List[VariablePath]:
+    """
+    find paths of strings, which reference variables. The paths can be found
+    once, and used to replace variables many times by replace_variables_by_paths.
+    """
+    results: List[VariablePath] = []
+    _find_variable_paths(data, (), results)
+    return results
+
+
+def replace_variables_by_paths(
+    data: Any, paths: List[VariablePath], variables: Dict[str, VariableEntry]
+) -> Any:
+    """
+    It's the copy-on-write version of replace_variables. Only containers on the
+    paths are copied, other parts are shared with the original data, so the
+    original data is not changed, and the result shouldn't be changed either.
+    """
+    new_variables: Dict[str, VariableEntry] = {}
+    for key, value in variables.items():
+        new_variables[f"$({key})"] = value
+
+    # hold the root, so it can be replaced like other nodes.
+    holder: List[Any] = [data]
+    copied: Set[int] = set()
+    for path in paths:
+        parent: Any = holder
+        node_key: Union[str, int] = 0
+        for next_key in path:
+            node = parent[node_key]
+            if id(node) not in copied:
+                node = copy.copy(node)
+                copied.add(id(node))
+                parent[node_key] = node
+            parent, node_key = node, next_key
+        parent[node_key] = _replace_variables(parent[node_key], new_variables)
+    return holder[0]
+
+
 def load_variables(
     runbook_data: Any,
     higher_level_variables: Union[List[str], Dict[str, VariableEntry], None] = None,
@@ -317,6 +360,19 @@ def _replace_variables(data: Any, variables: Dict[str, VariableEntry]) -> Any:
     return data
 
 
+def _find_variable_paths(
+    data: Any, path: VariablePath, results: List[VariablePath]
+) -> None:
+    if isinstance(data, dict):
+        for key, value in data.items():
+            _find_variable_paths(value, path + (key,), results)
+    elif isinstance(data, list):
+        for index, item in enumerate(data):
+            _find_variable_paths(item, path + (index,), results)
+    elif isinstance(data, str) and _VARIABLE_PATTERN.search(data):
+        results.append(path)
+
+
 def _add_variable(
     key: str,
     value: Any,
@@ -19,6 +19,7 @@ from lisa import (
     TestSuite,
     TestSuiteMetadata,
     constants,
+    notifier,
 )
 from lisa.features import NetworkInterface, Sriov
 from lisa.nic import NicInfo, Nics
@@ -288,6 +289,12 @@ class Dpdk(TestSuite):
         snd_tx_pps = sender.testpmd.get_tx_pps()
         log.info(f"receiver rx-pps: {rcv_rx_pps}")
         log.info(f"sender tx-pps: {snd_tx_pps}")
+        _notify_pps_messages(
+            environment,
+            f"verify_dpdk_send_receive_multi_txrx_queue_{pmd}",
+            pmd,
+            test_kits,
+        )
 
         # differences in NIC type throughput can lead to different snd/rcv counts
         # check that throughput it greater than 1m pps as a baseline
@@ -411,6 +418,9 @@ class Dpdk(TestSuite):
         snd_tx_pps = sender.testpmd.get_tx_pps()
         log.info(f"receiver rx-pps: {rcv_rx_pps}")
         log.info(f"sender tx-pps: {snd_tx_pps}")
+        _notify_pps_messages(
+            environment, f"verify_dpdk_send_receive_{pmd}", pmd, test_kits
+        )
 
         # differences in NIC type throughput can lead to different snd/rcv counts
         assert_that(rcv_rx_pps).described_as(
@@ -495,6 +505,21 @@ class DpdkTestResources:
         return False
 
 
+def _notify_pps_messages(
+    environment: Environment,
+    test_case_name: str,
+    pmd: str,
+    test_kits: List[DpdkTestResources],
+) -> None:
+    sender, receiver = test_kits
+    tags: Dict[str, Any] = {**environment.get_information(), "pmd": pmd}
+    messages = sender.testpmd.create_pps_messages(
+        test_case_name, tags, include_rx=False
+    ) + receiver.testpmd.create_pps_messages(test_case_name, tags, include_tx=False)
+    for message in messages:
+        notifier.notify(message)
+
+
 def generate_send_receive_run_info(
     pmd: str,
     sender: DpdkTestResources,
@@ -3,13 +3,14 @@
 
 import re
 from pathlib import PurePath
-from typing import List, Pattern, Tuple, Type, Union
+from typing import Any, Dict, List, Optional, Pattern, Tuple, Type, Union
 
 from assertpy import assert_that, fail
 from semver import VersionInfo
 
 from lisa.executable import Tool
 from lisa.nic import NicInfo
+from lisa.notifier import PerfMetricMessage, create_perf_metric_messages
 from lisa.operating_system import CentOs, Redhat, Ubuntu
 from lisa.tools import Echo, Git, Lscpu, Lspci, Modprobe, Tar, Wget
 from lisa.util import LisaException, UnsupportedDistroException
@@ -461,6 +462,25 @@ class DpdkTestpmd(Tool):
     def get_tx_pps(self) -> int:
         return self.get_from_testpmd_output(self.TX_PPS_KEY, self._last_run_output)
 
+    def create_pps_messages(
+        self,
+        test_case_name: str = "",
+        tags: Optional[Dict[str, Any]] = None,
+        include_rx: bool = True,
+        include_tx: bool = True,
+    ) -> List[PerfMetricMessage]:
+        metrics: Dict[str, Tuple[Any, str]] = {}
+        if include_rx:
+            metrics["rx_pps"] = (self.get_rx_pps(), "pps")
+        if include_tx:
+            metrics["tx_pps"] = (self.get_tx_pps(), "pps")
+        return create_perf_metric_messages(
+            tool="testpmd",
+            metrics=metrics,
+            test_case_name=test_case_name,
+            tags=tags,
+        )
+
     def _split_testpmd_output(self) -> None:
         search_str = "Port 0: device removal event"
 
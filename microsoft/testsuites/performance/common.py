@@ -71,3 +71,9 @@ def handle_and_send_back_results(
         fio_message.disk_setup_type = disk_setup_type
         fio_message.disk_type = disk_type
         notifier.notify(fio_message)
+        # send the same results as generic metrics, so they can be aggregated
+        # with other tools.
+        for message in environment.default_node.tools[Fio].create_metric_messages(
+            fio_message, tags=information
+        ):
+            notifier.notify(message)
@@ -0,0 +1,491 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import json
+import random
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from threading import Lock
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from unittest import mock
+
+from azure.core.exceptions import HttpResponseError, ODataV4Format
+from azure.mgmt.compute import ComputeManagementClient  # type: ignore
+from azure.mgmt.compute.models import ResourceSku  # type: ignore
+from azure.mgmt.network import NetworkManagementClient  # type: ignore
+from azure.mgmt.resource import ResourceManagementClient  # type: ignore
+from azure.mgmt.storage import StorageManagementClient  # type: ignore
+
+from lisa.sut_orchestrator.azure import common
+
+_LOCATION_FILTER_PATTERN = re.compile(r"location eq '(?P<location>[^']+)'")
+# VMs are created, even deployments fail with these errors.
+_PROVISIONED_FAILURE_CODES = ["OSProvisioningTimedOut", "OSProvisioningInternalError"]
+
+
+@dataclass
+class MockAzureSettings:
+    # seconds of an api call, and of long running operations.
+    latency: float = 0
+    deployment_latency: float = 0
+    deletion_latency: float = 0
+    # rates from 0 to 1. The throttled calls are retried after retry_after
+    # seconds, like the retry policy of SDK, and raise 429 after max_retries.
+    throttling_rate: float = 0
+    failure_rate: float = 0
+    # the error of failed deployments.
+    failure_code: str = "AllocationFailed"
+    failure_message: str = "mocked allocation failure."
+    retry_after: float = 0
+    max_retries: int = 3
+    # skus of each location. A location without skus has no vm size.
+    skus: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    # return addresses in deployment outputs, or only list them from resources.
+    deployment_outputs: bool = True
+    seed: int = 0
+
+
+def load_skus(paths: List[Path]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    load sku catalogs from cached location files, like azure_locations_*.json.
+    """
+    skus: Dict[str, List[Dict[str, Any]]] = {}
+    for path in paths:
+        with open(path, "r") as f:
+            location_data = json.load(f)
+        skus[location_data["location"]] = [
+            x["resource_sku"] for x in location_data["capabilities"]
+        ]
+    return skus
+
+
+def _create_error(code: str, message: str, status_code: int) -> HttpResponseError:
+    error = HttpResponseError(message=f"{code}: {message}")
+    error.status_code = status_code
+    error.error = ODataV4Format({"error": {"code": code, "message": message}})
+    return error
+
+
+class _MockPoller:
+    def __init__(
+        self,
+        latency: float,
+        result: Any = None,
+        error: Optional[Exception] = None,
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self._done_time = time.time() + latency
+        self._result = result
+        self._error = error
+        self._on_done = on_done
+        self._lock = Lock()
+
+    def done(self) -> bool:
+        is_done = time.time() >= self._done_time
+        if is_done:
+            with self._lock:
+                if self._on_done:
+                    self._on_done()
+                    self._on_done = None
+        return is_done
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        remaining = self._done_time - time.time()
+        if timeout is not None:
+            remaining = min(remaining, timeout)
+        if remaining > 0:
+            time.sleep(remaining)
+
+    def result(self) -> Any:
+        self.wait()
+        self.done()
+        if self._error:
+            raise self._error
+        return self._result
+
+
+class _Operations:
+    # it converts methods calls to the calls of mock azure, so they are counted,
+    # delayed and throttled.
+    def __init__(self, azure: "MockAzure", prefix: str, **methods: Any) -> None:
+        self._azure = azure
+        self._prefix = prefix
+        self._methods = methods
+
+    def __getattr__(self, name: str) -> Any:
+        method = self._methods.get(name, None)
+        if method is None:
+            raise AttributeError(f"'{self._prefix}.{name}' is not mocked")
+        return lambda *args, **kwargs: self._azure.call(
+            f"{self._prefix}.{name}", method, *args, **kwargs
+        )
+
+
+class MockAzure:
+    """
+    An in-process stand-in of Azure control plane. It replaces SDK clients of
+    the azure platform, and keeps resource groups, vms and storage accounts in
+    memory. The latencies, throttling, failures and sku catalogs are
+    configurable, so the throughput of platform can be tested without Azure.
+    """
+
+    def __init__(self, settings: Optional[MockAzureSettings] = None) -> None:
+        self.settings = settings or MockAzureSettings()
+        self.calls: Counter[str] = Counter()
+        self.throttled_count = 0
+        self.failed_deployments: List[str] = []
+        self.resource_groups: Dict[str, Dict[str, Any]] = {}
+        # the deployments in resource groups, which are created in batches.
+        self.deployments: Dict[Tuple[str, str], Any] = {}
+        self.storage_accounts: Dict[str, str] = {}
+        self._random = random.Random(self.settings.seed)
+        self._lock = Lock()
+        self._address_index = 0
+
+        self._clients: Dict[Any, Any] = {
+            ResourceManagementClient: SimpleNamespace(
+                resource_groups=_Operations(
+                    self,
+                    "resource_groups",
+                    check_existence=self._check_resource_group,
+                    create_or_update=self._create_resource_group,
+                    begin_delete=self._begin_delete_resource_group,
+                ),
+                deployments=_Operations(
+                    self,
+                    "deployments",
+                    begin_validate=self._begin_validate,
+                    begin_create_or_update=self._begin_deploy,
+                    begin_create_or_update_at_subscription_scope=(
+                        self._begin_deploy_at_subscription_scope
+                    ),
+                    get=self._get_deployment,
+                ),
+            ),
+            ComputeManagementClient: SimpleNamespace(
+                virtual_machines=_Operations(
+                    self,
+                    "virtual_machines",
+                    list=lambda resource_group_name: self._list(
+                        resource_group_name, "vms"
+                    ),
+                    retrieve_boot_diagnostics_data=lambda **kwargs: None,
+                    begin_restart=self._begin_restart_vm,
+                    instance_view=self._get_vm_instance_view,
+                ),
+                resource_skus=_Operations(self, "resource_skus", list=self._list_skus),
+                virtual_machine_images=_Operations(
+                    self,
+                    "virtual_machine_images",
+                    list=lambda **kwargs: [SimpleNamespace(name="1.0.0")],
+                    get=lambda **kwargs: SimpleNamespace(
+                        plan=None, data_disk_images=[]
+                    ),
+                ),
+            ),
+            NetworkManagementClient: SimpleNamespace(
+                network_interfaces=_Operations(
+                    self,
+                    "network_interfaces",
+                    list=lambda resource_group_name: self._list(
+                        resource_group_name, "nics"
+                    ),
+                ),
+                public_ip_addresses=_Operations(
+                    self,
+                    "public_ip_addresses",
+                    list=lambda resource_group_name: self._list(
+                        resource_group_name, "public_ips"
+                    ),
+                ),
+            ),
+            StorageManagementClient: SimpleNamespace(
+                storage_accounts=_Operations(
+                    self,
+                    "storage_accounts",
+                    get_properties=self._get_storage_account,
+                    begin_create=self._begin_create_storage_account,
+                )
+            ),
+        }
+
+    @contextmanager
+    def patch(self) -> Iterator["MockAzure"]:
+        with mock.patch.object(common, "_get_client", self.get_client):
+            yield self
+
+    def get_client(
+        self, client_type: Any, credential: Any, subscription_id: str, **kwargs: Any
+    ) -> Any:
+        client = self._clients.get(client_type, None)
+        if client is None:
+            raise AssertionError(f"client '{client_type.__name__}' is not mocked")
+        return client
+
+    def call(
+        self, name: str, method: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> Any:
+        with self._lock:
+            self.calls[name] += 1
+        for retried_count in range(self.settings.max_retries + 1):
+            if self.settings.latency:
+                time.sleep(self.settings.latency)
+            if not self._hit(self.settings.throttling_rate):
+                return method(*args, **kwargs)
+            with self._lock:
+                self.throttled_count += 1
+            if retried_count < self.settings.max_retries:
+                time.sleep(self.settings.retry_after)
+        raise _create_error("TooManyRequests", f"'{name}' is throttled.", 429)
+
+    def _hit(self, rate: float) -> bool:
+        if not rate:
+            return False
+        with self._lock:
+            return self._random.random() < rate
+
+    def _check_resource_group(self, resource_group_name: str) -> bool:
+        with self._lock:
+            return resource_group_name in self.resource_groups
+
+    def _create_resource_group(
+        self, resource_group_name: str, parameters: Dict[str, Any]
+    ) -> Any:
+        with self._lock:
+            self.resource_groups.setdefault(
+                resource_group_name, {"vms": [], "nics": [], "public_ips": []}
+            )
+        return SimpleNamespace(name=resource_group_name, **parameters)
+
+    def _begin_delete_resource_group(self, resource_group_name: str) -> _MockPoller:
+        def _delete() -> None:
+            with self._lock:
+                self.resource_groups.pop(resource_group_name, None)
+
+        return _MockPoller(self.settings.deletion_latency, on_done=_delete)
+
+    def _begin_validate(
+        self, resource_group_name: str, deployment_name: str, parameters: Any
+    ) -> _MockPoller:
+        self._get_resource_group(resource_group_name)
+        return _MockPoller(0)
+
+    def _begin_deploy(
+        self, resource_group_name: str, deployment_name: str, parameters: Any
+    ) -> _MockPoller:
+        self._get_resource_group(resource_group_name)
+        outputs, error, provision = self._create_deployment(
+            resource_group_name, parameters.properties.parameters
+        )
+        result_outputs = (
+            {"nodes": {"value": outputs}} if self.settings.deployment_outputs else {}
+        )
+        return _MockPoller(
+            self.settings.deployment_latency,
+            result=SimpleNamespace(
+                properties=SimpleNamespace(
+                    outputs=result_outputs, provisioning_state="Succeeded"
+                )
+            ),
+            error=(
+                _create_error(self.settings.failure_code, error, 200) if error else None
+            ),
+            on_done=provision,
+        )
+
+    def _begin_deploy_at_subscription_scope(
+        self, deployment_name: str, parameters: Any
+    ) -> _MockPoller:
+        # resource groups are created first, and then nested deployments in them.
+        resources: List[Dict[str, Any]] = parameters.properties.template["resources"]
+        for resource in resources:
+            if resource["type"] == "Microsoft.Resources/resourceGroups":
+                self._create_resource_group(
+                    resource["name"], {"location": resource["location"]}
+                )
+        provisions: List[Callable[[], None]] = []
+        has_error = False
+        for resource in resources:
+            if resource["type"] != "Microsoft.Resources/deployments":
+                continue
+            resource_group_name = resource["resourceGroup"]
+            outputs, error, provision = self._create_deployment(
+                resource_group_name, resource["properties"]["parameters"]
+            )
+            provisions.append(provision)
+            has_error = has_error or bool(error)
+            self.deployments[(resource_group_name, resource["name"])] = SimpleNamespace(
+                properties=SimpleNamespace(
+                    provisioning_state="Failed" if error else "Succeeded",
+                    outputs=(
+                        {}
+                        if error
+                        else {"nodes": {"value": outputs}}
+                        if self.settings.deployment_outputs
+                        else {}
+                    ),
+                    error=(
+                        SimpleNamespace(
+                            code=self.settings.failure_code,
+                            message=error,
+                            details=None,
+                        )
+                        if error
+                        else None
+                    ),
+                )
+            )
+
+        def _provision() -> None:
+            for provision in provisions:
+                provision()
+
+        return _MockPoller(
+            self.settings.deployment_latency,
+            error=(
+                _create_error("DeploymentFailed", "nested deployments failed.", 200)
+                if has_error
+                else None
+            ),
+            on_done=_provision,
+        )
+
+    def _get_deployment(self, resource_group_name: str, deployment_name: str) -> Any:
+        self._get_resource_group(resource_group_name)
+        with self._lock:
+            deployment = self.deployments.get(
+                (resource_group_name, deployment_name), None
+            )
+        if deployment is None:
+            raise _create_error(
+                "DeploymentNotFound",
+                f"Deployment '{deployment_name}' could not be found.",
+                404,
+            )
+        return deployment
+
+    def _create_deployment(
+        self, resource_group_name: str, parameters: Dict[str, Any]
+    ) -> Tuple[List[Dict[str, str]], str, Callable[[], None]]:
+        """
+        return outputs, the error message and the function to provision VMs,
+        which is called when the deployment is done.
+        """
+        error = ""
+        outputs: List[Dict[str, str]] = []
+        if self._hit(self.settings.failure_rate):
+            with self._lock:
+                self.failed_deployments.append(resource_group_name)
+            error = self.settings.failure_message
+            if self.settings.failure_code not in _PROVISIONED_FAILURE_CODES:
+                return outputs, error, lambda: None
+
+        names = [x["name"] for x in parameters["nodes"]["value"]]
+        outputs = [self._create_vm(resource_group_name, name) for name in names]
+
+        def _provision() -> None:
+            resource_group = self._get_resource_group(resource_group_name)
+            with self._lock:
+                for output in outputs:
+                    name = output["name"]
+                    resource_group["vms"].append(
+                        SimpleNamespace(name=name, power_state="running")
+                    )
+                    resource_group["nics"].append(
+                        SimpleNamespace(
+                            name=f"{name}-nic-0",
+                            ip_configurations=[
+                                SimpleNamespace(
+                                    private_ip_address=output["private_ip_address"]
+                                )
+                            ],
+                        )
+                    )
+                    resource_group["public_ips"].append(
+                        SimpleNamespace(
+                            name=f"{name}-public-ip",
+                            ip_address=output["public_ip_address"],
+                        )
+                    )
+
+        return outputs, error, _provision
+
+    def _get_vm(self, resource_group_name: str, vm_name: str) -> Any:
+        for vm in self._list(resource_group_name, "vms"):
+            if vm.name == vm_name:
+                return vm
+        raise _create_error(
+            "ResourceNotFound", f"vm '{vm_name}' could not be found.", 404
+        )
+
+    def _begin_restart_vm(self, resource_group_name: str, vm_name: str) -> _MockPoller:
+        vm = self._get_vm(resource_group_name, vm_name)
+        if vm.power_state != "running":
+            raise _create_error(
+                "OperationNotAllowed",
+                f"Operation 'restart' is not allowed since the VM '{vm_name}' "
+                f"is {vm.power_state}.",
+                409,
+            )
+        return _MockPoller(self.settings.latency)
+
+    def _get_vm_instance_view(self, resource_group_name: str, vm_name: str) -> Any:
+        vm = self._get_vm(resource_group_name, vm_name)
+        return SimpleNamespace(
+            statuses=[
+                SimpleNamespace(code="ProvisioningState/succeeded"),
+                SimpleNamespace(code=f"PowerState/{vm.power_state}"),
+            ]
+        )
+
+    def _create_vm(self, resource_group_name: str, name: str) -> Dict[str, str]:
+        with self._lock:
+            self._address_index += 1
+            index = self._address_index
+        return {
+            "name": name,
+            "private_ip_address": f"10.0.{index // 256 % 256}.{index % 256}",
+            "public_ip_address": f"192.0.{index // 256 % 256}.{index % 256}",
+        }
+
+    def _get_resource_group(self, resource_group_name: str) -> Dict[str, Any]:
+        with self._lock:
+            resource_group = self.resource_groups.get(resource_group_name, None)
+        if resource_group is None:
+            raise _create_error(
+                "ResourceGroupNotFound",
+                f"Resource group '{resource_group_name}' could not be found.",
+                404,
+            )
+        return resource_group
+
+    def _list(self, resource_group_name: str, kind: str) -> List[Any]:
+        resource_group = self._get_resource_group(resource_group_name)
+        with self._lock:
+            return list(resource_group[kind])
+
+    def _list_skus(self, filter: str) -> Any:
+        matched = _LOCATION_FILTER_PATTERN.search(filter)
+        location = matched.group("location") if matched else ""
+        skus = [ResourceSku.from_dict(x) for x in self.settings.skus.get(location, [])]
+        return SimpleNamespace(by_page=lambda: [skus])
+
+    def _get_storage_account(self, account_name: str, resource_group_name: str) -> Any:
+        with self._lock:
+            if account_name not in self.storage_accounts:
+                raise _create_error(
+                    "ResourceNotFound", f"'{account_name}' is not found.", 404
+                )
+        return SimpleNamespace(name=account_name)
+
+    def _begin_create_storage_account(
+        self, resource_group_name: str, account_name: str, parameters: Any
+    ) -> _MockPoller:
+        with self._lock:
+            self.storage_accounts[account_name] = resource_group_name
+        return _MockPoller(0)
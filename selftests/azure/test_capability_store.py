@@ -0,0 +1,85 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import List
+from unittest.case import TestCase
+
+from lisa.sut_orchestrator.azure.capability_store import (
+    AzureCapabilityStore,
+    CapabilityRecord,
+)
+
+
+class AzureCapabilityStoreTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = TemporaryDirectory()
+        self._store = AzureCapabilityStore(Path(self._temp_dir.name) / "cap.db")
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_save_and_load(self) -> None:
+        self.assertIsNone(self._store.load("westus2"))
+        updated_time = datetime(2021, 1, 1, 10, 0, 0)
+        self._store.save("westus2", updated_time, self._create_records())
+
+        loaded = self._store.load("westus2")
+        assert loaded
+        self.assertEqual(updated_time, loaded[0])
+        # the saving order is kept, and the data isn't loaded with records.
+        expected_records = self._create_records()
+        for record in expected_records:
+            record.data = {}
+        self.assertEqual(expected_records, loaded[1])
+        self.assertEqual(
+            {"Standard_NC6": {"vm_size": "Standard_NC6"}},
+            self._store.load_data("westus2", ["Standard_NC6", "Standard_NV6"]),
+        )
+        self.assertEqual({}, self._store.load_data("eastus2", ["Standard_NC6"]))
+        self.assertEqual(updated_time, self._store.get_updated_time("westus2"))
+        self.assertIsNone(self._store.load("eastus2"))
+
+        # saving again replaces all records of the location.
+        self._store.save("westus2", datetime.now(), self._create_records()[:1])
+        loaded = self._store.load("westus2")
+        assert loaded
+        self.assertEqual(["Standard_NC6"], [x.vm_size for x in loaded[1]])
+
+    def test_old_schema_dropped(self) -> None:
+        path = Path(self._temp_dir.name) / "old.db"
+        with sqlite3.connect(str(path)) as connection:
+            connection.execute(
+                "CREATE TABLE capabilities (location TEXT, vm_size TEXT, "
+                "core_count INTEGER NOT NULL, data BLOB)"
+            )
+        store = AzureCapabilityStore(path)
+        store.save("westus2", datetime.now(), self._create_records())
+        loaded = store.load("westus2")
+        assert loaded
+        self.assertEqual(3, len(loaded[1]))
+
+    def _create_records(self) -> List[CapabilityRecord]:
+        return [
+            CapabilityRecord(
+                vm_size="Standard_NC6",
+                estimated_cost=106,
+                core_count=6,
+                memory_mb=57344,
+                gpu_count=1,
+                features=["Gpu", "Sriov"],
+                disk_types=["StandardHDDLRS"],
+                data={"vm_size": "Standard_NC6"},
+            ),
+            # the counts and disk types may be unknown.
+            CapabilityRecord(vm_size="Standard_DS2_v2", data={"vm_size": "DS2_v2"}),
+            CapabilityRecord(
+                vm_size="Standard_D8s_v3",
+                core_count=8,
+                disk_types=[],
+                data={"vm_size": "Standard_D8s_v3"},
+            ),
+        ]
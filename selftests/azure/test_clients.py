@@ -0,0 +1,73 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from types import SimpleNamespace
+from typing import Any
+from unittest.case import TestCase
+
+from azure.core.credentials import AccessToken
+
+from lisa.sut_orchestrator.azure import common
+from lisa.util import LisaException
+from lisa.util.logger import get_logger
+
+
+class _MockCredential:
+    def get_token(self, *scopes: str, **kwargs: Any) -> AccessToken:
+        return AccessToken("token", 0)
+
+
+class AzureClientsTestCase(TestCase):
+    def setUp(self) -> None:
+        common.clear_clients()
+
+    def tearDown(self) -> None:
+        common.clear_clients()
+
+    def test_clients_are_cached(self) -> None:
+        credential = _MockCredential()
+        platform: Any = SimpleNamespace(credential=credential, subscription_id="sub")
+
+        compute_client = common.get_compute_client(platform)
+        self.assertIs(compute_client, common.get_compute_client(platform))
+        # different api versions are different clients.
+        self.assertIsNot(
+            compute_client, common.get_compute_client(platform, "2020-06-01")
+        )
+        self.assertIs(
+            common.get_network_client(platform), common.get_network_client(platform)
+        )
+        self.assertIs(
+            common.get_storage_client(credential, "sub"),
+            common.get_storage_client(credential, "sub"),
+        )
+
+        # different credentials or subscriptions are not mixed.
+        other_platform: Any = SimpleNamespace(
+            credential=_MockCredential(), subscription_id="sub"
+        )
+        self.assertIsNot(compute_client, common.get_compute_client(other_platform))
+        self.assertIsNot(
+            common.get_resource_management_client(credential, "sub"),
+            common.get_resource_management_client(credential, "other"),
+        )
+
+
+class _MockBlobClient:
+    def __init__(self, status: str) -> None:
+        self._status = status
+
+    def get_blob_properties(self) -> Any:
+        return SimpleNamespace(
+            copy=SimpleNamespace(
+                status=self._status, status_description="", progress="512/1024"
+            )
+        )
+
+
+class WaitCopyBlobTestCase(TestCase):
+    def test_wait_copy_blob(self) -> None:
+        log = get_logger("test", "copy")
+        common.wait_copy_blob(_MockBlobClient("success"), "test.vhd", log)
+        with self.assertRaises(LisaException):
+            common.wait_copy_blob(_MockBlobClient("failed"), "test.vhd", log)
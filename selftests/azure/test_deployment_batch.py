@@ -0,0 +1,59 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from threading import Thread
+from typing import Any, Dict, List
+from unittest.case import TestCase
+
+from lisa.sut_orchestrator.azure.deployment_batch import DeploymentBatcher
+
+
+class DeploymentBatcherTestCase(TestCase):
+    def setUp(self) -> None:
+        self._batches: List[List[int]] = []
+
+    def test_full_batch(self) -> None:
+        batcher = DeploymentBatcher[int](self._deploy, max_size=3, wait_time=60)
+        results = self._run_concurrently(batcher, [1, 2, 3])
+
+        self.assertEqual([[1, 2, 3]], [sorted(x) for x in self._batches])
+        self.assertEqual({1: "deployed 1", 2: "deployed 2"}, results["succeeded"])
+        self.assertEqual({3: "failed 3"}, results["failed"])
+
+    def test_partial_batch(self) -> None:
+        # the batch is deployed after waiting, even it's not full.
+        batcher = DeploymentBatcher[int](self._deploy, max_size=5, wait_time=0.1)
+        results = self._run_concurrently(batcher, [1, 2])
+
+        self.assertEqual([[1, 2]], [sorted(x) for x in self._batches])
+        self.assertEqual({1: "deployed 1", 2: "deployed 2"}, results["succeeded"])
+
+    def test_batch_failed(self) -> None:
+        def _deploy(key: str, items: List[int]) -> List[Any]:
+            raise Exception("batch failed")
+
+        batcher = DeploymentBatcher[int](_deploy, max_size=2, wait_time=60)
+        results = self._run_concurrently(batcher, [1, 2])
+        self.assertEqual({1: "batch failed", 2: "batch failed"}, results["failed"])
+
+    def _deploy(self, key: str, items: List[int]) -> List[Any]:
+        self._batches.append(items)
+        return [Exception(f"failed {x}") if x == 3 else f"deployed {x}" for x in items]
+
+    def _run_concurrently(
+        self, batcher: DeploymentBatcher[int], items: List[int]
+    ) -> Dict[str, Dict[int, str]]:
+        results: Dict[str, Dict[int, str]] = {"succeeded": {}, "failed": {}}
+
+        def _run(item: int) -> None:
+            try:
+                results["succeeded"][item] = batcher.deploy("westus2", item)
+            except Exception as identifier:
+                results["failed"][item] = str(identifier)
+
+        threads = [Thread(target=_run, args=(x,)) for x in items]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        return results
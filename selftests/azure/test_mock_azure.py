@@ -0,0 +1,296 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import os
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Any, Dict, List, Optional, Tuple, Type
+from unittest import mock
+from unittest.case import TestCase
+
+from lisa import schema
+from lisa.environment import Environment
+from lisa.node import RemoteNode
+from lisa.sut_orchestrator import AZURE
+from lisa.sut_orchestrator.azure import common, platform_
+from lisa.sut_orchestrator.azure.deployment_batch import DeploymentBatcher
+from lisa.sut_orchestrator.azure.pool import POOL_STATE_IDLE, POOL_STATE_LEASED
+from lisa.util import LisaException, SkippedException, constants
+from lisa.util.logger import get_logger
+from lisa.util.parallel import Task, TaskManager
+from lisa.util.perf_timer import create_timer
+from selftests.azure.mock_azure import MockAzure, MockAzureSettings, load_skus
+
+# set it to 1000 or more for a benchmark of the platform throughput.
+_ENVIRONMENT_COUNT = int(os.environ.get("LISA_MOCK_AZURE_ENVIRONMENTS", "50"))
+_CONCURRENCY = 16
+
+
+class MockAzureTestCase(TestCase):
+    def setUp(self) -> None:
+        # each test starts without cached skus and validated deployments.
+        self._cache_dir = TemporaryDirectory()
+        constants.CACHE_PATH = Path(self._cache_dir.name)
+        self._log = get_logger("test", "mock_azure")
+        self._skus = load_skus([Path(__file__).parent / "azure_locations_westus2.json"])
+
+    def tearDown(self) -> None:
+        platform_.AzurePlatform._locations_data_cache.clear()
+        platform_.AzurePlatform._eligible_capabilities.clear()
+        platform_.AzurePlatform._capability_indexes.clear()
+        platform_.AzurePlatform._validated_deployments = None
+        platform_.AzurePlatform._image_cache.clear()
+        platform_.AzurePlatform._deletion_reaper = None
+        self._cache_dir.cleanup()
+
+    def test_deploy_at_scale(self) -> None:
+        mock_azure = MockAzure(
+            MockAzureSettings(
+                latency=0.001,
+                deployment_latency=0.01,
+                throttling_rate=0.05,
+                failure_rate=0.1,
+                max_retries=10,
+                skus=self._skus,
+                seed=1,
+            )
+        )
+        timer = create_timer()
+        results = self._deploy_and_delete(mock_azure, _ENVIRONMENT_COUNT)
+        self._log.info(
+            f"deployed and deleted {_ENVIRONMENT_COUNT} environments in "
+            f"{timer.elapsed_text()}, throttled calls: {mock_azure.throttled_count}"
+        )
+
+        failed_names = [name for name, error in results if error]
+        self.assertEqual(sorted(mock_azure.failed_deployments), sorted(failed_names))
+        for _, error in results:
+            if error:
+                self.assertIn("AllocationFailed", str(error))
+        # skus are queried once, and the same shape is validated once per worker
+        # at most.
+        self.assertEqual(1, mock_azure.calls["resource_skus.list"])
+        self.assertLessEqual(
+            mock_azure.calls["deployments.begin_validate"], _CONCURRENCY
+        )
+        # all resource groups are deleted, including the failed ones. If there
+        # are too many pending deletions, the rest are journaled for next run.
+        journaled_names = [
+            x[0]
+            for x in self._platform._get_deletion_reaper().journal.list(
+                self._platform.subscription_id
+            )
+        ]
+        self.assertEqual(
+            [], [x for x in mock_azure.resource_groups if x not in journaled_names]
+        )
+
+    def test_addresses_listed_from_resources(self) -> None:
+        mock_azure = MockAzure(
+            MockAzureSettings(
+                throttling_rate=0.2,
+                max_retries=20,
+                skus=self._skus,
+                deployment_outputs=False,
+            )
+        )
+        results = self._deploy_and_delete(mock_azure, 3)
+        self.assertEqual([], [error for _, error in results if error])
+        self.assertEqual(3, mock_azure.calls["network_interfaces.list"])
+        self.assertEqual({}, mock_azure.resource_groups)
+
+    def test_batched_deployment_errors(self) -> None:
+        # errors of batched deployments are handled like single deployments.
+        cases: List[Tuple[str, str, Optional[Type[Exception]]]] = [
+            (
+                "OSProvisioningTimedOut",
+                "OS Provisioning for VM 'node-0' did not finish in the allotted "
+                "time.",
+                None,
+            ),
+            (
+                "BadRequest",
+                "The selected VM size 'Standard_DS2_v2' cannot boot Hypervisor "
+                "Generation '1'.",
+                SkippedException,
+            ),
+            ("AllocationFailed", "mocked allocation failure.", LisaException),
+        ]
+        for failure_code, failure_message, error_type in cases:
+            for batch_size in [3, 1]:
+                # each run validates the deployment again.
+                platform_.AzurePlatform._validated_deployments = None
+                (
+                    constants.CACHE_PATH / platform_.VALIDATED_DEPLOYMENTS_FILE_NAME
+                ).unlink(missing_ok=True)
+                mock_azure = MockAzure(
+                    MockAzureSettings(
+                        failure_rate=1,
+                        failure_code=failure_code,
+                        failure_message=failure_message,
+                        skus=self._skus,
+                    )
+                )
+                results = self._deploy_and_delete(mock_azure, 3, batch_size)
+                self.assertEqual(
+                    [error_type] * 3,
+                    [type(error) if error else None for _, error in results],
+                    f"{failure_code}, batch size: {batch_size}",
+                )
+                self.assertGreaterEqual(
+                    mock_azure.calls["deployments.begin_validate"], 1
+                )
+                self.assertEqual(
+                    1 if batch_size > 1 else 0,
+                    mock_azure.calls[
+                        "deployments.begin_create_or_update_at_subscription_scope"
+                    ],
+                )
+
+    def test_pooled_environments(self) -> None:
+        mock_azure = MockAzure(MockAzureSettings(skus=self._skus))
+        with mock_azure.patch(), mock.patch.object(
+            platform_, "dump_file"
+        ), mock.patch.object(
+            platform_, "wait_tcp_port_ready", return_value=(True, 0)
+        ) as wait_tcp_port_ready:
+            platform = self._create_platform()
+            platform._azure_runbook.pool_size = 1
+            pool = platform._get_environment_pool()
+
+            # the first environment is deployed, and returned to the pool.
+            first = self._deploy_environment(platform, 0)
+            pooled_name = common.get_environment_context(first).resource_group_name
+            platform._delete_environment(first, self._log)
+            self.assertIn(pooled_name, mock_azure.resource_groups)
+            self.assertEqual(
+                [(pooled_name, POOL_STATE_IDLE)],
+                [(x[0], x[2]) for x in pool.list(platform.subscription_id)],
+            )
+
+            # the next one leases it. The vms are rebooted and checked, instead
+            # of deploying.
+            second = self._deploy_environment(platform, 1)
+            self.assertEqual(
+                pooled_name,
+                common.get_environment_context(second).resource_group_name,
+            )
+            self.assertEqual(1, mock_azure.calls["deployments.begin_create_or_update"])
+            self.assertEqual(1, mock_azure.calls["virtual_machines.begin_restart"])
+            self.assertEqual(1, mock_azure.calls["virtual_machines.instance_view"])
+            self.assertEqual(1, wait_tcp_port_ready.call_count)
+            self.assertEqual(
+                [(pooled_name, POOL_STATE_LEASED)],
+                [(x[0], x[2]) for x in pool.list(platform.subscription_id)],
+            )
+            platform._delete_environment(second, self._log)
+
+            # the unhealthy one is removed from the pool and deleted, and a new
+            # environment is deployed.
+            for vm in mock_azure.resource_groups[pooled_name]["vms"]:
+                vm.power_state = "deallocated"
+            third = self._deploy_environment(platform, 2)
+            third_name = common.get_environment_context(third).resource_group_name
+            self.assertNotEqual(pooled_name, third_name)
+            self.assertEqual(2, mock_azure.calls["deployments.begin_create_or_update"])
+            self.assertEqual([], pool.list(platform.subscription_id))
+            self.assertTrue(platform._get_deletion_reaper().wait(timeout=60))
+            self.assertNotIn(pooled_name, mock_azure.resource_groups)
+
+            platform._delete_environment(third, self._log)
+            self.assertEqual(
+                [(third_name, POOL_STATE_IDLE)],
+                [(x[0], x[2]) for x in pool.list(platform.subscription_id)],
+            )
+
+    def _deploy_environment(
+        self, platform: platform_.AzurePlatform, index: int
+    ) -> Environment:
+        environment = self._create_environment(index)
+        self.assertTrue(platform._prepare_environment(environment, self._log))
+        platform._deploy_environment(environment, self._log)
+        for node in environment.nodes.list():
+            assert isinstance(node, RemoteNode)
+            self.assertTrue(node.public_address)
+        return environment
+
+    def _deploy_and_delete(
+        self, mock_azure: MockAzure, count: int, batch_size: int = 1
+    ) -> List[Tuple[str, Optional[Exception]]]:
+        """
+        return resource group names and errors of environments.
+        """
+        results: List[Tuple[str, Optional[Exception]]] = []
+        # the templates are not dumped in unittest.
+        with mock_azure.patch(), mock.patch.object(platform_, "dump_file"):
+            platform = self._create_platform(batch_size)
+            self._platform = platform
+
+            def _deploy(environment: Environment) -> Tuple[str, Optional[Exception]]:
+                error: Optional[Exception] = None
+                try:
+                    self.assertTrue(
+                        platform._prepare_environment(environment, self._log)
+                    )
+                    platform._deploy_environment(environment, self._log)
+                    for node in environment.nodes.list():
+                        assert isinstance(node, RemoteNode)
+                        self.assertTrue(node.public_address)
+                    platform._delete_environment(environment, self._log)
+                except Exception as identifier:
+                    error = identifier
+                return (
+                    common.get_environment_context(environment).resource_group_name,
+                    error,
+                )
+
+            task_manager = TaskManager[Tuple[str, Optional[Exception]]](
+                _CONCURRENCY, results.append
+            )
+            for index in range(count):
+                environment = self._create_environment(index)
+                task_manager.submit_task(
+                    Task[Tuple[str, Optional[Exception]]](
+                        index, lambda x=environment: _deploy(x), self._log
+                    )
+                )
+            task_manager.wait_for_all_workers()
+            self.assertTrue(platform._get_deletion_reaper().wait(timeout=60))
+        return results
+
+    def _create_platform(self, batch_size: int = 1) -> platform_.AzurePlatform:
+        platform = platform_.AzurePlatform(
+            schema.Platform(admin_password="mock password")
+        )
+        platform._azure_runbook = platform_.AzurePlatformSchema()
+        platform.subscription_id = "mock subscription id"
+        platform.credential = mock.MagicMock()
+        platform._rm_client = common.get_resource_management_client(
+            platform.credential, platform.subscription_id
+        )
+        if batch_size > 1:
+            platform._azure_runbook.deployment_batch_size = batch_size
+            platform._deployment_batcher = DeploymentBatcher[Dict[str, Any]](
+                platform._deploy_batch, max_size=batch_size, wait_time=10
+            )
+            # batched deployments are validated in the shared resource group.
+            common.check_or_create_resource_group(
+                platform.credential,
+                platform.subscription_id,
+                platform._azure_runbook.shared_resource_group_name,
+                platform_.RESOURCE_GROUP_LOCATION,
+                self._log,
+            )
+        return platform
+
+    def _create_environment(self, index: int) -> Environment:
+        runbook = schema.Environment()
+        node_requirement = schema.NodeSpace()
+        node_runbook = node_requirement.get_extended_runbook(
+            common.AzureNodeSchema, AZURE
+        )
+        node_runbook.location = "westus2"
+        runbook.nodes_requirement = [node_requirement]
+        return Environment(
+            is_predefined=True, warn_as_error=False, id_=index, runbook=runbook
+        )
@@ -0,0 +1,53 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from datetime import timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.case import TestCase
+
+from lisa.sut_orchestrator.azure.pool import (
+    POOL_STATE_IDLE,
+    POOL_STATE_LEASED,
+    EnvironmentPool,
+)
+
+
+class EnvironmentPoolTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = TemporaryDirectory()
+        self._path = Path(self._temp_dir.name) / "pool.db"
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_lease_and_release(self) -> None:
+        pool = EnvironmentPool(self._path)
+        self.assertIsNone(pool.lease("sub", "shape1", "run1"))
+
+        self.assertTrue(pool.release("sub", "rg1", "shape1", max_idle_count=1))
+        # the pool of shape1 is full.
+        self.assertFalse(pool.release("sub", "rg2", "shape1", max_idle_count=1))
+        self.assertTrue(pool.release("sub", "rg3", "shape2", max_idle_count=1))
+        self.assertEqual(
+            [("rg1", "shape1", POOL_STATE_IDLE), ("rg3", "shape2", POOL_STATE_IDLE)],
+            pool.list("sub"),
+        )
+
+        self.assertEqual("rg1", pool.lease("sub", "shape1", "run1"))
+        # leased by others
+        self.assertIsNone(EnvironmentPool(self._path).lease("sub", "shape1", "run2"))
+        self.assertIsNone(pool.lease("other", "shape2", "run1"))
+        self.assertEqual(("rg1", "shape1", POOL_STATE_LEASED), pool.list("sub")[1])
+
+        # return the leased one.
+        self.assertTrue(pool.release("sub", "rg1", "shape1", max_idle_count=1))
+        pool.remove("sub", "rg1")
+        self.assertEqual(["rg3"], [x[0] for x in pool.list("sub")])
+
+    def test_abandoned_lease(self) -> None:
+        pool = EnvironmentPool(self._path, lease_timeout=timedelta(seconds=-1))
+        pool.release("sub", "rg1", "shape1", max_idle_count=1)
+        self.assertEqual("rg1", pool.lease("sub", "shape1", "run1"))
+        # the lease is timeout, so it's leased again.
+        self.assertEqual("rg1", pool.lease("sub", "shape1", "run2"))
@@ -1,7 +1,10 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import shutil
 from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
 from typing import Any, Dict, List, Optional
 from unittest.case import TestCase
 
@@ -10,7 +13,7 @@ from azure.mgmt.compute.models import ResourceSku  # type: ignore
 from lisa import schema, search_space
 from lisa.environment import Environment
 from lisa.sut_orchestrator import AZURE
-from lisa.sut_orchestrator.azure import common, platform_
+from lisa.sut_orchestrator.azure import common, features, platform_
 from lisa.util import LisaException, constants
 from lisa.util.logger import get_logger
 
@@ -18,7 +21,20 @@ from lisa.util.logger import get_logger
 class AzurePrepareTestCase(TestCase):
     @classmethod
     def setUpClass(cls) -> None:
-        constants.CACHE_PATH = Path(__file__).parent
+        # copy cached locations to a temp folder, so the capability store is not
+        # created in source folder.
+        cls._cache_dir = TemporaryDirectory()
+        constants.CACHE_PATH = Path(cls._cache_dir.name)
+        for file in Path(__file__).parent.glob("azure_locations_*.json"):
+            shutil.copy(file, constants.CACHE_PATH)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        platform_.AzurePlatform._locations_data_cache.clear()
+        platform_.AzurePlatform._eligible_capabilities.clear()
+        platform_.AzurePlatform._capability_indexes.clear()
+        platform_.AzurePlatform._validated_deployments = None
+        cls._cache_dir.cleanup()
 
     def setUp(self) -> None:
         self._log = get_logger("test", "azure")
@@ -33,6 +49,19 @@ class AzurePrepareTestCase(TestCase):
         for location in locations:
             self._platform.get_eligible_vm_sizes(location, self._log)
 
+    def test_prefetch_locations(self) -> None:
+        # locations are loaded concurrently, and saved in the capability store.
+        locations = ["westeurope", "uksouth", "brazilsouth"]
+        self._platform._prefetch_location_infos(locations, self._log)
+        store = self._platform._get_capability_store()
+        for location in locations:
+            key = self._platform._get_location_key(location)
+            self.assertIn(key, self._platform._locations_data_cache)
+            self.assertIsNotNone(store.get_updated_time(location))
+        loaded = store.load("westeurope")
+        assert loaded
+        self.assertIn("Standard_DS2_v2", [x.vm_size for x in loaded[1]])
+
     def test_load_capability(self) -> None:
         # capability can be loaded correct
         # expected test data is from json file
@@ -291,6 +320,125 @@ class AzurePrepareTestCase(TestCase):
             environment=env,
         )
 
+    def test_index_keeps_matched_capabilities(self) -> None:
+        # the index prunes candidates only, which cannot meet the requirement.
+        requirements = [
+            schema.NodeSpace(),
+            schema.NodeSpace(core_count=8, memory_mb=16384),
+            schema.NodeSpace(memory_mb=search_space.IntRange(min=143360)),
+            schema.NodeSpace(
+                core_count=[
+                    search_space.IntRange(min=2, max=2),
+                    search_space.IntRange(min=16, max=32),
+                ],
+                gpu_count=search_space.IntRange(min=1),
+            ),
+            schema.NodeSpace(
+                disk=schema.DiskOptionSettings(disk_type=schema.DiskType.PremiumSSDLRS)
+            ),
+            schema.NodeSpace(
+                disk=features.AzureDiskOptionSettings(
+                    disk_type=search_space.SetSpace[schema.DiskType](
+                        is_allow_set=True, items=[schema.DiskType.PremiumSSDLRS]
+                    )
+                )
+            ),
+        ]
+        capabilities = self._platform.get_eligible_vm_sizes("eastus2", self._log)
+        for requirement in requirements:
+            candidates = self._platform._get_candidate_capabilities(
+                "eastus2", requirement, self._log
+            )
+            expected = [
+                x for x in capabilities if requirement.check(x.capability).result
+            ]
+            self.assertEqual(
+                expected,
+                [x for x in candidates if requirement.check(x.capability).result],
+            )
+        # the exact vm size is found by the index.
+        matched = self._platform._find_capability_by_vm_size(
+            "eastus2", "standard_ds2_v2", self._log
+        )
+        assert matched
+        self.assertEqual("Standard_DS2_v2", matched.vm_size)
+
+    def test_stored_capabilities_parsed_lazily(self) -> None:
+        # the stored location is not parsed, until a vm size is used.
+        location_info = self._platform._load_location_info("eastus2", self._log)
+        self.assertIn("Standard_DS2_v2", [x.vm_size for x in location_info.records])
+        self.assertEqual({}, location_info._capabilities)
+
+        capabilities = location_info.get(["Standard_DS2_v2", "Standard_NotExists"])
+        self.assertEqual(["Standard_DS2_v2"], [x.vm_size for x in capabilities])
+        self.assertEqual(["Standard_DS2_v2"], list(location_info._capabilities))
+
+    def test_addresses_from_deployment_outputs(self) -> None:
+        outputs = {
+            "nodes": [
+                {
+                    "name": "node-0",
+                    "private_ip_address": "10.0.0.4",
+                    "public_ip_address": "1.1.1.1",
+                },
+                {
+                    "name": "node-1",
+                    "private_ip_address": "10.0.0.5",
+                    "public_ip_address": "",
+                },
+            ]
+        }
+        self.assertEqual(
+            {"node-0": ("10.0.0.4", "1.1.1.1")},
+            self._platform._get_addresses_from_outputs(outputs, ["node-0"]),
+        )
+        # if any address is missing, they are listed from resources.
+        self.assertEqual(
+            {},
+            self._platform._get_addresses_from_outputs(outputs, ["node-0", "node-1"]),
+        )
+        self.assertEqual({}, self._platform._get_addresses_from_outputs({}, ["node-0"]))
+
+    def test_validated_deployments(self) -> None:
+        def _create_parameters(name: str, password: str, vm_size: str) -> Any:
+            parameters = {
+                "admin_password": password,
+                "vm_tags": {"RG": f"{name}-rg"},
+                "nodes": [{"name": name, "vm_size": vm_size}],
+            }
+            return {
+                "parameters": SimpleNamespace(
+                    properties=SimpleNamespace(
+                        template={"resources": []},
+                        parameters={k: {"value": v} for k, v in parameters.items()},
+                    )
+                )
+            }
+
+        key = self._platform._get_deployment_key(
+            _create_parameters("node-0", "password1", "Standard_DS2_v2")
+        )
+        # names and secrets don't change the key.
+        self.assertEqual(
+            key,
+            self._platform._get_deployment_key(
+                _create_parameters("node-1", "password2", "Standard_DS2_v2")
+            ),
+        )
+        self.assertNotEqual(
+            key,
+            self._platform._get_deployment_key(
+                _create_parameters("node-0", "password1", "Standard_DS3_v2")
+            ),
+        )
+
+        self.assertIsNone(self._platform._get_validated_time(key))
+        self._platform._save_validated_time(key)
+        self.assertIsNotNone(self._platform._get_validated_time(key))
+        # it's loaded by other processes.
+        platform_.AzurePlatform._validated_deployments = None
+        self.assertIsNotNone(self._platform._get_validated_time(key))
+
     def verify_exists_vm_size(
         self, location: str, vm_size: str, expect_exists: bool
     ) -> Optional[platform_.AzureCapability]:
@@ -0,0 +1,67 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.case import TestCase
+
+from lisa.sut_orchestrator.azure.reaper import DeletionJournal, DeletionReaper
+from lisa.util.logger import get_logger
+
+
+class _MockOperation:
+    def __init__(self, is_done: bool = True, error: str = "") -> None:
+        self.is_done = is_done
+        self.error = error
+
+    def done(self) -> bool:
+        return self.is_done
+
+    def result(self) -> None:
+        if self.error:
+            raise Exception(self.error)
+
+
+class DeletionReaperTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = TemporaryDirectory()
+        self._journal = DeletionJournal(Path(self._temp_dir.name) / "deletions.db")
+        self._log = get_logger("test", "reaper")
+
+    def tearDown(self) -> None:
+        self._temp_dir.cleanup()
+
+    def test_deletions(self) -> None:
+        reaper = DeletionReaper(self._journal, self._log)
+        reaper.submit("sub", "rg1", _MockOperation())
+        reaper.submit("sub", "rg2", _MockOperation(error="conflict"))
+        reaper.add_failure("sub", "rg3", "forbidden")
+        self.assertTrue(reaper.wait(timeout=10))
+
+        succeeded, failed, pending = reaper.summarize()
+        self.assertEqual(["rg1"], succeeded)
+        self.assertEqual({"rg2": "conflict", "rg3": "forbidden"}, failed)
+        self.assertEqual([], pending)
+        # failed deletions are kept for next run.
+        self.assertEqual(
+            {"rg2": "conflict", "rg3": "forbidden"}, dict(self._journal.list("sub"))
+        )
+        self.assertEqual([], self._journal.list("other"))
+        # it's reset after summarized
+        self.assertEqual(([], {}, []), reaper.summarize())
+
+    def test_pending_deletions(self) -> None:
+        reaper = DeletionReaper(self._journal, self._log, max_pending=1)
+        operation = _MockOperation(is_done=False)
+        reaper.submit("sub", "rg1", operation)
+        # it's not tracked, but saved in journal.
+        reaper.submit("sub", "rg2", _MockOperation())
+        self.assertFalse(reaper.wait(timeout=0.1))
+
+        _, _, pending = reaper.summarize()
+        self.assertEqual(["rg1", "rg2"], pending)
+        self.assertEqual(["rg1", "rg2"], [x[0] for x in self._journal.list("sub")])
+
+        operation.is_done = True
+        self.assertTrue(reaper.wait(timeout=10))
+        self.assertEqual(["rg2"], [x[0] for x in self._journal.list("sub")])
@@ -8,7 +8,7 @@ import lisa
 from lisa import LisaException, constants, schema
 from lisa.environment import EnvironmentStatus, load_environments
 from lisa.notifier import register_notifier
-from lisa.runner import RunnerResult
+from lisa.runner import RunnerContext, RunnerResult
 from lisa.runners.lisa_runner import LisaRunner
 from lisa.testsuite import TestResult, TestResultMessage, TestStatus, simple_requirement
 from lisa.util.parallel import Task
@@ -21,6 +21,7 @@ def generate_runner(
     case_use_new_env: bool = False,
     times: int = 1,
     platform_schema: Optional[test_platform.MockPlatformSchema] = None,
+    context: Optional[RunnerContext] = None,
 ) -> LisaRunner:
     platform_runbook = schema.Platform(
         type=constants.PLATFORM_MOCK, admin_password="do-not-use"
@@ -41,7 +42,7 @@ def generate_runner(
     ]
     if env_runbook:
         runbook.environment = env_runbook
-    runner = LisaRunner(runbook, 0, {})
+    runner = LisaRunner(runbook, 0, {}, context=context)
 
     return runner
 
@@ -218,6 +219,54 @@ class RunnerTestCase(TestCase):
             test_results=test_results,
         )
 
+    def test_plan_environments(self) -> None:
+        # generated_0 runs ut1 and ut2, generated_1 runs ut2, generated_2 runs
+        # ut2 and ut3. So generated_1 isn't needed.
+        envs = load_environments(generate_env_runbook(is_single_env=False))
+        runner = generate_runner(None)
+        runner.initialize()
+        runner.test_results = test_testsuite.generate_cases_result()
+        runner._merge_test_requirements(
+            test_results=runner.test_results,
+            existing_environments=envs,
+            platform_type=constants.PLATFORM_MOCK,
+        )
+        platform = test_platform.generate_platform()
+        for environment in envs.values():
+            platform.prepare_environment(environment)
+        planned = runner._plan_environments(list(envs.values()))
+        self.assertListEqual(["generated_0", "generated_2"], [x.name for x in planned])
+
+        # the cheaper environment is planned first, if it runs more cases per
+        # cost.
+        envs["generated_0"].cost = 3
+        envs["generated_1"].cost = 1
+        envs["generated_2"].cost = 1
+        planned = runner._plan_environments(list(envs.values()))
+        self.assertListEqual(["generated_2", "generated_0"], [x.name for x in planned])
+
+        # if generated_0 failed on ut1, ut2 goes back to generated_1, and ut3
+        # is still planned on generated_2.
+        envs["generated_0"].status = EnvironmentStatus.Deleted
+        runner.test_results[0].set_status(TestStatus.FAILED, "deployment failed")
+        runner._fallback_result_ids.add(runner.test_results[1].id_)
+        planned = runner._plan_environments(list(envs.values()))
+        self.assertListEqual(
+            ["generated_0", "generated_1", "generated_2"], [x.name for x in planned]
+        )
+        runner._fallback_result_ids.clear()
+        planned = runner._plan_environments(list(envs.values()))
+        self.assertListEqual(["generated_0", "generated_2"], [x.name for x in planned])
+
+        # cases on new environments keep their own environments.
+        envs["generated_0"].status = EnvironmentStatus.Prepared
+        for test_result in runner.test_results:
+            test_result.runtime_data.use_new_environment = True
+        planned = runner._plan_environments(list(envs.values()))
+        self.assertListEqual(
+            ["generated_0", "generated_1", "generated_2"], [x.name for x in planned]
+        )
+
     def test_fit_a_predefined_env(self) -> None:
         # predefined env can run case in below condition.
         # 1. with predefined env of 1 simple node, so ut2 don't need a new env
@@ -563,6 +612,39 @@ class RunnerTestCase(TestCase):
             test_results=test_results,
         )
 
+    def test_runners_share_context(self) -> None:
+        # runners of combinator iterations share the platform and selected
+        # test cases, if the runbooks are the same.
+        test_testsuite.generate_cases_metadata()
+        context = RunnerContext()
+        runner1 = generate_runner(None, context=context)
+        runner1.initialize()
+        runner2 = generate_runner(None, context=context)
+        runner2.initialize()
+        self.assertIs(runner1.platform, runner2.platform)
+        self.assertEqual(
+            [x.runtime_data.metadata for x in runner1.test_results],
+            [x.runtime_data.metadata for x in runner2.test_results],
+        )
+        # the runtime data isn't shared, as it's changed by runners.
+        self.assertIsNot(
+            runner1.test_results[0].runtime_data, runner2.test_results[0].runtime_data
+        )
+
+        # cases are selected again with different filters.
+        runner3 = generate_runner(None, times=2, context=context)
+        runner3.initialize()
+        self.assertIs(runner1.platform, runner3.platform)
+        # each case runs twice.
+        self.assertEqual(6, len(runner3.test_results))
+
+        # the platform is created again with different platform runbook.
+        runner4 = generate_runner(
+            None, platform_schema=test_platform.MockPlatformSchema(), context=context
+        )
+        runner4.initialize()
+        self.assertIsNot(runner1.platform, runner4.platform)
+
     def verify_test_results(
         self,
         expected_test_order: List[str],
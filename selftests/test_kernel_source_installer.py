@@ -0,0 +1,193 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from tempfile import TemporaryDirectory
+from threading import Event
+from typing import Any, Dict, List
+from unittest import TestCase, mock
+
+from lisa import schema
+from lisa.operating_system import CentOs, Ubuntu, Windows
+from lisa.transformers import kernel_source_installer
+from lisa.transformers.kernel_source_installer import (
+    KernelPackages,
+    SourceInstaller,
+    SourceInstallerSchema,
+    _get_package_patterns,
+    _get_package_type,
+    _load_packages,
+)
+from lisa.util import LisaException, constants
+from lisa.util.logger import get_logger
+from lisa.util.process import ExecutableResult
+
+_CODE_PATH = PurePosixPath("/home/lisa/code/linux")
+
+
+class SourceInstallerTestCase(TestCase):
+    def setUp(self) -> None:
+        temp_dir = TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self._temp_path = Path(temp_dir.name)
+        # CACHE_PATH is set by the main entry, so it may not exist in tests.
+        patcher = mock.patch.object(
+            constants, "CACHE_PATH", self._temp_path, create=True
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_cache_key(self) -> None:
+        # the same inputs share the cache, and any changed input misses it.
+        installer = self._create_installer()
+        node = self._create_node(Ubuntu, stdout="CONFIG_A=y")
+        commits = {"location": "commit1"}
+        with mock.patch.object(
+            SourceInstaller, "_get_source_commits", side_effect=lambda: commits
+        ):
+            path = installer._get_packages_cache_path(node, "deb")
+            assert path
+            self.assertEqual(
+                constants.CACHE_PATH
+                / kernel_source_installer.KERNEL_PACKAGES_FOLDER_NAME,
+                path.parent,
+            )
+            self.assertEqual(path, installer._get_packages_cache_path(node, "deb"))
+
+            paths = [
+                installer._get_packages_cache_path(node, "rpm"),
+                installer._get_packages_cache_path(
+                    self._create_node(Ubuntu, stdout="CONFIG_A=m"), "deb"
+                ),
+            ]
+            commits["location"] = "commit2"
+            paths.append(installer._get_packages_cache_path(node, "deb"))
+            self.assertEqual(4, len({path, *paths}))
+
+    def test_cache_key_without_commits(self) -> None:
+        # a local source has no commit, so it's not cached.
+        installer = self._create_installer(
+            location={"type": "local", "path": str(_CODE_PATH)}
+        )
+        node = self._create_node(Ubuntu)
+        self.assertIsNone(installer._get_packages_cache_path(node, "deb"))
+        node.execute.assert_not_called()
+
+    def test_load_packages(self) -> None:
+        path = self._temp_path / "packages"
+        path.mkdir()
+        # packages without the version file are partial.
+        for name in ["linux-image_1.deb", "linux-headers_1.deb", "build.log"]:
+            (path / name).write_text(name)
+        self.assertIsNone(_load_packages(path))
+
+        (path / kernel_source_installer._KERNEL_VERSION_FILE_NAME).write_text("5.15.0")
+        self.assertEqual(
+            KernelPackages(
+                kernel_version="5.15.0",
+                package_type="deb",
+                paths=[path / "linux-headers_1.deb", path / "linux-image_1.deb"],
+            ),
+            _load_packages(path),
+        )
+
+        for item in path.glob("*.deb"):
+            item.unlink()
+        self.assertIsNone(_load_packages(path))
+
+    def test_package_selection(self) -> None:
+        self.assertEqual("deb", _get_package_type(self._create_node(Ubuntu)))
+        self.assertEqual("rpm", _get_package_type(self._create_node(CentOs)))
+        with self.assertRaises(LisaException):
+            _get_package_type(self._create_node(Windows))
+
+        self.assertListEqual(
+            [
+                "/home/lisa/code/linux-image-5.15.0_*.deb",
+                "/home/lisa/code/linux-headers-5.15.0_*.deb",
+            ],
+            _get_package_patterns(_CODE_PATH, "5.15.0", "deb"),
+        )
+        self.assertListEqual(
+            ["$HOME/rpmbuild/RPMS/*/kernel-[0-9]*.rpm"],
+            _get_package_patterns(_CODE_PATH, "5.15.0", "rpm"),
+        )
+
+    def test_ccache_arguments(self) -> None:
+        installer = self._create_installer(ccache_path="/ccache")
+        self.assertEqual(
+            ("CC='ccache gcc' bindeb-pkg", {"CCACHE_DIR": "/ccache"}),
+            installer._get_build_arguments(self._create_node(Ubuntu), "deb"),
+        )
+        # ccache may not be installed, if it's not in the repo.
+        self.assertEqual(
+            ("bindeb-pkg", {}),
+            installer._get_build_arguments(
+                self._create_node(Ubuntu, exit_code=1), "deb"
+            ),
+        )
+        installer = self._create_installer(use_ccache=False)
+        node = self._create_node(CentOs)
+        self.assertEqual(
+            ("binrpm-pkg", {}), installer._get_build_arguments(node, "rpm")
+        )
+        node.execute.assert_not_called()
+
+    def test_builds_in_parallel(self) -> None:
+        # the first build waits for the second one, so they must not be
+        # serialized by a global lock.
+        second_started = Event()
+        built: List[str] = []
+
+        def _build(installer: SourceInstaller, node: Any) -> KernelPackages:
+            runbook: SourceInstallerSchema = installer.runbook
+            if runbook.ccache_path == "first":
+                if not second_started.wait(10):
+                    raise LisaException("builds are serialized")
+            else:
+                second_started.set()
+            built.append(runbook.ccache_path)
+            return KernelPackages(
+                kernel_version=runbook.ccache_path, package_type="deb", paths=[]
+            )
+
+        installers = [
+            self._create_installer(build_node={"type": "local"}, ccache_path=name)
+            for name in ["first", "second", "first"]
+        ]
+        with mock.patch.object(
+            kernel_source_installer, "quick_connect"
+        ), mock.patch.object(
+            SourceInstaller, "_build_packages", _build
+        ), mock.patch.dict(
+            kernel_source_installer._kernel_builds, clear=True
+        ):
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                results = list(executor.map(lambda x: x._get_packages(), installers))
+
+        self.assertListEqual(
+            ["first", "second", "first"], [x.kernel_version for x in results]
+        )
+        # the same runbook is built once.
+        self.assertListEqual(["first", "second"], sorted(built))
+
+    def _create_installer(self, **kwargs: Any) -> SourceInstaller:
+        runbook_data: Dict[str, Any] = {
+            "type": "source",
+            "location": {"type": "repo", "path": str(_CODE_PATH), "ref": "v5.15"},
+        }
+        runbook_data.update(kwargs)
+        runbook = schema.load_by_type(SourceInstallerSchema, runbook_data)
+        return SourceInstaller(
+            runbook, node=mock.MagicMock(), parent_log=get_logger("test")
+        )
+
+    def _create_node(self, os_type: type, stdout: str = "", exit_code: int = 0) -> Any:
+        node = mock.MagicMock()
+        node.os = mock.MagicMock(spec=os_type)
+        node.os.name = os_type.__name__
+        node.execute.return_value = ExecutableResult(
+            stdout=stdout, stderr="", exit_code=exit_code, cmd="", elapsed=0
+        )
+        return node
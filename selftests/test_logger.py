@@ -0,0 +1,104 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import logging
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import List
+from unittest.case import TestCase
+
+from lisa.util.logger import (
+    LOG_COMPRESSION_GZIP,
+    QueuedFileHandler,
+    QueuedLogListener,
+    decompress_log_file,
+    get_logger,
+)
+
+
+class QueuedLogTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = TemporaryDirectory()
+        self._path = Path(self._temp_dir.name)
+        self._listener = QueuedLogListener(flush_interval=0.01)
+        self._root = get_logger("queued_root")
+        self._root.setLevel(logging.DEBUG)
+        self._listener.attach(self._root)
+        self._listener.start()
+
+    def tearDown(self) -> None:
+        self._listener.stop()
+        self._temp_dir.cleanup()
+
+    def test_route_by_logger_name(self) -> None:
+        case_log = get_logger("case", "c1", parent=self._root)
+        env_log = get_logger("env", "e1", parent=self._root)
+        other_log = get_logger("case", "c2", parent=self._root)
+        main_handler = self._create_handler("main.log", self._root)
+        case_handler = self._create_handler("case.log", case_log)
+        self._listener.add_route(env_log.name, case_handler)
+
+        case_log.info("case message")
+        get_logger("node", "0", parent=env_log).info("node message")
+        other_log.info("other message")
+        self._listener.remove_route(case_log.name, case_handler)
+        self._listener.remove_route(env_log.name, case_handler)
+        case_log.info("after removed")
+        self._listener.close_handler(case_handler)
+        self._listener.stop()
+
+        case_lines = self._read("case.log")
+        self.assertEqual(2, len(case_lines))
+        self.assertIn("case message", case_lines[0])
+        self.assertIn("node message", case_lines[1])
+        main_lines = self._read("main.log")
+        self.assertEqual(4, len(main_lines))
+        self.assertIn("after removed", main_lines[-1])
+        self._listener.close_handler(main_handler)
+
+    def test_keep_order(self) -> None:
+        handler = self._create_handler("order.log", self._root)
+        log = get_logger("order", parent=self._root)
+        for index in range(1000):
+            log.debug(f"line {index}")
+        self._listener.stop()
+
+        lines = self._read("order.log")
+        self.assertEqual(
+            [f"line {index}" for index in range(1000)],
+            [line.split(" ", 1)[-1] for line in lines],
+        )
+        self._listener.close_handler(handler)
+
+    def _create_handler(
+        self, file_name: str, logger: logging.Logger
+    ) -> QueuedFileHandler:
+        handler = QueuedFileHandler(self._path / file_name)
+        handler.setFormatter(logging.Formatter("%(name)s %(message)s"))
+        self._listener.add_route(logger.name, handler)
+        return handler
+
+    def _read(self, file_name: str) -> List[str]:
+        with open(self._path / file_name, "r") as f:
+            return f.read().splitlines()
+
+    def test_compressed_and_truncated(self) -> None:
+        handler = QueuedFileHandler(
+            self._path / "case.log.gz",
+            compression=LOG_COMPRESSION_GZIP,
+            max_size=100,
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        self._listener.add_route(self._root.name, handler)
+        for index in range(100):
+            self._root.debug(f"line {index:02}")
+        self._listener.close_handler(handler)
+        self._listener.stop()
+
+        output_path = decompress_log_file(self._path / "case.log.gz")
+        self.assertEqual(self._path / "case.log", output_path)
+        lines = self._read("case.log")
+        # 8 characters per line, the head and the tail keep 6 lines.
+        self.assertEqual([f"line {index:02}" for index in range(6)], lines[:6])
+        self.assertIn("704 characters are truncated", lines[6])
+        self.assertEqual([f"line {index:02}" for index in range(94, 100)], lines[7:])
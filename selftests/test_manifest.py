@@ -0,0 +1,133 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import sys
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from lisa import schema
+from lisa.testselector import select_testcases
+from lisa.testsuite import (
+    TestSuiteManifest,
+    get_cases_metadata,
+    get_suites_metadata,
+    is_lazy_suite,
+)
+from lisa.util.package import import_package
+from selftests.test_testsuite import cleanup_cases_metadata
+
+_SUITE_CONTENT = """
+from lisa import TestCaseMetadata, TestSuite, TestSuiteMetadata, simple_requirement
+
+
+@TestSuiteMetadata(
+    area="manifest",
+    category="functional",
+    description="suite in manifest",
+    tags=["lazy"],
+    requirement=simple_requirement(min_count=2),
+)
+class ManifestSuite(TestSuite):
+    @TestCaseMetadata(description="case 1", priority=1)
+    def manifest_case1(self) -> None:
+        ...
+
+    @TestCaseMetadata(description="case 2", priority=3, owner="someone")
+    def manifest_case2(self) -> None:
+        ...
+"""
+
+_PACKAGE_NAME = "lisa_manifest_ext"
+_MODULE_NAME = f"{_PACKAGE_NAME}.suites"
+
+
+class ManifestTestCase(TestCase):
+    def setUp(self) -> None:
+        cleanup_cases_metadata()
+        self._temp_dir = TemporaryDirectory()
+        root = Path(self._temp_dir.name)
+        self._extension_path = root / "extension"
+        self._extension_path.mkdir()
+        self._suite_file = self._extension_path / "suites.py"
+        self._suite_file.write_text(_SUITE_CONTENT)
+        self._manifest_path = root / "cache" / "manifest.json"
+
+    def tearDown(self) -> None:
+        self._unload()
+        self._temp_dir.cleanup()
+
+    def test_suites_loaded_from_manifest(self) -> None:
+        self._import()
+        self.assertTrue(self._manifest_path.exists())
+
+        # the next run registers placeholders without importing the module.
+        self._unload()
+        self._import()
+        self.assertNotIn(_MODULE_NAME, sys.modules)
+        self.assertTrue(is_lazy_suite("ManifestSuite"))
+        suite = get_suites_metadata()["ManifestSuite"]
+        self.assertEqual(["lazy"], suite.tags)
+        self.assertEqual(
+            ["manifest_case1", "manifest_case2"], [x.name for x in suite.cases]
+        )
+        self.assertEqual("someone", suite.cases[1].owner)
+
+        # listing doesn't import the module.
+        filters = [schema.TestCase(criteria=schema.Criteria(priority=3))]
+        cases = select_testcases(filters, load_suites=False)
+        self.assertEqual(["manifest_case2"], [x.name for x in cases])
+        self.assertNotIn(_MODULE_NAME, sys.modules)
+
+        # the module is imported after it's selected, and the real metadata is
+        # used.
+        cases = select_testcases(filters)
+        self.assertIn(_MODULE_NAME, sys.modules)
+        self.assertFalse(is_lazy_suite("ManifestSuite"))
+        self.assertEqual(["manifest_case2"], [x.name for x in cases])
+        metadata = cases[0].metadata
+        self.assertIs(get_cases_metadata()["ManifestSuite.manifest_case2"], metadata)
+        self.assertEqual(2, len(metadata.requirement.environment.nodes))
+        self.assertEqual(
+            ["manifest_case1", "manifest_case2"],
+            [x.name for x in get_suites_metadata()["ManifestSuite"].cases],
+        )
+
+    def test_changed_module_imported(self) -> None:
+        self._import()
+        self._unload()
+        self._suite_file.write_text(
+            _SUITE_CONTENT.replace("case 2", "case 2 is changed")
+        )
+        self._import()
+        self.assertIn(_MODULE_NAME, sys.modules)
+        self.assertFalse(is_lazy_suite("ManifestSuite"))
+        self.assertEqual(
+            "case 2 is changed",
+            get_cases_metadata()["ManifestSuite.manifest_case2"].description,
+        )
+
+        # the manifest is updated with the changed module.
+        self._unload()
+        self._import()
+        self.assertTrue(is_lazy_suite("ManifestSuite"))
+        self.assertEqual(
+            "case 2 is changed",
+            get_cases_metadata()["ManifestSuite.manifest_case2"].description,
+        )
+
+    def _import(self) -> None:
+        manifest = TestSuiteManifest(self._manifest_path)
+        import_package(
+            self._extension_path,
+            package_name=_PACKAGE_NAME,
+            enable_log=False,
+            importer=manifest.import_module,
+        )
+        manifest.save()
+
+    def _unload(self) -> None:
+        # simulate a new run.
+        for name in [_PACKAGE_NAME, _MODULE_NAME]:
+            sys.modules.pop(name, None)
+        cleanup_cases_metadata()
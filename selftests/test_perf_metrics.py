@@ -0,0 +1,207 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import csv
+from decimal import Decimal
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+from unittest.case import TestCase
+
+from lisa.notifier import (
+    DiskPerformanceMessage,
+    DiskSetupType,
+    DiskType,
+    create_perf_metric_messages,
+)
+from lisa.notifiers.perf_metrics import PerfMetrics, PerfMetricsSchema
+from lisa.tools import Fio, Iperf3, Ntttcp
+from lisa.util import LisaException
+
+_NTTTCP_OUTPUT = """NTTTCP for Linux 1.4.0
+---------------------------------------------------------
+08:03:21 INFO: 64 threads created
+08:03:21 INFO: 64 connections created in 7153 microseconds
+08:03:21 INFO: Network activity progressing...
+08:03:31 INFO: Test run completed.
+08:03:31 INFO: Test cycle finished.
+08:03:31 INFO: 64 connections tested
+08:03:31 INFO: #####  Totals:  #####
+08:03:31 INFO: test duration\t:10.00 seconds
+08:03:31 INFO: total bytes\t:11732189184
+08:03:31 INFO: \t throughput\t:9.39Gbps
+08:03:31 INFO: \t retrans segs\t:2356
+08:03:31 INFO: cpu cores\t:8
+08:03:31 INFO: \t cpu speed\t:2593.905MHz
+08:03:31 INFO: \t user\t\t:0.59%
+08:03:31 INFO: \t system\t\t:6.52%
+08:03:31 INFO: \t idle\t\t:91.69%
+08:03:31 INFO: \t iowait\t\t:0.00%
+08:03:31 INFO: \t softirq\t:1.20%
+08:03:31 INFO: \t cycles/byte\t:1.39
+08:03:31 INFO: cpu busy (all)\t:74.40%
+---------------------------------------------------------
+"""
+
+_IPERF3_OUTPUT = """Connecting to host 10.0.0.4, port 5201
+[  5] local 10.0.0.5 port 43850 connected to 10.0.0.4 port 5201
+[ ID] Interval           Transfer     Bitrate         Retr  Cwnd
+[  5]   0.00-1.00   sec  1.09 GBytes  9.37 Gbits/sec    0   3.01 MBytes
+[  5]   1.00-2.00   sec  1.09 GBytes  9.38 Gbits/sec    0   3.01 MBytes
+- - - - - - - - - - - - - - - - - - - - - - - - -
+[ ID] Interval           Transfer     Bitrate         Retr
+[  5]   0.00-10.00  sec  10.9 GBytes  9.39 Gbits/sec    0             sender
+[  5]   0.00-10.04  sec  10.9 GBytes  9.35 Gbits/sec                  receiver
+
+iperf Done.
+"""
+
+_IPERF3_PARALLEL_OUTPUT = """Connecting to host 10.0.0.4, port 5201
+[  5] local 10.0.0.5 port 43852 connected to 10.0.0.4 port 5201
+[  7] local 10.0.0.5 port 43854 connected to 10.0.0.4 port 5201
+[ ID] Interval           Transfer     Bitrate         Retr  Cwnd
+[  5]   0.00-1.00   sec   561 MBytes  4.70 Gbits/sec    0   1.51 MBytes
+[  7]   0.00-1.00   sec   558 MBytes  4.68 Gbits/sec    0   1.48 MBytes
+[SUM]   0.00-1.00   sec  1.09 GBytes  9.38 Gbits/sec    0
+- - - - - - - - - - - - - - - - - - - - - - - - -
+[ ID] Interval           Transfer     Bitrate         Retr
+[  5]   0.00-10.00  sec  5.47 GBytes  4.70 Gbits/sec   12             sender
+[  5]   0.00-10.04  sec  5.46 GBytes  4.67 Gbits/sec                  receiver
+[  7]   0.00-10.00  sec  5.45 GBytes  4.68 Gbits/sec    7             sender
+[  7]   0.00-10.04  sec  5.44 GBytes  4.65 Gbits/sec                  receiver
+[SUM]   0.00-10.00  sec  10.9 GBytes  9.38 Gbits/sec   19             sender
+[SUM]   0.00-10.04  sec  10.9 GBytes  9.32 Gbits/sec                  receiver
+
+iperf Done.
+"""
+
+
+class PerfMetricsTestCase(TestCase):
+    def test_create_messages(self) -> None:
+        messages = create_perf_metric_messages(
+            tool="ntttcp",
+            metrics={"throughput_in_gbps": ("9.41", "Gbps"), "retrans": (3, "")},
+            test_case_name="perf_tcp",
+            tags={"vmsize": "Standard_DS2_v2", "connections": 64},
+        )
+        self.assertEqual(2, len(messages))
+        self.assertEqual(Decimal("9.41"), messages[0].value)
+        self.assertEqual("Gbps", messages[0].unit)
+        self.assertEqual(
+            {"vmsize": "Standard_DS2_v2", "connections": "64"}, messages[1].tags
+        )
+        # tags are not shared between messages.
+        self.assertIsNot(messages[0].tags, messages[1].tags)
+
+    def test_write_csv(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "metrics.csv"
+            notifier = PerfMetrics(
+                PerfMetricsSchema(type=PerfMetrics.type_name(), path=str(path))
+            )
+            notifier.initialize()
+            messages = create_perf_metric_messages(
+                tool="fio",
+                metrics={"read_iops": (1000, "IOPS")},
+                tags={"iodepth": 1},
+            ) + create_perf_metric_messages(
+                tool="testpmd",
+                metrics={"rx_pps": (2000, "pps")},
+                tags={"pmd": "netvsc"},
+            )
+            for message in messages:
+                notifier._received_message(message)
+            notifier.finalize()
+
+            with open(path, "r", newline="") as f:
+                reader = csv.DictReader(f)
+                rows = list(reader)
+                columns = reader.fieldnames
+
+        self.assertEqual(["iodepth", "pmd"], columns[-2:] if columns else [])
+        self.assertEqual(2, len(rows))
+        self.assertEqual("read_iops", rows[0]["metric_name"])
+        self.assertEqual("1", rows[0]["iodepth"])
+        self.assertEqual("", rows[0]["pmd"])
+        self.assertEqual("2000", rows[1]["value"])
+        self.assertEqual("netvsc", rows[1]["pmd"])
+
+    def test_ntttcp_throughput(self) -> None:
+        ntttcp = Ntttcp(mock.MagicMock())
+        self.assertEqual(Decimal("9.39"), ntttcp.get_throughput_in_gbps(_NTTTCP_OUTPUT))
+        self.assertEqual(
+            Decimal("0.94"),
+            ntttcp.get_throughput_in_gbps(
+                _NTTTCP_OUTPUT.replace("9.39Gbps", "940.00Mbps")
+            ),
+        )
+        with self.assertRaises(LisaException):
+            ntttcp.get_throughput_in_gbps("")
+
+        messages = ntttcp.create_throughput_messages(
+            _NTTTCP_OUTPUT, test_case_name="perf_tcp", tags={"connections": 64}
+        )
+        self.assertEqual(1, len(messages))
+        self.assertEqual("ntttcp", messages[0].tool)
+        self.assertEqual("throughput_in_gbps", messages[0].metric_name)
+        self.assertEqual(Decimal("9.39"), messages[0].value)
+        self.assertEqual({"connections": "64"}, messages[0].tags)
+
+    def test_iperf3_throughput(self) -> None:
+        iperf3 = Iperf3(mock.MagicMock())
+        self.assertEqual(
+            {"sender": Decimal("9.39"), "receiver": Decimal("9.35")},
+            iperf3.get_throughput_in_gbps(_IPERF3_OUTPUT),
+        )
+        # the SUM lines are used for multiple streams.
+        self.assertEqual(
+            {"sender": Decimal("9.38"), "receiver": Decimal("9.32")},
+            iperf3.get_throughput_in_gbps(_IPERF3_PARALLEL_OUTPUT),
+        )
+        self.assertEqual(
+            {"sender": Decimal("0.939"), "receiver": Decimal("0.935")},
+            iperf3.get_throughput_in_gbps(
+                _IPERF3_OUTPUT.replace("Gbits/sec", "Mbits/sec").replace("9.3", "93")
+            ),
+        )
+        with self.assertRaises(LisaException):
+            iperf3.get_throughput_in_gbps("iperf3: error - unable to connect")
+
+        messages = iperf3.create_throughput_messages(_IPERF3_OUTPUT)
+        self.assertEqual(
+            ["sender_throughput_in_gbps", "receiver_throughput_in_gbps"],
+            [x.metric_name for x in messages],
+        )
+
+    def test_fio_metrics(self) -> None:
+        fio_message = DiskPerformanceMessage(
+            test_case_name="perf_nvme",
+            disk_setup_type=DiskSetupType.raw,
+            disk_type=DiskType.nvme,
+            qdepth=8,
+            iodepth=4,
+            numjob=2,
+            randread_iops=Decimal(1000),
+            randread_lat_usec=Decimal("7.5"),
+            write_iops=Decimal(500),
+            write_lat_usec=Decimal(16),
+        )
+        messages = Fio(mock.MagicMock()).create_metric_messages(
+            fio_message, tags={"vmsize": "Standard_L8s_v2"}
+        )
+        # the modes without iops are not sent.
+        self.assertEqual(
+            [
+                "randread_iops",
+                "randread_lat_usec",
+                "write_iops",
+                "write_lat_usec",
+            ],
+            [x.metric_name for x in messages],
+        )
+        self.assertEqual(Decimal("7.5"), messages[1].value)
+        self.assertEqual("usec", messages[1].unit)
+        self.assertEqual("perf_nvme", messages[0].test_case_name)
+        self.assertEqual("Standard_L8s_v2", messages[0].tags["vmsize"])
+        self.assertEqual("8", messages[0].tags["qdepth"])
+        self.assertEqual("nvme", messages[0].tags["disk_type"])
@@ -0,0 +1,89 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Dict, List, Optional
+from unittest.case import TestCase
+
+from lisa.util.perf_store import PerfRecord, PerfResultStore
+
+_tags = {"vmsize": "Standard_D2s_v3", "kernel_version": "5.4.0", "qdepth": "1"}
+
+
+class PerfResultStoreTestCase(TestCase):
+    def setUp(self) -> None:
+        self._temp_dir = TemporaryDirectory()
+        self._store = PerfResultStore(Path(self._temp_dir.name) / "perf.db")
+        self._date = datetime(2021, 1, 1)
+
+    def tearDown(self) -> None:
+        self._store.close()
+        self._temp_dir.cleanup()
+
+    def test_query_by_key(self) -> None:
+        self._add_history("read_iops", "IOPS", [100, 101])
+        other_tags = {**_tags, "vmsize": "Standard_D4s_v3"}
+        self._store.add([self._create_record("read_iops", "IOPS", 200, other_tags)])
+
+        records = self._store.query({"vmsize": "Standard_D2s_v3"})
+        self.assertEqual([101, 100], [x.value for x in records])
+        self.assertEqual(_tags, records[0].tags)
+        records = self._store.query({"vmsize": "Standard_D4s_v3"}, limit=1)
+        self.assertEqual([200], [x.value for x in records])
+
+    def test_regression_higher_better(self) -> None:
+        self._add_history("read_iops", "IOPS", [1000, 1010, 990, 1005, 995])
+
+        record = self._create_record("read_iops", "IOPS", 980)
+        self.assertIsNone(self._store.check_regression(record))
+        record = self._create_record("read_iops", "IOPS", 800)
+        regression = self._store.check_regression(record)
+        assert regression
+        self.assertEqual(5, regression.sample_count)
+        self.assertAlmostEqual(-0.2, regression.change)
+        # improvement is not a regression
+        record = self._create_record("read_iops", "IOPS", 1500)
+        self.assertIsNone(self._store.check_regression(record))
+
+    def test_regression_lower_better(self) -> None:
+        self._add_history("read_lat_usec", "usec", [100, 101, 99, 100, 100])
+
+        record = self._create_record("read_lat_usec", "usec", 80)
+        self.assertIsNone(self._store.check_regression(record))
+        record = self._create_record("read_lat_usec", "usec", 130)
+        self.assertIsNotNone(self._store.check_regression(record))
+
+    def test_not_enough_samples(self) -> None:
+        self._add_history("read_iops", "IOPS", [1000, 1000])
+
+        record = self._create_record("read_iops", "IOPS", 10)
+        self.assertIsNone(self._store.check_regression(record))
+
+    def _add_history(self, metric_name: str, unit: str, values: List[float]) -> None:
+        records: List[PerfRecord] = []
+        for index, value in enumerate(values):
+            record = self._create_record(metric_name, unit, value)
+            record.run_id = f"run_{index}"
+            records.append(record)
+        self._store.add(records)
+
+    def _create_record(
+        self,
+        metric_name: str,
+        unit: str,
+        value: float,
+        tags: Optional[Dict[str, str]] = None,
+    ) -> PerfRecord:
+        self._date += timedelta(days=1)
+        return PerfRecord(
+            test_case_name="perf_premium_datadisks_4k",
+            tool="fio",
+            metric_name=metric_name,
+            unit=unit,
+            value=value,
+            run_id="current",
+            test_date=self._date,
+            tags=dict(tags or _tags),
+        )
@@ -2,11 +2,15 @@
 # Licensed under the MIT license.
 
 import logging
+import os
 import unittest
 from dataclasses import dataclass
 from typing import Any, List, Optional, TypeVar
 
+from lisa import schema
+from lisa.environment import EnvironmentSpace
 from lisa.search_space import (
+    CheckResultCache,
     CountSpace,
     IntRange,
     RequirementMixin,
@@ -16,12 +20,19 @@ from lisa.search_space import (
     check_countspace,
     generate_min_capability,
     generate_min_capability_countspace,
+    get_fingerprint,
+    matches,
+    matches_countspace,
 )
 from lisa.util import LisaException
 from lisa.util.logger import get_logger
+from lisa.util.perf_timer import create_timer
 
 T = TypeVar("T")
 
+# set it to 100000 or more for a benchmark of requirement matching.
+_BENCHMARK_ROUNDS = int(os.environ.get("LISA_SEARCH_SPACE_BENCHMARK_ROUNDS", "100"))
+
 
 @dataclass
 class MockSchema:
@@ -171,6 +182,111 @@ class SearchSpaceTestCase(unittest.TestCase):
             requirement.generate_min_capability(capability)
         self.assertIn("doesn't support", str(cm.exception))
 
+    def test_node_space_matches(self) -> None:
+        requirement = schema.NodeSpace(
+            core_count=IntRange(min=4),
+            memory_mb=IntRange(min=2048),
+            disk=schema.DiskOptionSettings(data_disk_count=IntRange(min=1)),
+        )
+        requirement.features = SetSpace[schema.FeatureSettings](
+            is_allow_set=True, items=["Gpu"]
+        )
+        capabilities = [
+            self._create_capability(core_count=8, features=["Gpu", "Sriov"]),
+            self._create_capability(core_count=2, features=["Gpu"]),
+            self._create_capability(core_count=8, features=["Sriov"]),
+            self._create_capability(core_count=8, features=["Gpu"], disk_count=0),
+        ]
+        for index, capability in enumerate(capabilities):
+            check_result = requirement.check(capability)
+            self.assertEqual(
+                check_result.result, requirement.matches(capability), str(index)
+            )
+            self.assertEqual(index == 0, check_result.result, check_result.reasons)
+
+    def test_node_space_min_capability_not_shared(self) -> None:
+        requirement = schema.NodeSpace(core_count=IntRange(min=4))
+        requirement.extended_schemas = {"mock": {"value": 1}}
+        requirement.excluded_features = SetSpace[schema.FeatureSettings](
+            is_allow_set=False, items=["Gpu"]
+        )
+        capability = self._create_capability(core_count=8, features=["Gpu"])
+
+        min_value: schema.NodeSpace = requirement.generate_min_capability(capability)
+        self.assertEqual(8, min_value.core_count)
+        self.assertEqual(IntRange(min=4), requirement.core_count)
+        min_value.extended_schemas["mock"]["value"] = 2
+        self.assertEqual(1, requirement.extended_schemas["mock"]["value"])
+        assert min_value.excluded_features
+        self.assertIsNot(requirement.excluded_features, min_value.excluded_features)
+        self.assertEqual(["Gpu"], [x.type for x in min_value.excluded_features])
+
+    def test_fingerprint(self) -> None:
+        first = self._create_capability(core_count=8, features=["Gpu", "Sriov"])
+        second = self._create_capability(core_count=8, features=["Sriov", "Gpu"])
+        self.assertEqual(get_fingerprint(first), get_fingerprint(second))
+        # extended schemas are not used in checks.
+        second.extended_schemas = {"mock": {"value": 1}}
+        self.assertEqual(get_fingerprint(first), get_fingerprint(second))
+
+        second.core_count = 4
+        self.assertNotEqual(get_fingerprint(first), get_fingerprint(second))
+        self.assertNotEqual(
+            get_fingerprint(IntRange(min=1)), get_fingerprint(IntRange(min=1, max=1))
+        )
+        self.assertNotEqual(get_fingerprint(1), get_fingerprint(True))
+
+    def test_check_result_cache(self) -> None:
+        cache = CheckResultCache(max_size=2)
+        requirement = IntRange(min=4)
+        result = cache.get_or_check("r", "1", requirement, lambda: 1)
+        self.assertFalse(result.result)
+        self.assertEqual(1, len(result.reasons))
+        # the cached result is copied, so it's not changed by callers.
+        result.add_reason("other reason")
+        result = cache.get_or_check("r", "1", requirement, lambda: 8)
+        self.assertFalse(result.result)
+        self.assertEqual(1, len(result.reasons))
+
+        self.assertTrue(cache.get_or_check("r", "8", requirement, lambda: 8).result)
+        self.assertTrue(cache.get_or_check("r", "9", requirement, lambda: 9).result)
+        # the least recently used one is evicted.
+        self.assertEqual(2, len(cache))
+        self.assertTrue(cache.get_or_check("r", "1", requirement, lambda: 8).result)
+
+    def test_benchmark_matches(self) -> None:
+        requirement = EnvironmentSpace(
+            nodes=[schema.NodeSpace(node_count=2, core_count=IntRange(min=4))]
+        )
+        requirement.nodes[0].features = SetSpace[schema.FeatureSettings](
+            is_allow_set=True, items=["Gpu"]
+        )
+        capability = EnvironmentSpace(
+            nodes=[
+                self._create_capability(core_count=x, features=["Gpu"]) for x in [8, 8]
+            ]
+        )
+        self.assertTrue(requirement.check(capability).result)
+        self.assertTrue(requirement.matches(capability))
+
+        timer = create_timer()
+        for _ in range(_BENCHMARK_ROUNDS):
+            requirement.check(capability)
+        check_elapsed = timer.elapsed_text()
+        timer = create_timer()
+        for _ in range(_BENCHMARK_ROUNDS):
+            requirement.matches(capability)
+        matches_elapsed = timer.elapsed_text()
+        timer = create_timer()
+        for _ in range(_BENCHMARK_ROUNDS):
+            requirement.generate_min_capability(capability)
+        min_capability_elapsed = timer.elapsed_text()
+        self._log.info(
+            f"{_BENCHMARK_ROUNDS} rounds, check: {check_elapsed}, "
+            f"matches: {matches_elapsed}, "
+            f"generate_min_capability: {min_capability_elapsed}"
+        )
+
     def test_int_range_validation(self) -> None:
 
         with self.assertRaises(expected_exception=LisaException) as cm:
@@ -204,6 +320,11 @@ class SearchSpaceTestCase(unittest.TestCase):
                         requirement.check(capability),
                         extra_msg=extra_msg,
                     )
+                    self.assertEqual(
+                        expected_meet[r_index][c_index],
+                        requirement.matches(capability),
+                        extra_msg,
+                    )
 
                     if expected_meet[r_index][c_index]:
                         actual_min = requirement.generate_min_capability(capability)
@@ -227,6 +348,11 @@ class SearchSpaceTestCase(unittest.TestCase):
                         check_countspace(requirement, capability),  # type:ignore
                         extra_msg=extra_msg,
                     )
+                    self.assertEqual(
+                        expected_meet[r_index][c_index],
+                        matches_countspace(requirement, capability),  # type:ignore
+                        extra_msg,
+                    )
                     if expected_meet[r_index][c_index]:
                         actual_min = generate_min_capability_countspace(
                             requirement, capability  # type:ignore
@@ -242,6 +368,11 @@ class SearchSpaceTestCase(unittest.TestCase):
                         check(requirement, capability),  # type:ignore
                         extra_msg=extra_msg,
                     )
+                    self.assertEqual(
+                        expected_meet[r_index][c_index],
+                        matches(requirement, capability),  # type:ignore
+                        extra_msg,
+                    )
 
                     if expected_meet[r_index][c_index]:
                         actual_min = generate_min_capability(
@@ -251,6 +382,23 @@ class SearchSpaceTestCase(unittest.TestCase):
                             expected_min[r_index][c_index], actual_min, extra_msg
                         )
 
+    def _create_capability(
+        self, core_count: int, features: List[str], disk_count: int = 4
+    ) -> schema.NodeSpace:
+        capability = schema.NodeSpace(
+            node_count=1,
+            core_count=core_count,
+            memory_mb=4096,
+            disk=schema.DiskOptionSettings(
+                data_disk_count=IntRange(min=0, max=disk_count)
+            ),
+            network_interface=schema.NetworkInterfaceOptionSettings(max_nic_count=8),
+        )
+        capability.features = SetSpace[schema.FeatureSettings](
+            is_allow_set=True, items=features
+        )
+        return capability
+
     def _assert_check(
         self,
         expected_meet: bool,
@@ -1,11 +1,21 @@
 # Copyright (c) Microsoft Corporation.
 # Licensed under the MIT license.
 
+import os
+from typing import Any, Dict, List, cast
 from unittest import TestCase
 
-from lisa import LisaException, constants
+from lisa import LisaException, constants, schema
+from lisa.runner import parse_testcase_filters
+from lisa.testselector import select_testcases
+from lisa.testsuite import TestCaseMetadata, TestSuiteMetadata
+from lisa.util.logger import get_logger
+from lisa.util.perf_timer import create_timer
 from selftests.test_testsuite import cleanup_cases_metadata, select_and_check
 
+# set it to 100 or more for a benchmark of selecting 10,000 cases.
+_BENCHMARK_ROUNDS = int(os.environ.get("LISA_SELECTOR_BENCHMARK_ROUNDS", "0"))
+
 
 class SelectorTestCase(TestCase):
     def setUp(self) -> None:
@@ -150,3 +160,91 @@ class SelectorTestCase(TestCase):
         selected = select_and_check(self, runbook, ["ut1", "ut2"])
 
         self.assertListEqual([2, 3], [case.retry for case in selected])
+
+    def test_select_many_cases(self) -> None:
+        cases = self._create_many_cases()
+        raw_filters = self._create_many_filters()
+        filters = cast(List[schema.TestCase], parse_testcase_filters(raw_filters))
+        selected = select_testcases(filters, cases)
+
+        # compare with matching cases one by one.
+        expected: Dict[str, bool] = {}
+        for raw_filter in raw_filters:
+            criteria = raw_filter[constants.TESTCASE_CRITERIA]
+            for case in cases:
+                if "area" in criteria:
+                    if case.suite.area.startswith(criteria["area"][:-2]):
+                        expected[case.full_name] = False
+                elif "tags" in criteria:
+                    if (
+                        criteria["tags"][0] in case.suite.tags
+                        and case.priority in criteria["priority"]
+                    ):
+                        expected.pop(case.full_name, None)
+                elif case.name == criteria["name"]:
+                    expected[case.full_name] = True
+        self.assertEqual(list(expected), [x.metadata.full_name for x in selected])
+        self.assertEqual(
+            [2 if x else 0 for x in expected.values()], [x.retry for x in selected]
+        )
+
+    def test_benchmark_select_cases(self) -> None:
+        if not _BENCHMARK_ROUNDS:
+            self.skipTest(
+                "set LISA_SELECTOR_BENCHMARK_ROUNDS to benchmark the selection"
+            )
+        cases = self._create_many_cases()
+        filters = cast(
+            List[schema.TestCase],
+            parse_testcase_filters(self._create_many_filters()),
+        )
+        # the first round compiles patterns, so it's not measured.
+        select_testcases(filters, cases)
+        timer = create_timer()
+        for _ in range(_BENCHMARK_ROUNDS):
+            select_testcases(filters, cases)
+        elapsed = timer.elapsed() / _BENCHMARK_ROUNDS
+        # the target is 50ms, but it depends on the machine, so it's reported
+        # instead of asserted.
+        get_logger("test", "selector").info(
+            f"selected {len(cases)} cases with {len(filters)} filters in "
+            f"{elapsed:.3f} sec on average of {_BENCHMARK_ROUNDS} rounds"
+        )
+
+    def _create_many_cases(self) -> List[TestCaseMetadata]:
+        cases: List[TestCaseMetadata] = []
+        for suite_index in range(500):
+            suite = TestSuiteMetadata(
+                area=f"area{suite_index % 20}",
+                category=f"category{suite_index % 3}",
+                description="",
+                tags=[f"tag{suite_index % 7}", f"tag{suite_index % 11}"],
+                name=f"Suite{suite_index}",
+            )
+            for case_index in range(20):
+                case = TestCaseMetadata(description="", priority=case_index % 5)
+                case.name = f"case{case_index}"
+                case.full_name = f"{suite.name}.{case.name}"
+                case.suite = suite
+                suite.cases.append(case)
+                cases.append(case)
+        return cases
+
+    def _create_many_filters(self) -> List[Dict[str, Any]]:
+        raw_filters: List[Dict[str, Any]] = []
+        for index in range(10):
+            raw_filters += [
+                {constants.TESTCASE_CRITERIA: {"area": f"area{index}.*"}},
+                {
+                    constants.TESTCASE_CRITERIA: {
+                        "tags": [f"tag{index % 7}"],
+                        "priority": [3, 4],
+                    },
+                    constants.TESTCASE_SELECT_ACTION: "exclude",
+                },
+                {
+                    constants.TESTCASE_CRITERIA: {"name": f"case{index}"},
+                    constants.TESTCASE_RETRY: 2,
+                },
+            ]
+        return raw_filters
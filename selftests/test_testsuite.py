@@ -2,12 +2,20 @@
 # Licensed under the MIT license.
 
 from typing import Any, Dict, List, cast
-from unittest import TestCase
+from unittest import TestCase, mock
 
 from assertpy import assert_that
 
-from lisa import LisaException, PassedException, SkippedException, constants, schema
-from lisa.environment import EnvironmentStatus, load_environments
+from lisa import (
+    LisaException,
+    PassedException,
+    SkippedException,
+    constants,
+    schema,
+    search_space,
+    testsuite,
+)
+from lisa.environment import EnvironmentSpace, EnvironmentStatus, load_environments
 from lisa.operating_system import Posix, Windows
 from lisa.parameter_parser.runbook import RunbookBuilder
 from lisa.runner import parse_testcase_filters
@@ -115,6 +123,8 @@ class MockTestSuite2(TestSuite):
 def cleanup_cases_metadata() -> None:
     get_cases_metadata().clear()
     get_suites_metadata().clear()
+    testsuite._lazy_suites.clear()
+    testsuite._lazy_cases.clear()
 
 
 def generate_cases_metadata() -> List[TestCaseMetadata]:
@@ -486,3 +496,57 @@ class TestSuiteTestCase(TestCase):
             [],
             result.check_results.reasons,
         )
+
+    def test_check_environment_cached(self) -> None:
+        _ = self.generate_suite_instance()
+        assert self.default_env
+        self.default_env.status = EnvironmentStatus.Deployed
+        testsuite._check_result_cache.clear()
+        for result in self.case_results:
+            result.runtime_data.metadata.requirement = simple_requirement(min_count=2)
+
+        with mock.patch.object(
+            EnvironmentSpace, "matches", autospec=True, return_value=True
+        ) as matches:
+            for result in self.case_results * 2:
+                self.assertTrue(result.check_environment(self.default_env))
+            # same requirements and capability are checked once.
+            self.assertEqual(1, matches.call_count)
+
+            # the capability is changed, so it's checked again.
+            self.default_env.nodes[0].capability = schema.Capability()
+            self.assertTrue(self.case_results[0].check_environment(self.default_env))
+            self.assertEqual(2, matches.call_count)
+
+        requirement = self.case_results[0].runtime_data.metadata.requirement
+        assert requirement.environment
+        node_requirement = schema.NodeSpace()
+        node_requirement.features = search_space.SetSpace[schema.FeatureSettings](
+            is_allow_set=True, items=["Gpu"]
+        )
+        requirement.environment.nodes[0] = node_requirement
+        # the requirement is changed, and it's not matched.
+        self.assertFalse(
+            self.case_results[0].check_environment(self.default_env, save_reason=True)
+        )
+        assert self.case_results[0].check_results
+        self.assertIn("Gpu", self.case_results[0].check_results.reasons[0])
+
+    def test_check_environment_capability_changed(self) -> None:
+        _ = self.generate_suite_instance()
+        assert self.default_env
+        self.default_env.status = EnvironmentStatus.Deployed
+        testsuite._check_result_cache.clear()
+        result = self.case_results[0]
+        result.runtime_data.metadata.requirement = simple_requirement(
+            min_data_disk_count=2
+        )
+        capability = self.default_env.nodes[0].capability
+        capability.disk = schema.DiskOptionSettings(data_disk_count=1)
+        self.assertFalse(result.check_environment(self.default_env))
+
+        # the disk feature changes the capability in place, so it's checked
+        # again after the fingerprint is cleared.
+        capability.disk.data_disk_count += 1
+        self.default_env.clear_capability_fingerprint()
+        self.assertTrue(result.check_environment(self.default_env))
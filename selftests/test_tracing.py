@@ -0,0 +1,115 @@
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT license.
+
+import gc
+import json
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+from unittest.case import TestCase
+
+from paramiko import SSHException
+
+from lisa.util import tracing
+from lisa.util.process import Process
+from lisa.util.tracing import Tracer
+
+
+class TracingTestCase(TestCase):
+    def setUp(self) -> None:
+        self._tracer = Tracer()
+        self._tracer.enabled = True
+
+    def test_disabled(self) -> None:
+        tracer = Tracer()
+        with tracer.start_span("disabled") as span:
+            span.set_attribute("key", "value")
+        self.assertEqual([], tracer.spans)
+
+    def test_nested_spans(self) -> None:
+        with self._tracer.start_span("parent", "test", id=1) as parent:
+            command = self._tracer.start_span("command", "command")
+            command.end()
+            with self.assertRaises(ValueError):
+                with self._tracer.start_span("child", "tool"):
+                    raise ValueError("failed")
+
+        spans = {x.name: x for x in self._tracer.spans}
+        self.assertEqual(3, len(spans))
+        self.assertEqual(parent.span_id, spans["command"].parent_id)
+        self.assertEqual(parent.span_id, spans["child"].parent_id)
+        self.assertEqual("", spans["parent"].parent_id)
+        self.assertEqual("ValueError: failed", spans["child"].error)
+        self.assertEqual({"command", "test", "tool"}, set(self._tracer.summarize()))
+
+    def test_failed_command(self) -> None:
+        shell = mock.MagicMock(is_posix=True, is_remote=True)
+        shell.spawn.side_effect = SSHException("connection lost")
+        process = Process("1", shell)
+        with mock.patch.object(tracing, "_tracer", self._tracer):
+            with self.assertRaises(SSHException):
+                process.start("echo hello")
+
+        spans = self._tracer.spans
+        self.assertEqual(["echo hello"], [x.name for x in spans])
+        self.assertEqual("SSHException: connection lost", spans[0].error)
+
+    def test_killed_command(self) -> None:
+        # async processes may be killed or never waited, their spans are ended
+        # too.
+        shell = mock.MagicMock(is_posix=True, is_remote=True)
+        with mock.patch.object(tracing, "_tracer", self._tracer):
+            process = Process("1", shell)
+            process.start("sleep 10")
+            process.kill()
+            process = Process("2", shell)
+            process.start("sleep 20")
+            del process
+            gc.collect()
+
+        spans = self._tracer.spans
+        self.assertEqual(["sleep 10", "sleep 20"], [x.name for x in spans])
+        self.assertEqual(
+            ["killed", "the process is not waited"], [x.error for x in spans]
+        )
+
+    def test_summarize_nested_spans(self) -> None:
+        # the nested span of the same category isn't counted twice.
+        with self._tracer.start_span("parent", "tool") as parent:
+            with self._tracer.start_span("child", "tool") as child:
+                with self._tracer.start_span("command", "command") as command:
+                    pass
+        for span, start_time, end_time in [
+            (parent, 0, 10),
+            (child, 2, 6),
+            (command, 3, 5),
+        ]:
+            span.start_time = start_time * 10 ** 9
+            span.end_time = end_time * 10 ** 9
+
+        self.assertEqual({"tool": 10, "command": 2}, self._tracer.summarize())
+
+    def test_export(self) -> None:
+        with self._tracer.start_span("parent", "test"):
+            with self._tracer.start_span("child", "command", exit_code=0):
+                pass
+
+        with TemporaryDirectory() as temp_dir:
+            chrome_path = Path(temp_dir) / "trace.json"
+            otel_path = Path(temp_dir) / "trace.otel.json"
+            self._tracer.export_chrome_trace(chrome_path)
+            self._tracer.export_otel(otel_path)
+            with open(chrome_path, "r") as f:
+                chrome_trace = json.load(f)
+            with open(otel_path, "r") as f:
+                otel_trace = json.load(f)
+
+        events = [x for x in chrome_trace["traceEvents"] if x["ph"] == "X"]
+        self.assertEqual(["child", "parent"], [x["name"] for x in events])
+        self.assertEqual({"exit_code": "0"}, events[0]["args"])
+        self.assertGreaterEqual(events[1]["dur"], events[0]["dur"])
+
+        spans = otel_trace["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        self.assertEqual(spans[1]["spanId"], spans[0]["parentSpanId"])
+        self.assertNotIn("parentSpanId", spans[1])
+        self.assertEqual(self._tracer.trace_id, spans[0]["traceId"])
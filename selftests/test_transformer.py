@@ -3,23 +3,33 @@
 
 from dataclasses import dataclass, field
 from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Event
 from typing import Any, Dict, List, Type
-from unittest import TestCase
+from unittest import TestCase, mock
 
 from dataclasses_json import dataclass_json
 
 from lisa import LisaException, constants, schema, transformer
 from lisa.parameter_parser.runbook import RunbookBuilder
-from lisa.transformer import Transformer
+from lisa.transformer import Transformer, get_default_cache_path
+from lisa.util.output_cache import OutputCache
 from lisa.variable import VariableEntry
 
 MOCK = "mock"
 
+# events between transformers, which run in parallel.
+_events: Dict[str, Event] = {}
+_ran_transformers: List[str] = []
+
 
 @dataclass_json
 @dataclass
 class TestTransformerSchema(schema.Transformer):
     items: Dict[str, str] = field(default_factory=dict)
+    wait_event: str = ""
+    set_event: str = ""
+    fail: bool = False
 
 
 class TestTransformer(Transformer):
@@ -42,6 +52,14 @@ class TestTransformer(Transformer):
 
     def _internal_run(self) -> Dict[str, Any]:
         runbook: TestTransformerSchema = self.runbook
+        _ran_transformers.append(self.name)
+        if runbook.wait_event:
+            if not _events.setdefault(runbook.wait_event, Event()).wait(10):
+                raise LisaException(f"timeout on waiting {runbook.wait_event}")
+        if runbook.set_event:
+            _events.setdefault(runbook.set_event, Event()).set()
+        if runbook.fail:
+            raise LisaException(f"{self.name} failed")
         result: Dict[str, Any] = dict()
         for name, value in runbook.items.items():
             result[name] = f"{value} processed"
@@ -50,6 +68,10 @@ class TestTransformer(Transformer):
 
 
 class TestTransformerCase(TestCase):
+    def setUp(self) -> None:
+        _events.clear()
+        _ran_transformers.clear()
+
     def test_transformer_ordered(self) -> None:
         # transformers are sorted by the dependent order
         transformers = self._generate_transformers_runbook(3)
@@ -167,6 +189,147 @@ class TestTransformerCase(TestCase):
             result,
         )
 
+    def test_transformer_dependencies(self) -> None:
+        # without depends_on, it depends on all transformers before it.
+        transformers = self._generate_transformers_runbook(4)
+        transformers[1].depends_on = []
+        transformers[2].depends_on = ["t0"]
+
+        dependencies = transformer._get_dependencies(transformer._sort(transformers))
+        self.assertDictEqual(
+            {
+                "t0": set(),
+                "t1": set(),
+                "t2": {"t0"},
+                "t3": {"t0", "t1", "t2"},
+            },
+            dependencies,
+        )
+
+    def test_has_transformers(self) -> None:
+        # the root runner resolves runbooks of combinator iterations in
+        # background, only if there is no expanded transformer.
+        transformers = self._generate_transformers_runbook(2)
+        transformers[1].phase = constants.TRANSFORMER_PHASE_EXPANDED
+        runbook_builder = self._generate_runbook_builder(transformers)
+        for phase in [
+            constants.TRANSFORMER_PHASE_INIT,
+            constants.TRANSFORMER_PHASE_EXPANDED,
+        ]:
+            self.assertTrue(transformer.has_transformers(runbook_builder, phase))
+
+        transformers[1].enabled = False
+        runbook_builder = self._generate_runbook_builder(transformers)
+        self.assertFalse(
+            transformer.has_transformers(
+                runbook_builder, constants.TRANSFORMER_PHASE_EXPANDED
+            )
+        )
+        runbook_builder._raw_data = {}
+        self.assertFalse(
+            transformer.has_transformers(
+                runbook_builder, constants.TRANSFORMER_PHASE_INIT
+            )
+        )
+
+    def test_transformer_run_in_parallel(self) -> None:
+        # t0 waits t1, so they must run at the same time. The outputs are
+        # merged in the sorted order, though t1 completes first.
+        transformers = self._generate_transformers_runbook(3)
+        for item in transformers[:2]:
+            item.depends_on = []
+            item.rename = {f"{item.name}_v0": "v0"}
+        transformers[0].extended_schemas["wait_event"] = "t1"
+        transformers[1].extended_schemas["set_event"] = "t1"
+        runbook_builder = self._generate_runbook_builder(transformers)
+
+        result = transformer._run_transformers(runbook_builder)
+        self._validate_variables(
+            {
+                "va": "original",
+                "v0": "1_0 processed",
+                "t1_v1": "1_1 processed",
+                "t2_v0": "2_0 processed",
+                "t2_v1": "2_1 processed",
+                "t2_v2": "2_2 processed",
+            },
+            result,
+        )
+
+    def test_transformer_failure_cancel_dependents(self) -> None:
+        # t1 depends on failed t0, so it's cancelled. t2 is independent, so
+        # it still runs.
+        transformers = self._generate_transformers_runbook(3)
+        transformers[0].extended_schemas["fail"] = True
+        transformers[1].depends_on = ["t0"]
+        transformers[2].depends_on = []
+        runbook_builder = self._generate_runbook_builder(transformers)
+
+        with self.assertRaises(LisaException) as cm:
+            transformer._run_transformers(runbook_builder)
+        self.assertEqual("t0 failed", str(cm.exception))
+        self.assertListEqual(["t0", "t2"], sorted(_ran_transformers))
+
+    def test_transformer_cached_outputs(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            self._set_cache_path(Path(temp_dir))
+            patch_file = Path(temp_dir) / "a.patch"
+            patch_file.write_text("patch 1")
+            transformers = self._generate_transformers_runbook(1)
+            transformers[0].cache = schema.TransformerCache(
+                files=[str(Path(temp_dir) / "*.patch")]
+            )
+            runbook_builder = self._generate_runbook_builder(transformers)
+
+            # the second run returns cached outputs without running.
+            for _ in range(2):
+                result = transformer._run_transformers(runbook_builder)
+                self.assertEqual("0_0 processed", result["t0_v0"].data)
+            self.assertListEqual(["t0"], _ran_transformers)
+
+            # the changed file is a new input, so it runs again.
+            patch_file.write_text("patch 2")
+            transformer._run_transformers(runbook_builder)
+            self.assertListEqual(["t0", "t0"], _ran_transformers)
+
+            # the cleared outputs are not used.
+            cache = OutputCache(get_default_cache_path())
+            self.assertEqual(["mock", "mock"], [x.type_name for x in cache.list()])
+            self.assertEqual(2, cache.remove(MOCK))
+            transformer._run_transformers(runbook_builder)
+            self.assertListEqual(["t0", "t0", "t0"], _ran_transformers)
+
+    def test_transformer_cache_expired(self) -> None:
+        with TemporaryDirectory() as temp_dir:
+            self._set_cache_path(Path(temp_dir))
+            transformers = self._generate_transformers_runbook(1)
+            transformers[0].cache = schema.TransformerCache(ttl=-1)
+            runbook_builder = self._generate_runbook_builder(transformers)
+
+            transformer._run_transformers(runbook_builder)
+            transformer._run_transformers(runbook_builder)
+            self.assertListEqual(["t0", "t0"], _ran_transformers)
+
+    def test_transformer_cache_without_outputs(self) -> None:
+        # the transformer runs for side effects only, so it's not cached.
+        with TemporaryDirectory() as temp_dir:
+            self._set_cache_path(Path(temp_dir))
+            transformers = self._generate_transformers_runbook(1)
+            transformers[0].extended_schemas["items"] = {}
+            transformers[0].cache = schema.TransformerCache()
+            runbook_builder = self._generate_runbook_builder(transformers)
+
+            transformer._run_transformers(runbook_builder)
+            transformer._run_transformers(runbook_builder)
+            self.assertListEqual(["t0", "t0"], _ran_transformers)
+            self.assertListEqual([], OutputCache(get_default_cache_path()).list())
+
+    def _set_cache_path(self, path: Path) -> None:
+        # CACHE_PATH is set by the main entry, so it may not exist in tests.
+        patcher = mock.patch.object(constants, "CACHE_PATH", path, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
     def _validate_variables(
         self, expected: Dict[str, str], actual: Dict[str, VariableEntry]
     ) -> None:
@@ -248,6 +248,32 @@ class VariableTestCase(TestCase):
         self.assertFalse(variables["unused"].is_used)
         self.assertTrue(variables["normal_value"].is_used)
 
+    def test_replace_by_paths(self) -> None:
+        variables = self._get_default_variables()
+        data = self._get_default_data()
+        data["shared"] = {"no_variable": ["value"]}
+        paths = variable.find_variable_paths(data)
+        self.assertEqual(
+            [
+                ("normal_entry",),
+                ("headtail",),
+                ("nested", "normal_value"),
+                ("list", 0),
+                ("list", 1, "dictInList"),
+                ("two_entries",),
+            ],
+            paths,
+        )
+
+        expected = variable.replace_variables(self._get_default_data(), variables)
+        result = variable.replace_variables_by_paths(data, paths, variables)
+        expected["shared"] = data["shared"]
+        self.assertEqual(expected, result)
+        # the original data isn't changed, and parts without variables are shared.
+        self.assertEqual("$(normal_value)", data["nested"]["normal_value"])
+        self.assertEqual("$(secret_int)", data["list"][1]["dictInList"])
+        self.assertIs(data["shared"], result["shared"])
+
     def test_invalid_file_extension(self) -> None:
         variables = self._get_default_variables()
         with self.assertRaises(LisaException) as cm: